@@ -4,8 +4,9 @@ import json
 import sys
 import os
 sys.path.insert(0, os.getcwd())
-from utility_code.patient_population_generation import generate_NV_model_patient_pop_params
+from utility_code.patient_population_generation import generate_NV_model_patient_pop_params_per_trial
 from utility_code.patient_population_generation import convert_theo_pop_hist
+from utility_code.patient_population_generation import convert_theo_pop_hists
 
 
 def generate_keras_formatted_data(num_theo_patients_per_trial_arm,
@@ -19,41 +20,25 @@ def generate_keras_formatted_data(num_theo_patients_per_trial_arm,
     num_monthly_std_devs = monthly_std_dev_max - monthly_std_dev_min + 1
     num_monthly_means    = monthly_mean_max    - monthly_mean_min    + 1
 
-    keras_formatted_NV_model_placebo_arm_pop_hists = np.zeros((num_trials, num_monthly_std_devs, num_monthly_means, 1))
-    keras_formatted_NV_model_drug_arm_pop_hists    = np.zeros((num_trials, num_monthly_std_devs, num_monthly_means, 1))
-
-    NV_model_patient_pop_params = np.array([[], []]).reshape((0, 2))
-
-    for trial_index in range(num_trials):
-
-        NV_model_placebo_arm_patient_pop_params = \
-            generate_NV_model_patient_pop_params(num_theo_patients_per_trial_arm,
-                                                 one_or_two)
-    
-        NV_model_placebo_arm_pop_hist = \
-            convert_theo_pop_hist(monthly_mean_min,
-                                  monthly_mean_max,
-                                  monthly_std_dev_min,
-                                  monthly_std_dev_max,
-                                  NV_model_placebo_arm_patient_pop_params)
-        
-        keras_formatted_NV_model_placebo_arm_pop_hists[trial_index, :, :, 0] = NV_model_placebo_arm_pop_hist
-
-        NV_model_drug_arm_patient_pop_params = \
-            generate_NV_model_patient_pop_params(num_theo_patients_per_trial_arm,
-                                                 one_or_two)
-
-        NV_model_drug_arm_pop_hist = \
-            convert_theo_pop_hist(monthly_mean_min,
-                                  monthly_mean_max,
-                                  monthly_std_dev_min,
-                                  monthly_std_dev_max,
-                                  NV_model_drug_arm_patient_pop_params)
-        
-        keras_formatted_NV_model_drug_arm_pop_hists[trial_index, :, :, 0] = NV_model_drug_arm_pop_hist
-
-        NV_model_patient_pop_params = np.concatenate((NV_model_patient_pop_params, NV_model_placebo_arm_patient_pop_params), 0)
-        NV_model_patient_pop_params = np.concatenate((NV_model_patient_pop_params, NV_model_drug_arm_patient_pop_params),    0)
+    # the patients of both trial arms of every trial are generated all at once
+    NV_model_patient_pop_params_per_trial = \
+        generate_NV_model_patient_pop_params_per_trial(num_trials,
+                                                       num_theo_patients_per_trial_arm,
+                                                       one_or_two)
+
+    NV_model_patient_pop_params = NV_model_patient_pop_params_per_trial.reshape((-1, 2))
+
+    # histogram every trial arm of every trial at once
+    NV_model_trial_arm_pop_hists = \
+        convert_theo_pop_hists(monthly_mean_min,
+                               monthly_mean_max,
+                               monthly_std_dev_min,
+                               monthly_std_dev_max,
+                               NV_model_patient_pop_params_per_trial.reshape((2*num_trials, num_theo_patients_per_trial_arm, 2)))
+    NV_model_trial_arm_pop_hists = NV_model_trial_arm_pop_hists.reshape((num_trials, 2, num_monthly_std_devs, num_monthly_means, 1))
+
+    keras_formatted_NV_model_placebo_arm_pop_hists = NV_model_trial_arm_pop_hists[:, 0]
+    keras_formatted_NV_model_drug_arm_pop_hists    = NV_model_trial_arm_pop_hists[:, 1]
 
     return [keras_formatted_NV_model_placebo_arm_pop_hists, 
             keras_formatted_NV_model_drug_arm_pop_hists, 
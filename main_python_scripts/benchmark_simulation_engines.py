@@ -0,0 +1,172 @@
+import numpy as np
+import time
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+from utility_code.patient_population_generation import generate_theo_patient_pop_params
+from utility_code.endpoint_simulation import simulate_trial_arm_endpoints
+from utility_code.endpoint_simulation import set_simulation_engine
+
+
+def time_simulation_engine(simulation_engine_name,
+                           num_theo_patients_per_trial_arm,
+                           theo_placebo_arm_patient_pop_params,
+                           theo_drug_arm_patient_pop_params,
+                           num_baseline_months,
+                           num_testing_months,
+                           testing_time_scaling_const,
+                           minimum_required_baseline_seizure_count,
+                           placebo_mu,
+                           placebo_sigma,
+                           drug_mu,
+                           drug_sigma,
+                           requested_endpoint_names,
+                           num_trials):
+
+    simulation_engine_name = set_simulation_engine(simulation_engine_name)
+
+    # run one untimed trial so that the compilation time of the 'numba' engine is not included
+    for placebo_or_drug in ['placebo', 'drug']:
+        simulate_trial_arm_endpoints(num_theo_patients_per_trial_arm,
+                                     theo_placebo_arm_patient_pop_params,
+                                     num_baseline_months,
+                                     num_testing_months,
+                                     testing_time_scaling_const,
+                                     minimum_required_baseline_seizure_count,
+                                     placebo_mu,
+                                     placebo_sigma,
+                                     drug_mu,
+                                     drug_sigma,
+                                     placebo_or_drug,
+                                     None,
+                                     requested_endpoint_names)
+
+    start_time_in_seconds = time.time()
+
+    for trial_index in range(num_trials):
+
+        simulate_trial_arm_endpoints(num_theo_patients_per_trial_arm,
+                                     theo_placebo_arm_patient_pop_params,
+                                     num_baseline_months,
+                                     num_testing_months,
+                                     testing_time_scaling_const,
+                                     minimum_required_baseline_seizure_count,
+                                     placebo_mu,
+                                     placebo_sigma,
+                                     drug_mu,
+                                     drug_sigma,
+                                     'placebo',
+                                     None,
+                                     requested_endpoint_names)
+
+        simulate_trial_arm_endpoints(num_theo_patients_per_trial_arm,
+                                     theo_drug_arm_patient_pop_params,
+                                     num_baseline_months,
+                                     num_testing_months,
+                                     testing_time_scaling_const,
+                                     minimum_required_baseline_seizure_count,
+                                     placebo_mu,
+                                     placebo_sigma,
+                                     drug_mu,
+                                     drug_sigma,
+                                     'drug',
+                                     None,
+                                     requested_endpoint_names)
+
+    stop_time_in_seconds = time.time()
+
+    runtime_per_trial_in_seconds = (stop_time_in_seconds - start_time_in_seconds)/num_trials
+
+    return [simulation_engine_name, runtime_per_trial_in_seconds]
+
+
+def benchmark_simulation_engines(monthly_mean_min,
+                                 monthly_mean_max,
+                                 monthly_std_dev_min,
+                                 monthly_std_dev_max,
+                                 num_theo_patients_per_trial_arm,
+                                 num_baseline_months,
+                                 num_testing_months,
+                                 minimum_required_baseline_seizure_count,
+                                 placebo_mu,
+                                 placebo_sigma,
+                                 drug_mu,
+                                 drug_sigma,
+                                 num_trials):
+
+    theo_placebo_arm_patient_pop_params = \
+        generate_theo_patient_pop_params(monthly_mean_min,
+                                         monthly_mean_max,
+                                         monthly_std_dev_min,
+                                         monthly_std_dev_max,
+                                         num_theo_patients_per_trial_arm)
+
+    theo_drug_arm_patient_pop_params = \
+        generate_theo_patient_pop_params(monthly_mean_min,
+                                         monthly_mean_max,
+                                         monthly_std_dev_min,
+                                         monthly_std_dev_max,
+                                         num_theo_patients_per_trial_arm)
+
+    # RR50 and MPC only need monthly testing periods, which are drawn directly, while TTP needs daily testing periods
+    testing_time_scaling_const = 28
+    endpoint_name_groups = [['RR50/MPC', ['RR50', 'MPC']], ['TTP', ['TTP']]]
+
+    for [endpoint_name, requested_endpoint_names] in endpoint_name_groups:
+
+        runtimes_per_trial_in_seconds = {}
+
+        for simulation_engine_name in ['numpy', 'numba']:
+
+            [simulation_engine_name, runtime_per_trial_in_seconds] = \
+                time_simulation_engine(simulation_engine_name,
+                                       num_theo_patients_per_trial_arm,
+                                       theo_placebo_arm_patient_pop_params,
+                                       theo_drug_arm_patient_pop_params,
+                                       num_baseline_months,
+                                       num_testing_months,
+                                       testing_time_scaling_const,
+                                       minimum_required_baseline_seizure_count,
+                                       placebo_mu,
+                                       placebo_sigma,
+                                       drug_mu,
+                                       drug_sigma,
+                                       requested_endpoint_names,
+                                       num_trials)
+
+            runtimes_per_trial_in_seconds[simulation_engine_name] = runtime_per_trial_in_seconds
+
+            print(endpoint_name + ', ' + simulation_engine_name + ' engine: ' + str(np.round(1000*runtime_per_trial_in_seconds, 3)) + ' milliseconds per trial')
+
+        if('numba' in runtimes_per_trial_in_seconds):
+
+            speedup = runtimes_per_trial_in_seconds['numpy']/runtimes_per_trial_in_seconds['numba']
+            print(endpoint_name + ' speedup: ' + str(np.round(speedup, 2)) + 'x\n')
+
+
+def take_inputs_from_command_shell():
+
+    num_theo_patients_per_trial_arm = int(sys.argv[1])
+    num_trials = int(sys.argv[2])
+
+    return [num_theo_patients_per_trial_arm, num_trials]
+
+
+if(__name__=='__main__'):
+
+    [num_theo_patients_per_trial_arm, num_trials] = \
+        take_inputs_from_command_shell()
+
+    benchmark_simulation_engines(1,
+                                 16,
+                                 1,
+                                 16,
+                                 num_theo_patients_per_trial_arm,
+                                 2,
+                                 3,
+                                 4,
+                                 0,
+                                 0.05,
+                                 0.2,
+                                 0.05,
+                                 num_trials)
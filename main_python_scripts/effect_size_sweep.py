@@ -0,0 +1,139 @@
+import numpy as np
+import time
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+from utility_code.patient_population_generation import generate_theo_patient_pop_params
+from utility_code.empirical_estimation import empirically_estimate_statistical_powers_for_effect_scenarios
+from utility_code.random_streams import generate_base_seed
+from utility_code.random_streams import get_random_stream
+
+
+def estimate_statistical_powers_for_effect_scenarios(monthly_mean_min,
+                                                     monthly_mean_max,
+                                                     monthly_std_dev_min,
+                                                     monthly_std_dev_max,
+                                                     num_theo_patients_per_trial_arm,
+                                                     num_baseline_months,
+                                                     num_testing_months,
+                                                     minimum_required_baseline_seizure_count,
+                                                     effect_scenarios,
+                                                     num_trials,
+                                                     base_seed):
+
+    population_rng = get_random_stream(base_seed, 0, 0, 0, 'population')
+
+    theo_placebo_arm_patient_pop_params = \
+        generate_theo_patient_pop_params(monthly_mean_min,
+                                         monthly_mean_max,
+                                         monthly_std_dev_min,
+                                         monthly_std_dev_max,
+                                         num_theo_patients_per_trial_arm,
+                                         population_rng)
+
+    theo_drug_arm_patient_pop_params = \
+        generate_theo_patient_pop_params(monthly_mean_min,
+                                         monthly_mean_max,
+                                         monthly_std_dev_min,
+                                         monthly_std_dev_max,
+                                         num_theo_patients_per_trial_arm,
+                                         population_rng)
+
+    start_time_in_seconds = time.time()
+
+    [RR50_emp_stat_powers,
+     MPC_emp_stat_powers,
+     TTP_emp_stat_powers] = \
+         empirically_estimate_statistical_powers_for_effect_scenarios(theo_placebo_arm_patient_pop_params,
+                                                                      theo_drug_arm_patient_pop_params,
+                                                                      num_theo_patients_per_trial_arm,
+                                                                      num_baseline_months,
+                                                                      num_testing_months,
+                                                                      minimum_required_baseline_seizure_count,
+                                                                      effect_scenarios,
+                                                                      num_trials,
+                                                                      base_seed=base_seed)
+
+    stop_time_in_seconds = time.time()
+
+    for effect_scenario_index in range(len(effect_scenarios)):
+
+        print(str(effect_scenarios[effect_scenario_index]) + ': ' + \
+              'RR50: ' + str(np.round(RR50_emp_stat_powers[effect_scenario_index], 3)) + ', ' + \
+              'MPC: '  + str(np.round(MPC_emp_stat_powers[effect_scenario_index], 3))  + ', ' + \
+              'TTP: '  + str(np.round(TTP_emp_stat_powers[effect_scenario_index], 3)))
+
+    print('\nsweep runtime: ' + str(np.round((stop_time_in_seconds - start_time_in_seconds)/60, 3)) + ' minutes')
+
+    return [RR50_emp_stat_powers, MPC_emp_stat_powers, TTP_emp_stat_powers]
+
+
+def take_inputs_from_command_shell():
+
+    monthly_mean_min    = int(sys.argv[1])
+    monthly_mean_max    = int(sys.argv[2])
+    monthly_std_dev_min = int(sys.argv[3])
+    monthly_std_dev_max = int(sys.argv[4])
+
+    num_theo_patients_per_trial_arm = int(sys.argv[5])
+
+    num_baseline_months = int(sys.argv[6])
+    num_testing_months  = int(sys.argv[7])
+    minimum_required_baseline_seizure_count = int(sys.argv[8])
+
+    num_trials = int(sys.argv[9])
+    base_seed  = int(sys.argv[10])
+
+    # every remaining group of four inputs is one [placebo_mu, placebo_sigma, drug_mu, drug_sigma] scenario
+    effect_scenario_inputs = [float(effect_scenario_input) for effect_scenario_input in sys.argv[11:]]
+
+    if(len(effect_scenario_inputs) == 0 or len(effect_scenario_inputs) % 4 != 0):
+
+        raise ValueError('The effect scenarios must be given as groups of four numbers: placebo_mu placebo_sigma drug_mu drug_sigma')
+
+    effect_scenarios = [effect_scenario_inputs[index:index + 4] for index in range(0, len(effect_scenario_inputs), 4)]
+
+    if(base_seed < 0):
+        base_seed = generate_base_seed()
+
+    return [monthly_mean_min,
+            monthly_mean_max,
+            monthly_std_dev_min,
+            monthly_std_dev_max,
+            num_theo_patients_per_trial_arm,
+            num_baseline_months,
+            num_testing_months,
+            minimum_required_baseline_seizure_count,
+            effect_scenarios,
+            num_trials,
+            base_seed]
+
+
+if(__name__=='__main__'):
+
+    [monthly_mean_min,
+     monthly_mean_max,
+     monthly_std_dev_min,
+     monthly_std_dev_max,
+     num_theo_patients_per_trial_arm,
+     num_baseline_months,
+     num_testing_months,
+     minimum_required_baseline_seizure_count,
+     effect_scenarios,
+     num_trials,
+     base_seed] = \
+         take_inputs_from_command_shell()
+
+    print('\nbase seed: ' + str(base_seed) + '\n')
+
+    estimate_statistical_powers_for_effect_scenarios(monthly_mean_min,
+                                                     monthly_mean_max,
+                                                     monthly_std_dev_min,
+                                                     monthly_std_dev_max,
+                                                     num_theo_patients_per_trial_arm,
+                                                     num_baseline_months,
+                                                     num_testing_months,
+                                                     minimum_required_baseline_seizure_count,
+                                                     effect_scenarios,
+                                                     num_trials,
+                                                     base_seed)
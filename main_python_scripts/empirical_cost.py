@@ -5,19 +5,20 @@ import sys
 import os
 sys.path.insert(0, os.getcwd())
 from utility_code.seizure_diary_generation import generate_baseline_seizure_diary
-from utility_code.patient_population_generation import generate_heterogeneous_placebo_arm_patient_pop
-from utility_code.patient_population_generation import generate_heterogeneous_drug_arm_patient_pop
-from utility_code.endpoint_functions import calculate_percent_changes
-from utility_code.endpoint_functions import calculate_time_to_prerandomizations
-from utility_code.endpoint_functions import calculate_fisher_exact_p_value
+from utility_code.endpoint_simulation import simulate_trial_arm_endpoints
 from utility_code.endpoint_functions import calculate_Mann_Whitney_U_p_value
 from utility_code.endpoint_functions import calculate_logrank_p_value
+from utility_code.rejection_regions import calculate_RR50_trial_successes
+from utility_code.random_streams import generate_base_seed
+from utility_code.random_streams import get_random_stream
+from utility_code.random_streams import iterate_trial_random_streams
 
 
 def get_map_loc(monthly_mean_min,
                 monthly_mean_max,
                 monthly_std_dev_min,
-                monthly_std_dev_max):
+                monthly_std_dev_max,
+                rng):
 
     overdispersed = False
     non_zero_mean = False
@@ -27,8 +28,8 @@ def get_map_loc(monthly_mean_min,
         overdispersed = False
         non_zero_mean = False
         
-        monthly_mean    = np.random.randint(monthly_mean_min,    monthly_mean_max    + 1)
-        monthly_std_dev = np.random.randint(monthly_std_dev_min, monthly_std_dev_max + 1)
+        monthly_mean    = rng.integers(monthly_mean_min,    monthly_mean_max    + 1)
+        monthly_std_dev = rng.integers(monthly_std_dev_min, monthly_std_dev_max + 1)
 
         if(monthly_mean != 0):
 
@@ -46,7 +47,8 @@ def estimate_patient_loc(monthly_mean_min,
                          monthly_std_dev_min,
                          monthly_std_dev_max,
                          num_baseline_months,
-                         minimum_required_baseline_seizure_count):
+                         minimum_required_baseline_seizure_count,
+                         rng):
 
     baseline_time_scaling_const = 28
     estims_within_SNR_map = False
@@ -58,14 +60,16 @@ def estimate_patient_loc(monthly_mean_min,
              get_map_loc(monthly_mean_min,
                          monthly_mean_max,
                          monthly_std_dev_min,
-                         monthly_std_dev_max)
+                         monthly_std_dev_max,
+                         rng)
 
         daily_baseline_seizure_diary = \
             np.int_(generate_baseline_seizure_diary(monthly_mean, 
                                                     monthly_std_dev,
                                                     num_baseline_months,
                                                     baseline_time_scaling_const,
-                                                    minimum_required_baseline_seizure_count))
+                                                    minimum_required_baseline_seizure_count,
+                                                    rng))
 
         monthly_mean_hat    =          np.int_(np.round(baseline_time_scaling_const*np.mean(daily_baseline_seizure_diary)))
         monthly_std_dev_hat =  np.int_(np.round(np.sqrt(baseline_time_scaling_const)*np.std(daily_baseline_seizure_diary)))
@@ -89,44 +93,42 @@ def generate_percent_change_data(num_theo_patients_in_placebo_arm,
                                  placebo_mu,
                                  placebo_sigma,
                                  drug_mu,
-                                 drug_sigma):
-
-    baseline_time_scaling_const = 1
-    testing_time_scaling_const  = 1
-
-    [placebo_arm_monthly_baseline_seizure_diaries, 
-     placebo_arm_monthly_testing_seizure_diaries  ] = \
-         generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_in_placebo_arm,
-                                                        theo_placebo_arm_patient_pop_params,
-                                                        num_baseline_months,
-                                                        num_testing_months,
-                                                        baseline_time_scaling_const,
-                                                        testing_time_scaling_const,
-                                                        minimum_required_baseline_seizure_count,
-                                                        placebo_mu,
-                                                        placebo_sigma)
-    
-    [drug_arm_monthly_baseline_seizure_diaries, 
-     drug_arm_monthly_testing_seizure_diaries  ] = \
-         generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_in_drug_arm,
-                                                     theo_drug_arm_patient_pop_params,
-                                                     num_baseline_months,
-                                                     num_testing_months,
-                                                     baseline_time_scaling_const,
-                                                     testing_time_scaling_const,
-                                                     minimum_required_baseline_seizure_count,
-                                                     placebo_mu,
-                                                     placebo_sigma,
-                                                     drug_mu,
-                                                     drug_sigma)
-    
-    placebo_arm_percent_changes = \
-        calculate_percent_changes(placebo_arm_monthly_baseline_seizure_diaries,
-                                  placebo_arm_monthly_testing_seizure_diaries)
-
-    drug_arm_percent_changes = \
-        calculate_percent_changes(drug_arm_monthly_baseline_seizure_diaries,
-                                  drug_arm_monthly_testing_seizure_diaries)
+                                 drug_sigma,
+                                 placebo_arm_rng,
+                                 drug_arm_rng):
+
+    testing_time_scaling_const = 1
+
+    # each trial arm is drawn from its own random stream, and only MPC is requested, so only the monthly testing periods are generated
+    [placebo_arm_percent_changes, _, _] = \
+        simulate_trial_arm_endpoints(num_theo_patients_in_placebo_arm,
+                                     theo_placebo_arm_patient_pop_params,
+                                     num_baseline_months,
+                                     num_testing_months,
+                                     testing_time_scaling_const,
+                                     minimum_required_baseline_seizure_count,
+                                     placebo_mu,
+                                     placebo_sigma,
+                                     drug_mu,
+                                     drug_sigma,
+                                     'placebo',
+                                     placebo_arm_rng,
+                                     ['MPC'])
+
+    [drug_arm_percent_changes, _, _] = \
+        simulate_trial_arm_endpoints(num_theo_patients_in_drug_arm,
+                                     theo_drug_arm_patient_pop_params,
+                                     num_baseline_months,
+                                     num_testing_months,
+                                     testing_time_scaling_const,
+                                     minimum_required_baseline_seizure_count,
+                                     placebo_mu,
+                                     placebo_sigma,
+                                     drug_mu,
+                                     drug_sigma,
+                                     'drug',
+                                     drug_arm_rng,
+                                     ['MPC'])
     
     return [placebo_arm_percent_changes, 
             drug_arm_percent_changes]
@@ -142,51 +144,47 @@ def generate_prerandomization_data(num_theo_patients_in_placebo_arm,
                                    placebo_mu,
                                    placebo_sigma,
                                    drug_mu,
-                                   drug_sigma):
+                                   drug_sigma,
+                                   placebo_arm_rng,
+                                   drug_arm_rng):
 
-    baseline_time_scaling_const = 1
     testing_time_scaling_const  = 28
-    num_testing_days = testing_time_scaling_const*num_testing_months
-
-    [placebo_arm_monthly_baseline_seizure_diaries, 
-     placebo_arm_daily_testing_seizure_diaries  ] = \
-         generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_in_placebo_arm,
-                                                        theo_placebo_arm_patient_pop_params,
-                                                        num_baseline_months,
-                                                        num_testing_months,
-                                                        baseline_time_scaling_const,
-                                                        testing_time_scaling_const,
-                                                        minimum_required_baseline_seizure_count,
-                                                        placebo_mu,
-                                                        placebo_sigma)
-    
-    [drug_arm_monthly_baseline_seizure_diaries, 
-     drug_arm_daily_testing_seizure_diaries  ] = \
-         generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_in_drug_arm,
-                                                     theo_drug_arm_patient_pop_params,
-                                                     num_baseline_months,
-                                                     num_testing_months,
-                                                     baseline_time_scaling_const,
-                                                     testing_time_scaling_const,
-                                                     minimum_required_baseline_seizure_count,
-                                                     placebo_mu,
-                                                     placebo_sigma,
-                                                     drug_mu,
-                                                     drug_sigma)
-
-    [placebo_arm_TTP_times, 
-     placebo_arm_observed_array] = \
-         calculate_time_to_prerandomizations(placebo_arm_monthly_baseline_seizure_diaries,
-                                             placebo_arm_daily_testing_seizure_diaries,
-                                             num_theo_patients_in_placebo_arm,
-                                             num_testing_days)
 
-    [drug_arm_TTP_times, 
+    # each trial arm is drawn from its own random stream, and only TTP is requested, so each daily testing period is only 
+    # generated up until its time to prerandomization
+    [_, 
+     placebo_arm_TTP_times, 
+     placebo_arm_observed_array] = \
+         simulate_trial_arm_endpoints(num_theo_patients_in_placebo_arm,
+                                      theo_placebo_arm_patient_pop_params,
+                                      num_baseline_months,
+                                      num_testing_months,
+                                      testing_time_scaling_const,
+                                      minimum_required_baseline_seizure_count,
+                                      placebo_mu,
+                                      placebo_sigma,
+                                      drug_mu,
+                                      drug_sigma,
+                                      'placebo',
+                                      placebo_arm_rng,
+                                      ['TTP'])
+
+    [_, 
+     drug_arm_TTP_times, 
      drug_arm_observed_array] = \
-         calculate_time_to_prerandomizations(drug_arm_monthly_baseline_seizure_diaries,
-                                             drug_arm_daily_testing_seizure_diaries,
-                                             num_theo_patients_in_drug_arm,
-                                             num_testing_days)
+         simulate_trial_arm_endpoints(num_theo_patients_in_drug_arm,
+                                      theo_drug_arm_patient_pop_params,
+                                      num_baseline_months,
+                                      num_testing_months,
+                                      testing_time_scaling_const,
+                                      minimum_required_baseline_seizure_count,
+                                      placebo_mu,
+                                      placebo_sigma,
+                                      drug_mu,
+                                      drug_sigma,
+                                      'drug',
+                                      drug_arm_rng,
+                                      ['TTP'])
 
     return [placebo_arm_TTP_times, 
             placebo_arm_observed_array,
@@ -194,7 +192,7 @@ def generate_prerandomization_data(num_theo_patients_in_placebo_arm,
             drug_arm_observed_array]              
 
 
-def generate_trial_p_value(placebo_arm_theo_patient_pop_list,
+def generate_trial_success(placebo_arm_theo_patient_pop_list,
                            drug_arm_theo_patient_pop_list,
                            endpoint_name,
                            num_baseline_months,
@@ -203,7 +201,10 @@ def generate_trial_p_value(placebo_arm_theo_patient_pop_list,
                            placebo_mu,
                            placebo_sigma,
                            drug_mu,
-                           drug_sigma):
+                           drug_sigma,
+                           trial_random_streams):
+
+    [placebo_arm_rng, drug_arm_rng] = next(trial_random_streams)
 
     num_theo_patients_in_placebo_arm = len(placebo_arm_theo_patient_pop_list)
     num_theo_patients_in_drug_arm    = len(drug_arm_theo_patient_pop_list)
@@ -227,7 +228,9 @@ def generate_trial_p_value(placebo_arm_theo_patient_pop_list,
                                             placebo_mu,
                                             placebo_sigma,
                                             drug_mu,
-                                            drug_sigma)
+                                            drug_sigma,
+                                            placebo_arm_rng,
+                                            drug_arm_rng)
         
         TTP_p_value = \
             calculate_logrank_p_value(placebo_arm_TTP_times, 
@@ -235,7 +238,7 @@ def generate_trial_p_value(placebo_arm_theo_patient_pop_list,
                                       drug_arm_TTP_times, 
                                       drug_arm_observed_array)
         
-        return TTP_p_value
+        return TTP_p_value < 0.05
 
     else:
 
@@ -251,15 +254,20 @@ def generate_trial_p_value(placebo_arm_theo_patient_pop_list,
                                           placebo_mu,
                                           placebo_sigma,
                                           drug_mu,
-                                          drug_sigma)
+                                          drug_sigma,
+                                          placebo_arm_rng,
+                                          drug_arm_rng)
         
         if(endpoint_name == 'RR50'):
 
-            RR50_p_value = \
-                calculate_fisher_exact_p_value(placebo_arm_percent_changes,
-                                               drug_arm_percent_changes)
+            # whether or not the trial is successful only depends on its numbers of responders, so it is looked up instead of tested
+            RR50_trial_success = \
+                calculate_RR50_trial_successes(np.sum(placebo_arm_percent_changes >= 0.5),
+                                               num_theo_patients_in_placebo_arm,
+                                               np.sum(drug_arm_percent_changes >= 0.5),
+                                               num_theo_patients_in_drug_arm)
         
-            return RR50_p_value
+            return bool(RR50_trial_success)
 
         elif(endpoint_name == 'MPC'):
 
@@ -267,7 +275,7 @@ def generate_trial_p_value(placebo_arm_theo_patient_pop_list,
                 calculate_Mann_Whitney_U_p_value(placebo_arm_percent_changes,
                                                  drug_arm_percent_changes)
             
-            return MPC_p_value
+            return MPC_p_value < 0.05
 
 
 def estimate_statistical_power(placebo_arm_theo_patient_pop_list,
@@ -280,14 +288,15 @@ def estimate_statistical_power(placebo_arm_theo_patient_pop_list,
                                placebo_sigma,
                                drug_mu,
                                drug_sigma,
-                               num_trials):
+                               num_trials,
+                               trial_random_streams):
 
-    p_value_array = np.zeros(num_trials)
+    trial_success_array = np.zeros(num_trials, dtype=bool)
 
     for trial_index in range(num_trials):
 
-        p_value = \
-            generate_trial_p_value(placebo_arm_theo_patient_pop_list,
+        trial_success = \
+            generate_trial_success(placebo_arm_theo_patient_pop_list,
                                    drug_arm_theo_patient_pop_list,
                                    endpoint_name,
                                    num_baseline_months,
@@ -296,11 +305,12 @@ def estimate_statistical_power(placebo_arm_theo_patient_pop_list,
                                    placebo_mu,
                                    placebo_sigma,
                                    drug_mu,
-                                   drug_sigma)
+                                   drug_sigma,
+                                   trial_random_streams)
 
-        p_value_array[trial_index] = p_value
+        trial_success_array[trial_index] = trial_success
 
-    stat_power = np.sum(p_value_array <= 0.05)/num_trials
+    stat_power = np.sum(trial_success_array)/num_trials
 
     return stat_power
 
@@ -320,7 +330,8 @@ def calculate_SNR(monthly_mean_hat,
                   drug_mu,
                   drug_sigma,
                   num_trials,
-                  SNR_num_extra_patients_per_trial_arm):
+                  SNR_num_extra_patients_per_trial_arm,
+                  trial_random_streams):
 
     #if(trial_arm == 'placebo'):
 
@@ -341,7 +352,8 @@ def calculate_SNR(monthly_mean_hat,
                                    placebo_sigma,
                                    drug_mu,
                                    drug_sigma,
-                                   num_trials)
+                                   num_trials,
+                                   trial_random_streams)
     
     #if(trial_arm == 'drug'):
 
@@ -362,7 +374,8 @@ def calculate_SNR(monthly_mean_hat,
                                    placebo_sigma,
                                    drug_mu,
                                    drug_sigma,
-                                   num_trials)
+                                   num_trials,
+                                   trial_random_streams)
     
     SNR = (placebo_enhanced_stat_power + drug_enhanced_stat_power)/2 - stat_power
 
@@ -374,7 +387,8 @@ def initialize_algorithm(monthly_mean_min,
                          monthly_std_dev_min,
                          monthly_std_dev_max,
                          num_baseline_months,
-                         minimum_required_baseline_seizure_count):
+                         minimum_required_baseline_seizure_count,
+                         rng):
 
     stat_power = 0
     trial_arm  = 'placebo'
@@ -389,7 +403,8 @@ def initialize_algorithm(monthly_mean_min,
                               monthly_std_dev_min,
                               monthly_std_dev_max,
                               num_baseline_months,
-                              minimum_required_baseline_seizure_count)
+                              minimum_required_baseline_seizure_count,
+                              rng)
 
     placebo_arm_theo_patient_pop_list.append([monthly_mean_hat, monthly_std_dev_hat])
 
@@ -400,7 +415,8 @@ def initialize_algorithm(monthly_mean_min,
                               monthly_std_dev_min,
                               monthly_std_dev_max,
                               num_baseline_months,
-                              minimum_required_baseline_seizure_count)
+                              minimum_required_baseline_seizure_count,
+                              rng)
 
     drug_arm_theo_patient_pop_list.append([monthly_mean_hat, monthly_std_dev_hat])
 
@@ -424,7 +440,9 @@ def dumb_algorithm(monthly_mean_min,
                    drug_sigma, 
                    target_stat_power, 
                    num_trials, 
-                   SNR_num_extra_patients_per_trial_arm):
+                   SNR_num_extra_patients_per_trial_arm,
+                   population_rng,
+                   trial_random_streams):
 
     num_patients = 0
 
@@ -437,7 +455,8 @@ def dumb_algorithm(monthly_mean_min,
                               monthly_std_dev_min,
                               monthly_std_dev_max,
                               num_baseline_months,
-                              minimum_required_baseline_seizure_count)
+                              minimum_required_baseline_seizure_count,
+                              population_rng)
     
     while(stat_power < target_stat_power):
             
@@ -448,7 +467,8 @@ def dumb_algorithm(monthly_mean_min,
                                   monthly_std_dev_min,
                                   monthly_std_dev_max,
                                   num_baseline_months,
-                                  minimum_required_baseline_seizure_count)
+                                  minimum_required_baseline_seizure_count,
+                                  population_rng)
 
         if(trial_arm == 'placebo'):
             placebo_arm_theo_patient_pop_list.append([monthly_mean_hat, monthly_std_dev_hat])
@@ -472,7 +492,8 @@ def dumb_algorithm(monthly_mean_min,
                                            placebo_sigma,
                                            drug_mu,
                                            drug_sigma,
-                                           num_trials)
+                                           num_trials,
+                                           trial_random_streams)
         
             print('\nstatistical power: ' + str(np.round(100*stat_power, 3)) + ' %' + \
                   ', total number of patients: ' + str(len(placebo_arm_theo_patient_pop_list) + len(drug_arm_theo_patient_pop_list)) + \
@@ -496,7 +517,9 @@ def smart_algorithm(monthly_mean_min,
                     drug_sigma,
                     target_stat_power,
                     num_trials,
-                    SNR_num_extra_patients_per_trial_arm):
+                    SNR_num_extra_patients_per_trial_arm,
+                    population_rng,
+                    trial_random_streams):
 
     num_patients = 0
     num_rejected = 0
@@ -510,7 +533,8 @@ def smart_algorithm(monthly_mean_min,
                               monthly_std_dev_min,
                               monthly_std_dev_max,
                               num_baseline_months,
-                              minimum_required_baseline_seizure_count)
+                              minimum_required_baseline_seizure_count,
+                              population_rng)
     
     while(stat_power < target_stat_power):
             
@@ -521,7 +545,8 @@ def smart_algorithm(monthly_mean_min,
                                   monthly_std_dev_min,
                                   monthly_std_dev_max,
                                   num_baseline_months,
-                                  minimum_required_baseline_seizure_count)
+                                  minimum_required_baseline_seizure_count,
+                                  population_rng)
         
         SNR = \
             calculate_SNR(monthly_mean_hat, 
@@ -539,7 +564,8 @@ def smart_algorithm(monthly_mean_min,
                           drug_mu,
                           drug_sigma,
                           num_trials,
-                          SNR_num_extra_patients_per_trial_arm)
+                          SNR_num_extra_patients_per_trial_arm,
+                          trial_random_streams)
 
         if(SNR > 0):
 
@@ -564,7 +590,8 @@ def smart_algorithm(monthly_mean_min,
                                            placebo_sigma,
                                            drug_mu,
                                            drug_sigma,
-                                           num_trials)
+                                           num_trials,
+                                           trial_random_streams)
 
             if(num_patients_is_multiple):
 
@@ -628,6 +655,11 @@ def take_inputs_from_command_shell():
     smart_or_dumb  =     sys.argv[17]
     endpoint_name  =     sys.argv[18]
 
+    # random number generation parameters
+    if(len(sys.argv) > 19):
+        base_seed = int(sys.argv[19])
+    else:
+        base_seed = generate_base_seed()
 
     return [monthly_mean_min,    monthly_mean_max,
             monthly_std_dev_min, monthly_std_dev_max,
@@ -636,7 +668,8 @@ def take_inputs_from_command_shell():
             minimum_required_baseline_seizure_count,
             placebo_mu, placebo_sigma, drug_mu, drug_sigma,
             target_stat_power, smart_or_dumb, num_trials,
-            SNR_num_extra_patients_per_trial_arm]
+            SNR_num_extra_patients_per_trial_arm,
+            base_seed]
 
 
 if(__name__=='__main__'):
@@ -648,9 +681,17 @@ if(__name__=='__main__'):
      minimum_required_baseline_seizure_count,
      placebo_mu, placebo_sigma, drug_mu, drug_sigma,
      target_stat_power, smart_or_dumb, num_trials,
-     SNR_num_extra_patients_per_trial_arm] = \
+     SNR_num_extra_patients_per_trial_arm,
+     base_seed] = \
          take_inputs_from_command_shell()
 
+    print('\nbase seed: ' + str(base_seed) + '\n')
+
+    # each (O2 attempt number, iteration index) job is keyed like a (block number, file index) job of keras_data_generation: the patients 
+    # that get enrolled are drawn from its population stream, while every trial that it simulates gets its own placebo arm and drug arm streams
+    population_rng = get_random_stream(base_seed, O2_attempt_num, iter_index, 0, 'population')
+    trial_random_streams = iterate_trial_random_streams(base_seed, O2_attempt_num, iter_index)
+
     if(smart_or_dumb == 'dumb'):
 
         num_patients = \
@@ -668,7 +709,9 @@ if(__name__=='__main__'):
                            drug_sigma, 
                            target_stat_power, 
                            num_trials, 
-                           SNR_num_extra_patients_per_trial_arm)
+                           SNR_num_extra_patients_per_trial_arm,
+                           population_rng,
+                           trial_random_streams)
 
     elif(smart_or_dumb == 'smart'):
 
@@ -687,7 +730,9 @@ if(__name__=='__main__'):
                             drug_sigma,
                             target_stat_power,
                             num_trials,
-                            SNR_num_extra_patients_per_trial_arm)
+                            SNR_num_extra_patients_per_trial_arm,
+                            population_rng,
+                            trial_random_streams)
 
     save_results(endpoint_name, 
                  smart_or_dumb, 
@@ -5,118 +5,83 @@ import keras.models as models
 import json
 sys.path.insert(0, os.getcwd())
 from utility_code.patient_population_generation import generate_theo_patient_pop_params
-from utility_code.patient_population_generation import convert_theo_pop_hist
+from utility_code.patient_population_generation import convert_theo_pop_hists
+from utility_code.random_streams import generate_base_seed
+from utility_code.random_streams import get_random_stream
 
 
-def generate_hists_with_and_without_loc(monthly_mean_min,
-                                        monthly_mean_max,
-                                        monthly_std_dev_min,
-                                        monthly_std_dev_max,
-                                        current_monthly_mean,
-                                        current_monthly_std_dev,
-                                        num_theo_patients_per_trial_arm_in_snr_map,
-                                        num_theo_patients_per_trial_arm_in_snr_map_loc,
-                                        loc_in_placebo_or_drug):
+def generate_keras_formatted_hists_with_and_without_loc(monthly_mean_min,
+                                                        monthly_mean_max,
+                                                        monthly_std_dev_min,
+                                                        monthly_std_dev_max,
+                                                        num_hists_per_trial_arm,
+                                                        current_monthly_mean,
+                                                        current_monthly_std_dev,
+                                                        num_theo_patients_per_trial_arm_in_snr_map,
+                                                        num_theo_patients_per_trial_arm_in_snr_map_loc,
+                                                        loc_in_placebo_or_drug,
+                                                        rng):
 
     if(loc_in_placebo_or_drug != 'placebo' and loc_in_placebo_or_drug != 'drug'):
 
         raise ValueError("The \'loc_in_placebo_or_drug\' parameter must either be \'placebo\' or \'drug\'")
 
+    # generate the patients of every histogram at once, as (hists x patients x 2) tensors
     theo_placebo_arm_patient_pop_params_wo_loc = \
         generate_theo_patient_pop_params(monthly_mean_min,
                                          monthly_mean_max,
                                          monthly_std_dev_min,
                                          monthly_std_dev_max,
-                                         num_theo_patients_per_trial_arm_in_snr_map)
+                                         num_hists_per_trial_arm*num_theo_patients_per_trial_arm_in_snr_map,
+                                         rng).reshape((num_hists_per_trial_arm, num_theo_patients_per_trial_arm_in_snr_map, 2))
     
     theo_drug_arm_patient_pop_params_wo_loc = \
         generate_theo_patient_pop_params(monthly_mean_min,
                                          monthly_mean_max,
                                          monthly_std_dev_min,
                                          monthly_std_dev_max,
-                                         num_theo_patients_per_trial_arm_in_snr_map)
+                                         num_hists_per_trial_arm*num_theo_patients_per_trial_arm_in_snr_map,
+                                         rng).reshape((num_hists_per_trial_arm, num_theo_patients_per_trial_arm_in_snr_map, 2))
 
-    theo_placebo_arm_patient_pop_params_with_loc = np.copy(theo_placebo_arm_patient_pop_params_wo_loc)
-    theo_drug_arm_patient_pop_params_with_loc    = np.copy(theo_drug_arm_patient_pop_params_wo_loc)
+    theo_placebo_arm_patient_pop_params_with_loc = theo_placebo_arm_patient_pop_params_wo_loc
+    theo_drug_arm_patient_pop_params_with_loc    = theo_drug_arm_patient_pop_params_wo_loc
 
-    patient_pop_params_per_one_loc = np.transpose(np.vstack([np.full(num_theo_patients_per_trial_arm_in_snr_map_loc, current_monthly_mean),
-                                                             np.full(num_theo_patients_per_trial_arm_in_snr_map_loc, current_monthly_std_dev)]))
+    patient_pop_params_per_one_loc = np.zeros((num_hists_per_trial_arm, num_theo_patients_per_trial_arm_in_snr_map_loc, 2))
+    patient_pop_params_per_one_loc[:, :, 0] = current_monthly_mean
+    patient_pop_params_per_one_loc[:, :, 1] = current_monthly_std_dev
 
     if(loc_in_placebo_or_drug == 'placebo'):
-        theo_placebo_arm_patient_pop_params_with_loc = np.vstack([theo_placebo_arm_patient_pop_params_with_loc, patient_pop_params_per_one_loc])
+        theo_placebo_arm_patient_pop_params_with_loc = np.concatenate([theo_placebo_arm_patient_pop_params_wo_loc, patient_pop_params_per_one_loc], 1)
     elif(loc_in_placebo_or_drug == 'drug'):
-        theo_drug_arm_patient_pop_params_with_loc    = np.vstack([theo_drug_arm_patient_pop_params_with_loc,    patient_pop_params_per_one_loc])
-
-    theo_placebo_arm_trial_arm_pop_wo_loc_hist = \
-        convert_theo_pop_hist(1,
-                              16,
-                              1,
-                              16,
-                              theo_placebo_arm_patient_pop_params_wo_loc)
-    
-    theo_drug_arm_trial_arm_pop_wo_loc_hist = \
-        convert_theo_pop_hist(1,
-                              16,
-                              1,
-                              16,
-                              theo_drug_arm_patient_pop_params_wo_loc)
-
-    theo_placebo_arm_trial_arm_pop_with_loc_hist = \
-        convert_theo_pop_hist(1,
-                              16,
-                              1,
-                              16,
-                              theo_placebo_arm_patient_pop_params_with_loc)
-    
-    theo_drug_arm_trial_arm_pop_with_loc_hist = \
-        convert_theo_pop_hist(1,
-                              16,
-                              1,
-                              16,
-                              theo_drug_arm_patient_pop_params_with_loc)
-    
-    return [theo_placebo_arm_trial_arm_pop_wo_loc_hist,
-            theo_drug_arm_trial_arm_pop_wo_loc_hist,
-            theo_placebo_arm_trial_arm_pop_with_loc_hist,
-            theo_drug_arm_trial_arm_pop_with_loc_hist]
+        theo_drug_arm_patient_pop_params_with_loc    = np.concatenate([theo_drug_arm_patient_pop_params_wo_loc,    patient_pop_params_per_one_loc], 1)
 
+    keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists = \
+        convert_theo_pop_hists(1,
+                               16,
+                               1,
+                               16,
+                               theo_placebo_arm_patient_pop_params_wo_loc)
+    
+    keras_formatted_theo_drug_arm_trial_arm_pop_wo_loc_hists = \
+        convert_theo_pop_hists(1,
+                               16,
+                               1,
+                               16,
+                               theo_drug_arm_patient_pop_params_wo_loc)
 
-def generate_keras_formatted_hists_with_and_without_loc(monthly_mean_min,
-                                                        monthly_mean_max,
-                                                        monthly_std_dev_min,
-                                                        monthly_std_dev_max,
-                                                        num_hists_per_trial_arm,
-                                                        current_monthly_mean,
-                                                        current_monthly_std_dev,
-                                                        num_theo_patients_per_trial_arm_in_snr_map,
-                                                        num_theo_patients_per_trial_arm_in_snr_map_loc,
-                                                        loc_in_placebo_or_drug):
+    keras_formatted_theo_placebo_arm_trial_arm_pop_with_loc_hists = \
+        convert_theo_pop_hists(1,
+                               16,
+                               1,
+                               16,
+                               theo_placebo_arm_patient_pop_params_with_loc)
     
-    keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists   = np.zeros((num_hists_per_trial_arm, 16, 16, 1))
-    keras_formatted_theo_drug_arm_trial_arm_pop_wo_loc_hists      = np.zeros((num_hists_per_trial_arm, 16, 16, 1))
-    keras_formatted_theo_placebo_arm_trial_arm_pop_with_loc_hists = np.zeros((num_hists_per_trial_arm, 16, 16, 1))
-    keras_formatted_theo_drug_arm_trial_arm_pop_with_loc_hists    = np.zeros((num_hists_per_trial_arm, 16, 16, 1))
-
-    for hist_index in range(num_hists_per_trial_arm):
-
-        [tmp_theo_placebo_arm_trial_arm_pop_wo_loc_hist,
-         tmp_theo_drug_arm_trial_arm_pop_wo_loc_hist,
-         tmp_theo_placebo_arm_trial_arm_pop_with_loc_hist,
-         tmp_theo_drug_arm_trial_arm_pop_with_loc_hist] = \
-             generate_hists_with_and_without_loc(monthly_mean_min,
-                                                 monthly_mean_max,
-                                                 monthly_std_dev_min,
-                                                 monthly_std_dev_max,
-                                                 current_monthly_mean,
-                                                 current_monthly_std_dev,
-                                                 num_theo_patients_per_trial_arm_in_snr_map,
-                                                 num_theo_patients_per_trial_arm_in_snr_map_loc,
-                                                 loc_in_placebo_or_drug)
-
-        keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists[hist_index, :, :, 0]   = tmp_theo_placebo_arm_trial_arm_pop_wo_loc_hist
-        keras_formatted_theo_drug_arm_trial_arm_pop_wo_loc_hists[hist_index, :, :, 0]      = tmp_theo_drug_arm_trial_arm_pop_wo_loc_hist
-        keras_formatted_theo_placebo_arm_trial_arm_pop_with_loc_hists[hist_index, :, :, 0] = tmp_theo_placebo_arm_trial_arm_pop_with_loc_hist
-        keras_formatted_theo_drug_arm_trial_arm_pop_with_loc_hists[hist_index, :, :, 0]    = tmp_theo_drug_arm_trial_arm_pop_with_loc_hist
+    keras_formatted_theo_drug_arm_trial_arm_pop_with_loc_hists = \
+        convert_theo_pop_hists(1,
+                               16,
+                               1,
+                               16,
+                               theo_drug_arm_patient_pop_params_with_loc)
 
     return [keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists,
             keras_formatted_theo_drug_arm_trial_arm_pop_wo_loc_hists,
@@ -132,7 +97,8 @@ def generate_keras_formatted_hists(monthly_mean_min,
                                    current_monthly_mean,
                                    current_monthly_std_dev,
                                    num_theo_patients_per_trial_arm_in_snr_map,
-                                   num_theo_patients_per_trial_arm_in_snr_map_loc):
+                                   num_theo_patients_per_trial_arm_in_snr_map_loc,
+                                   rng):
 
     [keras_formatted_theo_placebo_arm_trial_arm_pop_wo_placebo_loc_hists,
      keras_formatted_theo_drug_arm_trial_arm_pop_wo_placebo_loc_hists,
@@ -147,7 +113,8 @@ def generate_keras_formatted_hists(monthly_mean_min,
                                                              current_monthly_std_dev,
                                                              num_theo_patients_per_trial_arm_in_snr_map,
                                                              num_theo_patients_per_trial_arm_in_snr_map_loc,
-                                                             'placebo')
+                                                             'placebo',
+                                                             rng)
     
     [keras_formatted_theo_placebo_arm_trial_arm_pop_wo_drug_loc_hists,
      keras_formatted_theo_drug_arm_trial_arm_pop_wo_drug_loc_hists,
@@ -162,7 +129,8 @@ def generate_keras_formatted_hists(monthly_mean_min,
                                                              current_monthly_std_dev,
                                                              num_theo_patients_per_trial_arm_in_snr_map,
                                                              num_theo_patients_per_trial_arm_in_snr_map_loc,
-                                                             'drug')
+                                                             'drug',
+                                                             rng)
     
     keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists = \
         np.concatenate([keras_formatted_theo_placebo_arm_trial_arm_pop_wo_placebo_loc_hists, 
@@ -195,7 +163,8 @@ def generate_SNRs_for_loc(monthly_mean_min,
                           current_monthly_std_dev,
                           num_theo_patients_per_trial_arm_in_snr_map,
                           num_theo_patients_per_trial_arm_in_snr_map_loc,
-                          stat_power_model):
+                          stat_power_model,
+                          rng):
 
     [keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists,
      keras_formatted_theo_drug_arm_trial_arm_pop_wo_loc_hists,
@@ -209,7 +178,8 @@ def generate_SNRs_for_loc(monthly_mean_min,
                                         current_monthly_mean,
                                         current_monthly_std_dev,
                                         num_theo_patients_per_trial_arm_in_snr_map,
-                                        num_theo_patients_per_trial_arm_in_snr_map_loc)
+                                        num_theo_patients_per_trial_arm_in_snr_map_loc,
+                                        rng)
 
     stat_power_predictions_wo_loc = \
         np.squeeze(stat_power_model.predict([keras_formatted_theo_placebo_arm_trial_arm_pop_wo_loc_hists, 
@@ -232,7 +202,8 @@ def generate_SNR_map(monthly_mean_min,
                      num_hists_per_trial_arm,
                      num_theo_patients_per_trial_arm_in_snr_map,
                      num_theo_patients_per_trial_arm_in_snr_map_loc,
-                     endpoint_name):
+                     endpoint_name,
+                     rng):
 
     '''
 
@@ -264,7 +235,8 @@ def generate_SNR_map(monthly_mean_min,
                                            monthly_std_dev,
                                            num_theo_patients_per_trial_arm_in_snr_map,
                                            num_theo_patients_per_trial_arm_in_snr_map_loc,
-                                           stat_power_model)
+                                           stat_power_model,
+                                           rng)
                 
                 print('[' + str(monthly_mean) + ', ' + str(monthly_std_dev) + ']: ' + str(np.round(SNR_at_loc, 3)) + \
                       ', ' + str(np.round(stat_power_with_loc, 3))  + ', ' + str(np.round(stat_power_wo_loc, 3)))    
@@ -284,10 +256,16 @@ def take_inputs_from_command_shell():
 
     endpoint_name = sys.argv[4]
 
+    if(len(sys.argv) > 5):
+        base_seed = int(sys.argv[5])
+    else:
+        base_seed = generate_base_seed()
+
     return [num_theo_patients_per_trial_arm_in_snr_map,
             num_theo_patients_per_trial_arm_in_snr_map_loc,
             num_hists_per_trial_arm,
-            endpoint_name]
+            endpoint_name,
+            base_seed]
 
 
 if (__name__=="__main__"):
@@ -300,9 +278,14 @@ if (__name__=="__main__"):
     [num_theo_patients_per_trial_arm_in_snr_map,
      num_theo_patients_per_trial_arm_in_snr_map_loc,
      num_hists_per_trial_arm,
-     endpoint_name] = \
+     endpoint_name,
+     base_seed] = \
          take_inputs_from_command_shell()
 
+    print('\nbase seed: ' + str(base_seed) + '\n')
+
+    rng = get_random_stream(base_seed, 0, 0, 0, 'population')
+
     SNR_map = \
         generate_SNR_map(monthly_mean_min,
                          monthly_mean_max,
@@ -311,7 +294,8 @@ if (__name__=="__main__"):
                          num_hists_per_trial_arm,
                          num_theo_patients_per_trial_arm_in_snr_map,
                          num_theo_patients_per_trial_arm_in_snr_map_loc,
-                         endpoint_name)
+                         endpoint_name,
+                         rng)
     
     
     with open(endpoint_name + '_SNR_data.json', 'w+') as json_file:
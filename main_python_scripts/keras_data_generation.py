@@ -6,14 +6,13 @@ import sys
 sys.path.insert(0, os.getcwd())
 from utility_code.patient_population_generation import randomly_select_theo_patient_pop
 from utility_code.patient_population_generation import generate_theo_patient_pop_params
-from utility_code.patient_population_generation import generate_heterogeneous_placebo_arm_patient_pop
-from utility_code.patient_population_generation import generate_heterogeneous_drug_arm_patient_pop
-from utility_code.patient_population_generation import convert_theo_pop_hist
-from utility_code.endpoint_functions import calculate_percent_changes
-from utility_code.endpoint_functions import calculate_time_to_prerandomizations
-from utility_code.endpoint_functions import calculate_fisher_exact_p_value
-from utility_code.endpoint_functions import calculate_Mann_Whitney_U_p_value
-from utility_code.endpoint_functions import calculate_logrank_p_value
+from utility_code.patient_population_generation import convert_theo_pop_hists_per_trial_arm_size
+from utility_code.trial_streaming import iterate_trials
+from utility_code.rejection_regions import calculate_RR50_trial_successes
+from utility_code.endpoint_functions import calculate_Mann_Whitney_U_p_values_per_trial_arm_size
+from utility_code.endpoint_functions import calculate_logrank_p_values_per_trial_arm_size
+from utility_code.random_streams import generate_base_seed
+from utility_code.random_streams import get_random_stream
 
 
 
@@ -21,136 +20,29 @@ def generate_theo_patient_pop_params_per_trial_arm(monthly_mean_min,
                                                    monthly_mean_max,
                                                    monthly_std_dev_min,
                                                    monthly_std_dev_max,
-                                                   num_theo_patients_per_trial_arm):
+                                                   num_theo_patients_per_trial_arm,
+                                                   rng):
 
     theo_placebo_arm_patient_pop_params = \
         generate_theo_patient_pop_params(monthly_mean_min,
                                          monthly_mean_max,
                                          monthly_std_dev_min,
                                          monthly_std_dev_max,
-                                         num_theo_patients_per_trial_arm)
+                                         num_theo_patients_per_trial_arm,
+                                         rng)
 
     theo_drug_arm_patient_pop_params = \
         generate_theo_patient_pop_params(monthly_mean_min,
                                          monthly_mean_max,
                                          monthly_std_dev_min,
                                          monthly_std_dev_max,
-                                         num_theo_patients_per_trial_arm)
+                                         num_theo_patients_per_trial_arm,
+                                         rng)
     
     return [theo_placebo_arm_patient_pop_params, theo_drug_arm_patient_pop_params]
 
 
-def generate_seizure_diaries_per_trial_arm(num_theo_patients_per_trial_arm,
-                                           theo_placebo_arm_patient_pop_params,
-                                           theo_drug_arm_patient_pop_params,
-                                           num_baseline_months,
-                                           num_testing_months,
-                                           baseline_time_scaling_const,
-                                           testing_time_scaling_const,
-                                           minimum_required_baseline_seizure_count,
-                                           placebo_mu,
-                                           placebo_sigma,
-                                           drug_mu,
-                                           drug_sigma):
-
-    [placebo_arm_baseline_monthly_seizure_diaries, 
-     placebo_arm_testing_daily_seizure_diaries  ] = \
-         generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                        theo_placebo_arm_patient_pop_params,
-                                                        num_baseline_months,
-                                                        num_testing_months,
-                                                        baseline_time_scaling_const,
-                                                        testing_time_scaling_const,
-                                                        minimum_required_baseline_seizure_count,
-                                                        placebo_mu,
-                                                        placebo_sigma)
-
-    [drug_arm_baseline_monthly_seizure_diaries, 
-     drug_arm_testing_daily_seizure_diaries  ] = \
-         generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                     theo_drug_arm_patient_pop_params,
-                                                     num_baseline_months,
-                                                     num_testing_months,
-                                                     baseline_time_scaling_const,
-                                                     testing_time_scaling_const,
-                                                     minimum_required_baseline_seizure_count,
-                                                     placebo_mu,
-                                                     placebo_sigma,
-                                                     drug_mu,
-                                                     drug_sigma)
-    
-    placebo_arm_testing_monthly_seizure_diaries = \
-        np.sum(placebo_arm_testing_daily_seizure_diaries.reshape((num_theo_patients_per_trial_arm,
-                                                                  num_testing_months,
-                                                                  testing_time_scaling_const)), 2)
-    
-    drug_arm_testing_monthly_seizure_diaries = \
-        np.sum(drug_arm_testing_daily_seizure_diaries.reshape((num_theo_patients_per_trial_arm,
-                                                               num_testing_months, 
-                                                               testing_time_scaling_const)), 2)
-
-    return [placebo_arm_baseline_monthly_seizure_diaries,
-            placebo_arm_testing_daily_seizure_diaries,
-            placebo_arm_testing_monthly_seizure_diaries,
-            drug_arm_baseline_monthly_seizure_diaries,
-            drug_arm_testing_daily_seizure_diaries,
-            drug_arm_testing_monthly_seizure_diaries]
-
-
-def calculate_endpoints(num_testing_months,
-                        testing_time_scaling_const,
-                        num_theo_patients_per_trial_arm,
-                        placebo_arm_baseline_monthly_seizure_diaries,
-                        placebo_arm_testing_monthly_seizure_diaries,
-                        placebo_arm_testing_daily_seizure_diaries,
-                        drug_arm_baseline_monthly_seizure_diaries,
-                        drug_arm_testing_monthly_seizure_diaries,
-                        drug_arm_testing_daily_seizure_diaries):
-
-    num_testing_days = num_testing_months*testing_time_scaling_const
-
-    placebo_arm_percent_changes = \
-            calculate_percent_changes(placebo_arm_baseline_monthly_seizure_diaries,
-                                      placebo_arm_testing_monthly_seizure_diaries)
-    
-    drug_arm_percent_changes = \
-            calculate_percent_changes(drug_arm_baseline_monthly_seizure_diaries,
-                                      drug_arm_testing_monthly_seizure_diaries)
-
-    [placebo_arm_TTP_times, placebo_arm_observed_array] = \
-            calculate_time_to_prerandomizations(placebo_arm_baseline_monthly_seizure_diaries,
-                                                placebo_arm_testing_daily_seizure_diaries,
-                                                num_theo_patients_per_trial_arm,
-                                                num_testing_days)
-    
-    [drug_arm_TTP_times, drug_arm_observed_array] = \
-            calculate_time_to_prerandomizations(drug_arm_baseline_monthly_seizure_diaries,
-                                                drug_arm_testing_daily_seizure_diaries,
-                                                num_theo_patients_per_trial_arm,
-                                                num_testing_days)
-    
-    '''
-    RR50_p_value = \
-            calculate_fisher_exact_p_value(placebo_arm_percent_changes,
-                                           drug_arm_percent_changes)
-
-    MPC_p_value = \
-            calculate_Mann_Whitney_U_p_value(placebo_arm_percent_changes,
-                                             drug_arm_percent_changes)
-    
-    TTP_p_value = \
-            calculate_logrank_p_value(placebo_arm_TTP_times, 
-                                      placebo_arm_observed_array, 
-                                      drug_arm_TTP_times, 
-                                      drug_arm_observed_array)
-    '''
-    
-    return [placebo_arm_percent_changes, drug_arm_percent_changes,
-            placebo_arm_TTP_times,       placebo_arm_observed_array,
-            drug_arm_TTP_times,          drug_arm_observed_array]
-
-
-def calculate_trial_successes(patient_num,
+def calculate_trial_successes(patient_nums,
                               placebo_arm_percent_changes,
                               drug_arm_percent_changes,
                               placebo_arm_TTP_times,
@@ -158,21 +50,33 @@ def calculate_trial_successes(patient_num,
                               drug_arm_TTP_times,
                               drug_arm_observed_array):
 
-    RR50_p_value = \
-        calculate_fisher_exact_p_value(placebo_arm_percent_changes[0:patient_num],
-                                       drug_arm_percent_changes[0:patient_num])
-
-    MPC_p_value = \
-        calculate_Mann_Whitney_U_p_value(placebo_arm_percent_changes[0:patient_num],
-                                         drug_arm_percent_changes[0:patient_num])
+    # the number of responders in the first patient_num patients of each trial arm, for every trial arm size at once
+    num_placebo_arm_responders = np.cumsum(placebo_arm_percent_changes >= 0.5)[patient_nums - 1]
+    num_drug_arm_responders    = np.cumsum(drug_arm_percent_changes    >= 0.5)[patient_nums - 1]
+
+    # whether or not each trial arm size is successful according to RR50 only depends on its numbers of responders
+    RR50_trial_successes = \
+        calculate_RR50_trial_successes(num_placebo_arm_responders,
+                                       patient_nums,
+                                       num_drug_arm_responders,
+                                       patient_nums)
+
+    MPC_p_values = \
+        calculate_Mann_Whitney_U_p_values_per_trial_arm_size(placebo_arm_percent_changes,
+                                                             drug_arm_percent_changes,
+                                                             patient_nums)
+    
+    TTP_p_values = \
+        calculate_logrank_p_values_per_trial_arm_size(placebo_arm_TTP_times, 
+                                                      placebo_arm_observed_array, 
+                                                      drug_arm_TTP_times, 
+                                                      drug_arm_observed_array,
+                                                      patient_nums)
     
-    TTP_p_value = \
-        calculate_logrank_p_value(placebo_arm_TTP_times[0:patient_num], 
-                                  placebo_arm_observed_array[0:patient_num], 
-                                  drug_arm_TTP_times[0:patient_num], 
-                                  drug_arm_observed_array[0:patient_num])
+    MPC_trial_successes = MPC_p_values < 0.05
+    TTP_trial_successes = TTP_p_values < 0.05
     
-    return [RR50_p_value, MPC_p_value, TTP_p_value]
+    return [RR50_trial_successes, MPC_trial_successes, TTP_trial_successes]
 
 
 def generate_powers_and_histograms(monthly_mean_lower_bound,
@@ -190,10 +94,19 @@ def generate_powers_and_histograms(monthly_mean_lower_bound,
                                    placebo_sigma,
                                    drug_mu,
                                    drug_sigma,
-                                   num_trials):
+                                   num_trials,
+                                   base_seed,
+                                   block_num,
+                                   file_index):
+
+    if(baseline_time_scaling_const != 1):
+
+        raise ValueError('The endpoints are calculated from monthly baseline seizure diaries, so the \'baseline_time_scaling_const\' parameter must be 1.')
 
     algorithm_start_time_in_seconds = time.time()
 
+    population_rng = get_random_stream(base_seed, block_num, file_index, 0, 'population')
+
     [monthly_mean_min, 
      monthly_mean_max,
      monthly_std_dev_min, 
@@ -201,7 +114,8 @@ def generate_powers_and_histograms(monthly_mean_lower_bound,
          randomly_select_theo_patient_pop(monthly_mean_lower_bound,
                                           monthly_mean_upper_bound,
                                           monthly_std_dev_lower_bound,
-                                          monthly_std_dev_upper_bound)
+                                          monthly_std_dev_upper_bound,
+                                          population_rng)
 
     print('\n' + str([monthly_mean_min, monthly_mean_max, monthly_std_dev_min, monthly_std_dev_max]) + '\n')
 
@@ -211,108 +125,88 @@ def generate_powers_and_histograms(monthly_mean_lower_bound,
                                                         monthly_mean_max,
                                                         monthly_std_dev_min,
                                                         monthly_std_dev_max,
-                                                        max_theo_patients_per_trial_arm)
+                                                        max_theo_patients_per_trial_arm,
+                                                        population_rng)
 
     patient_nums = np.arange(theo_patients_per_trial_arm_step, max_theo_patients_per_trial_arm + theo_patients_per_trial_arm_step, theo_patients_per_trial_arm_step)
     num_trial_arm_sizes = len(patient_nums)
 
-    RR50_p_value_matrix = np.zeros((num_trial_arm_sizes, num_trials))
-    MPC_p_value_matrix  = np.zeros((num_trial_arm_sizes, num_trials))
-    TTP_p_value_matrix  = np.zeros((num_trial_arm_sizes, num_trials))
-
-    for trial_index in range(num_trials):
-
-        endpoint_start_time_in_seconds = time.time()
-
-        [placebo_arm_baseline_monthly_seizure_diaries,
-         placebo_arm_testing_daily_seizure_diaries,
-         placebo_arm_testing_monthly_seizure_diaries,
-         drug_arm_baseline_monthly_seizure_diaries,
-         drug_arm_testing_daily_seizure_diaries,
-         drug_arm_testing_monthly_seizure_diaries] = \
-             generate_seizure_diaries_per_trial_arm(max_theo_patients_per_trial_arm,
-                                                    theo_placebo_arm_patient_pop_params,
-                                                    theo_drug_arm_patient_pop_params,
-                                                    num_baseline_months,
-                                                    num_testing_months,
-                                                    baseline_time_scaling_const,
-                                                    testing_time_scaling_const,
-                                                    minimum_required_baseline_seizure_count,
-                                                    placebo_mu,
-                                                    placebo_sigma,
-                                                    drug_mu,
-                                                    drug_sigma)
-
-        [placebo_arm_percent_changes, drug_arm_percent_changes,
-         placebo_arm_TTP_times,       placebo_arm_observed_array,
-         drug_arm_TTP_times,          drug_arm_observed_array] = \
-             calculate_endpoints(num_testing_months,
-                                 testing_time_scaling_const,
-                                 max_theo_patients_per_trial_arm,
-                                 placebo_arm_baseline_monthly_seizure_diaries,
-                                 placebo_arm_testing_monthly_seizure_diaries,
-                                 placebo_arm_testing_daily_seizure_diaries,
-                                 drug_arm_baseline_monthly_seizure_diaries,
-                                 drug_arm_testing_monthly_seizure_diaries,
-                                 drug_arm_testing_daily_seizure_diaries)
+    # the number of successful trials at each trial arm size is accumulated as soon as each trial is simulated
+    RR50_num_successful_trials = np.zeros(num_trial_arm_sizes)
+    MPC_num_successful_trials  = np.zeros(num_trial_arm_sizes)
+    TTP_num_successful_trials  = np.zeros(num_trial_arm_sizes)
+
+    trials = \
+        iterate_trials(max_theo_patients_per_trial_arm,
+                       theo_placebo_arm_patient_pop_params,
+                       theo_drug_arm_patient_pop_params,
+                       num_baseline_months,
+                       num_testing_months,
+                       testing_time_scaling_const,
+                       minimum_required_baseline_seizure_count,
+                       placebo_mu,
+                       placebo_sigma,
+                       drug_mu,
+                       drug_sigma,
+                       num_trials,
+                       base_seed=base_seed,
+                       block_num=block_num,
+                       file_index=file_index)
+
+    endpoint_start_time_in_seconds = time.time()
+
+    for [trial_index,
+         [placebo_arm_percent_changes, placebo_arm_TTP_times, placebo_arm_observed_array],
+         [drug_arm_percent_changes,    drug_arm_TTP_times,    drug_arm_observed_array]] in trials:
         
         endpoint_stop_time_in_seconds = time.time()
         endpoint_calc_runtime_in_seconds_str = str(np.round(endpoint_stop_time_in_seconds - endpoint_start_time_in_seconds, 3))
         print( 'trial # ' + str(trial_index + 1) + ' runtime: ' + endpoint_calc_runtime_in_seconds_str + ' seconds')
         
-        for patient_num_index in range(num_trial_arm_sizes):
-
-            patient_num = patient_nums[patient_num_index]
-
-            p_value_calc_start_time = time.time()
-
-            [RR50_p_value, MPC_p_value, TTP_p_value] = \
-                calculate_trial_successes(patient_num,
-                                          placebo_arm_percent_changes[0:patient_num],
-                                          drug_arm_percent_changes[0:patient_num],
-                                          placebo_arm_TTP_times[0:patient_num],
-                                          placebo_arm_observed_array[0:patient_num],
-                                          drug_arm_TTP_times[0:patient_num],
-                                          drug_arm_observed_array[0:patient_num])
-            
-            p_value_calc_stop_time = time.time()
-            p_value_calc_runtime_in_seconds_str = str(np.round(p_value_calc_stop_time - p_value_calc_start_time, 3))
-            print( 'trial arm size ' + str(patient_num) + ' runtime: ' + p_value_calc_runtime_in_seconds_str + ' seconds')
+        p_value_calc_start_time = time.time()
+
+        [RR50_trial_successes, MPC_trial_successes, TTP_trial_successes] = \
+            calculate_trial_successes(patient_nums,
+                                      placebo_arm_percent_changes,
+                                      drug_arm_percent_changes,
+                                      placebo_arm_TTP_times,
+                                      placebo_arm_observed_array,
+                                      drug_arm_TTP_times,
+                                      drug_arm_observed_array)
+        
+        p_value_calc_stop_time = time.time()
+        p_value_calc_runtime_in_seconds_str = str(np.round(p_value_calc_stop_time - p_value_calc_start_time, 3))
+        print( 'p-values of every trial arm size runtime: ' + p_value_calc_runtime_in_seconds_str + ' seconds')
 
-            RR50_p_value_matrix[patient_num_index, trial_index] = RR50_p_value < 0.05
-            MPC_p_value_matrix[patient_num_index, trial_index]  = MPC_p_value  < 0.05
-            TTP_p_value_matrix[patient_num_index, trial_index]  = TTP_p_value  < 0.05
+        RR50_num_successful_trials += RR50_trial_successes
+        MPC_num_successful_trials  += MPC_trial_successes
+        TTP_num_successful_trials  += TTP_trial_successes
 
         algorithm_stop_time_in_seconds = time.time()
         algorithm_cumulative_runtime_in_minutes_str = str(np.round((algorithm_stop_time_in_seconds - algorithm_start_time_in_seconds)/60, 3))
         print('algorithm cumulative runtime: ' + algorithm_cumulative_runtime_in_minutes_str + ' minutes')
-    
-    RR50_stat_powers = np.mean(RR50_p_value_matrix, 1)
-    MPC_stat_powers  = np.mean(MPC_p_value_matrix,  1)
-    TTP_stat_powers  = np.mean(TTP_p_value_matrix,  1)
-
-    num_monthly_std_devs = monthly_std_dev_upper_bound - monthly_std_dev_lower_bound + 1
-    num_monthly_means    = monthly_mean_upper_bound    - monthly_mean_lower_bound    + 1
-    theo_placebo_arm_patient_pop_hists = np.zeros((num_monthly_std_devs, num_monthly_means, num_trial_arm_sizes))
-    theo_drug_arm_patient_pop_hists    = np.zeros((num_monthly_std_devs, num_monthly_means, num_trial_arm_sizes))
-
-    for patient_num_index in range(num_trial_arm_sizes):
-
-        patient_num = patient_nums[patient_num_index]
 
-        theo_placebo_arm_patient_pop_hists[:, :, patient_num_index] = \
-            convert_theo_pop_hist(monthly_mean_lower_bound,
-                                  monthly_mean_upper_bound,
-                                  monthly_std_dev_lower_bound,
-                                  monthly_std_dev_upper_bound,
-                                  theo_placebo_arm_patient_pop_params[0:patient_num])
-        
-        theo_drug_arm_patient_pop_hists[:, :, patient_num_index] = \
-            convert_theo_pop_hist(monthly_mean_lower_bound,
-                                  monthly_mean_upper_bound,
-                                  monthly_std_dev_lower_bound,
-                                  monthly_std_dev_upper_bound,
-                                  theo_drug_arm_patient_pop_params[0:patient_num])
+        endpoint_start_time_in_seconds = time.time()
+    
+    RR50_stat_powers = RR50_num_successful_trials/num_trials
+    MPC_stat_powers  = MPC_num_successful_trials/num_trials
+    TTP_stat_powers  = TTP_num_successful_trials/num_trials
+
+    theo_placebo_arm_patient_pop_hists = \
+        convert_theo_pop_hists_per_trial_arm_size(monthly_mean_lower_bound,
+                                                  monthly_mean_upper_bound,
+                                                  monthly_std_dev_lower_bound,
+                                                  monthly_std_dev_upper_bound,
+                                                  theo_placebo_arm_patient_pop_params,
+                                                  patient_nums)
+
+    theo_drug_arm_patient_pop_hists = \
+        convert_theo_pop_hists_per_trial_arm_size(monthly_mean_lower_bound,
+                                                  monthly_mean_upper_bound,
+                                                  monthly_std_dev_lower_bound,
+                                                  monthly_std_dev_upper_bound,
+                                                  theo_drug_arm_patient_pop_params,
+                                                  patient_nums)
     
     algorithm_stop_time_in_seconds = time.time()
     algorithm_runtime_in_minutes_str = str(np.round((algorithm_stop_time_in_seconds - algorithm_start_time_in_seconds)/60, 3))
@@ -386,6 +280,11 @@ def take_input_arguments_from_command_shell():
     data_storage_folder_name = sys.argv[18]
     file_index_str = sys.argv[19]
 
+    if(len(sys.argv) > 20):
+        base_seed = int(sys.argv[20])
+    else:
+        base_seed = generate_base_seed()
+
     return [monthly_mean_lower_bound,    
             monthly_mean_upper_bound,
             monthly_std_dev_lower_bound, 
@@ -399,7 +298,8 @@ def take_input_arguments_from_command_shell():
             placebo_mu, placebo_sigma,
             drug_mu,    drug_sigma,
             num_trials, block_num_str, 
-            data_storage_folder_name, file_index_str]
+            data_storage_folder_name, file_index_str,
+            base_seed]
 
 
 if(__name__=='__main__'):
@@ -417,10 +317,11 @@ if(__name__=='__main__'):
      placebo_mu, placebo_sigma,
      drug_mu,    drug_sigma,
      num_trials, block_num_str, 
-     data_storage_folder_name, file_index_str] = \
+     data_storage_folder_name, file_index_str,
+     base_seed] = \
          take_input_arguments_from_command_shell()
 
-    print('\n' + data_storage_folder_name + '\n\nblock #' + block_num_str + '\n')
+    print('\n' + data_storage_folder_name + '\n\nblock #' + block_num_str + '\n\nbase seed: ' + str(base_seed) + '\n')
 
     [RR50_stat_powers, MPC_stat_powers, TTP_stat_powers, 
      theo_placebo_arm_patient_pop_hists, 
@@ -440,7 +341,10 @@ if(__name__=='__main__'):
                                         placebo_sigma,
                                         drug_mu,
                                         drug_sigma,
-                                        num_trials)
+                                        num_trials,
+                                        base_seed,
+                                        int(block_num_str),
+                                        int(file_index_str))
     
     store_powers_and_histograms(data_storage_folder_name,
                                 file_index_str,
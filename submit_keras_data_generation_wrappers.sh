@@ -30,6 +30,10 @@ drug_sigma=0.05
 
 num_trials=2000
 
+# the random streams of every trial are keyed on these seeds together with the block number, file index and trial index
+training_base_seed=1072020
+testing_base_seed=1072021
+
 starting_block=281
 num_blocks=50
 num_training_files_per_block=15
@@ -69,6 +73,7 @@ do
     inputs[16]=$block_num
 
     inputs[17]="${data_storage_folder_name}/training_data"
+    inputs[19]=$training_base_seed
 
     for ((file_index=1; file_index<=$num_training_files_per_block; file_index=file_index+1))
     do
@@ -79,6 +84,7 @@ do
     done
 
     inputs[17]="${data_storage_folder_name}/testing_data"
+    inputs[19]=$testing_base_seed
 
     for ((file_index=1; file_index<=$num_testing_files_per_block; file_index=file_index+1))
     do
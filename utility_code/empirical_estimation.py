@@ -2,13 +2,44 @@ import numpy as np
 #import time
 from .patient_population_generation import randomly_select_theo_patient_pop
 from .patient_population_generation import generate_theo_patient_pop_params
-from .patient_population_generation import generate_heterogeneous_placebo_arm_patient_pop
-from .patient_population_generation import generate_heterogeneous_drug_arm_patient_pop
+from .patient_population_generation import generate_heterogeneous_trial_arm_tensors
+from .endpoint_simulation import allocate_seizure_diary_buffers
+from .endpoint_simulation import simulate_trial_arm_endpoints_with_numpy
+from .endpoint_simulation import simulate_trial_arm_endpoints_for_effect_scenarios
+from .trial_streaming import calculate_max_patients_per_chunk
+from .random_streams import get_random_stream
 from .endpoint_functions import calculate_percent_changes
-from .endpoint_functions import calculate_time_to_prerandomizations
-from .endpoint_functions import calculate_fisher_exact_p_value
-from .endpoint_functions import calculate_Mann_Whitney_U_p_value
-from .endpoint_functions import calculate_logrank_p_value
+from .endpoint_functions import calculate_fisher_exact_p_values
+from .endpoint_functions import calculate_Mann_Whitney_U_p_values
+from .endpoint_functions import calculate_logrank_p_values
+
+
+# the default maximum amount of memory that the seizure diaries of one chunk of trials can use
+default_max_memory_in_bytes = 256*2**20
+
+# a rough upper bound on the number of bytes needed per patient, trial arm pair and effect scenario to hold the endpoints of a 
+# chunk of trials and to reduce them to p-values: four float64 and two boolean endpoint arrays, plus the temporaries of the tests
+bytes_per_patient_endpoint = 256
+
+
+def calculate_num_trials_per_chunk(num_trials,
+                                   num_theo_patients_per_trial_arm,
+                                   num_baseline_months,
+                                   num_testing_months,
+                                   testing_time_scaling_const,
+                                   max_memory_in_bytes):
+
+    # as many trials as fit into max_memory_in_bytes are generated at once (see trial_streaming.calculate_max_patients_per_chunk), 
+    # but always at least one, and never more than there are trials
+    max_patients_per_chunk = \
+        calculate_max_patients_per_chunk(num_baseline_months,
+                                         num_testing_months,
+                                         testing_time_scaling_const,
+                                         max_memory_in_bytes)
+
+    num_trials_per_chunk = min(num_trials, max(1, max_patients_per_chunk//num_theo_patients_per_trial_arm))
+
+    return num_trials_per_chunk
 
 
 def empirically_estimate_RR50_statistical_power(theo_placebo_arm_patient_pop_params,
@@ -21,55 +52,81 @@ def empirically_estimate_RR50_statistical_power(theo_placebo_arm_patient_pop_par
                                                 placebo_sigma,
                                                 drug_mu,
                                                 drug_sigma,
-                                                num_trials):
+                                                num_trials,
+                                                rng=None,
+                                                max_memory_in_bytes=default_max_memory_in_bytes):
 
-    RR50_p_values = np.zeros(num_trials)
+    RR50_num_successful_trials = 0
     baseline_time_scaling_const = 1
     testing_time_scaling_const  = 1
 
-    for trial_index in range(num_trials):
-        
-        [placebo_arm_baseline_seizure_diaries, 
-         placebo_arm_testing_seizure_diaries  ] = \
-             generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                           theo_placebo_arm_patient_pop_params,
-                                                           num_baseline_months,
-                                                           num_testing_months,
-                                                           baseline_time_scaling_const,
-                                                           testing_time_scaling_const,
-                                                           minimum_required_baseline_seizure_count,
-                                                           placebo_mu,
-                                                           placebo_sigma)
-    
-        [drug_arm_baseline_seizure_diaries, 
-         drug_arm_testing_seizure_diaries  ] = \
-             generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                        theo_drug_arm_patient_pop_params,
-                                                        num_baseline_months,
-                                                        num_testing_months,
-                                                        baseline_time_scaling_const,
-                                                        testing_time_scaling_const,
-                                                        minimum_required_baseline_seizure_count,
-                                                        placebo_mu,
-                                                        placebo_sigma,
-                                                        drug_mu,
-                                                        drug_sigma)
+    # RR50 only needs the monthly testing periods, so as many trials are generated at once as fit into max_memory_in_bytes
+    num_trials_per_chunk = \
+        calculate_num_trials_per_chunk(num_trials,
+                                       num_theo_patients_per_trial_arm,
+                                       num_baseline_months,
+                                       num_testing_months,
+                                       testing_time_scaling_const,
+                                       max_memory_in_bytes)
+
+    # both trial arms of every chunk are generated in the same buffers, one after the other
+    seizure_diary_buffers = \
+        allocate_seizure_diary_buffers(num_trials_per_chunk*num_theo_patients_per_trial_arm,
+                                       num_baseline_months,
+                                       num_testing_months,
+                                       testing_time_scaling_const)
+
+    for chunk_start_trial_index in range(0, num_trials, num_trials_per_chunk):
+
+        num_trials_in_chunk = min(num_trials_per_chunk, num_trials - chunk_start_trial_index)
+
+        [placebo_arm_baseline_seizure_diary_tensor, 
+         placebo_arm_testing_seizure_diary_tensor  ] = \
+             generate_heterogeneous_trial_arm_tensors(num_trials_in_chunk,
+                                                      num_theo_patients_per_trial_arm,
+                                                      theo_placebo_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu],
+                                                      [placebo_sigma],
+                                                      rng,
+                                                      False,
+                                                      seizure_diary_buffers)
 
         placebo_arm_percent_changes = \
-            calculate_percent_changes(placebo_arm_baseline_seizure_diaries,
-                                      placebo_arm_testing_seizure_diaries)
-    
+            calculate_percent_changes(placebo_arm_baseline_seizure_diary_tensor,
+                                      placebo_arm_testing_seizure_diary_tensor)
+
+        [drug_arm_baseline_seizure_diary_tensor, 
+         drug_arm_testing_seizure_diary_tensor  ] = \
+             generate_heterogeneous_trial_arm_tensors(num_trials_in_chunk,
+                                                      num_theo_patients_per_trial_arm,
+                                                      theo_drug_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu, drug_mu],
+                                                      [placebo_sigma, drug_sigma],
+                                                      rng,
+                                                      False,
+                                                      seizure_diary_buffers)
+
         drug_arm_percent_changes = \
-            calculate_percent_changes(drug_arm_baseline_seizure_diaries,
-                                      drug_arm_testing_seizure_diaries)
-
-        RR50_p_value = \
-            calculate_fisher_exact_p_value(placebo_arm_percent_changes,
-                                           drug_arm_percent_changes)
-        
-        RR50_p_values[trial_index] = RR50_p_value
+            calculate_percent_changes(drug_arm_baseline_seizure_diary_tensor,
+                                      drug_arm_testing_seizure_diary_tensor)
+
+        RR50_p_values = \
+            calculate_fisher_exact_p_values(placebo_arm_percent_changes,
+                                            drug_arm_percent_changes)
+
+        RR50_num_successful_trials = RR50_num_successful_trials + np.sum(RR50_p_values < 0.05)
     
-    RR50_emp_stat_power = np.sum(RR50_p_values < 0.05)/num_trials
+    RR50_emp_stat_power = RR50_num_successful_trials/num_trials
 
     return RR50_emp_stat_power
 
@@ -84,55 +141,81 @@ def empirically_estimate_MPC_statistical_power(theo_placebo_arm_patient_pop_para
                                                placebo_sigma,
                                                drug_mu,
                                                drug_sigma,
-                                               num_trials):
-    
-    MPC_p_values = np.zeros(num_trials)
+                                               num_trials,
+                                               rng=None,
+                                               max_memory_in_bytes=default_max_memory_in_bytes):
+
+    MPC_num_successful_trials = 0
     baseline_time_scaling_const = 1
     testing_time_scaling_const  = 1
 
-    for trial_index in range(num_trials):
-        
-        [placebo_arm_baseline_seizure_diaries, 
-         placebo_arm_testing_seizure_diaries  ] = \
-             generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                           theo_placebo_arm_patient_pop_params,
-                                                           num_baseline_months,
-                                                           num_testing_months,
-                                                           baseline_time_scaling_const,
-                                                           testing_time_scaling_const,
-                                                           minimum_required_baseline_seizure_count,
-                                                           placebo_mu,
-                                                           placebo_sigma)
-    
-        [drug_arm_baseline_seizure_diaries, 
-         drug_arm_testing_seizure_diaries  ] = \
-             generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                        theo_drug_arm_patient_pop_params,
-                                                        num_baseline_months,
-                                                        num_testing_months,
-                                                        baseline_time_scaling_const,
-                                                        testing_time_scaling_const,
-                                                        minimum_required_baseline_seizure_count,
-                                                        placebo_mu,
-                                                        placebo_sigma,
-                                                        drug_mu,
-                                                        drug_sigma)
+    # MPC only needs the monthly testing periods, so as many trials are generated at once as fit into max_memory_in_bytes
+    num_trials_per_chunk = \
+        calculate_num_trials_per_chunk(num_trials,
+                                       num_theo_patients_per_trial_arm,
+                                       num_baseline_months,
+                                       num_testing_months,
+                                       testing_time_scaling_const,
+                                       max_memory_in_bytes)
+
+    # both trial arms of every chunk are generated in the same buffers, one after the other
+    seizure_diary_buffers = \
+        allocate_seizure_diary_buffers(num_trials_per_chunk*num_theo_patients_per_trial_arm,
+                                       num_baseline_months,
+                                       num_testing_months,
+                                       testing_time_scaling_const)
+
+    for chunk_start_trial_index in range(0, num_trials, num_trials_per_chunk):
+
+        num_trials_in_chunk = min(num_trials_per_chunk, num_trials - chunk_start_trial_index)
+
+        [placebo_arm_baseline_seizure_diary_tensor, 
+         placebo_arm_testing_seizure_diary_tensor  ] = \
+             generate_heterogeneous_trial_arm_tensors(num_trials_in_chunk,
+                                                      num_theo_patients_per_trial_arm,
+                                                      theo_placebo_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu],
+                                                      [placebo_sigma],
+                                                      rng,
+                                                      False,
+                                                      seizure_diary_buffers)
 
         placebo_arm_percent_changes = \
-            calculate_percent_changes(placebo_arm_baseline_seizure_diaries,
-                                      placebo_arm_testing_seizure_diaries)
-    
+            calculate_percent_changes(placebo_arm_baseline_seizure_diary_tensor,
+                                      placebo_arm_testing_seizure_diary_tensor)
+
+        [drug_arm_baseline_seizure_diary_tensor, 
+         drug_arm_testing_seizure_diary_tensor  ] = \
+             generate_heterogeneous_trial_arm_tensors(num_trials_in_chunk,
+                                                      num_theo_patients_per_trial_arm,
+                                                      theo_drug_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu, drug_mu],
+                                                      [placebo_sigma, drug_sigma],
+                                                      rng,
+                                                      False,
+                                                      seizure_diary_buffers)
+
         drug_arm_percent_changes = \
-            calculate_percent_changes(drug_arm_baseline_seizure_diaries,
-                                      drug_arm_testing_seizure_diaries)
+            calculate_percent_changes(drug_arm_baseline_seizure_diary_tensor,
+                                      drug_arm_testing_seizure_diary_tensor)
 
-        MPC_p_value = \
-            calculate_Mann_Whitney_U_p_value(placebo_arm_percent_changes,
-                                             drug_arm_percent_changes)
+        MPC_p_values = \
+            calculate_Mann_Whitney_U_p_values(placebo_arm_percent_changes,
+                                              drug_arm_percent_changes)
 
-        MPC_p_values[trial_index] = MPC_p_value
+        MPC_num_successful_trials = MPC_num_successful_trials + np.sum(MPC_p_values < 0.05)
     
-    MPC_emp_stat_power = np.sum(MPC_p_values < 0.05)/num_trials
+    MPC_emp_stat_power = MPC_num_successful_trials/num_trials
 
     return MPC_emp_stat_power
 
@@ -147,62 +230,187 @@ def empirically_estimate_TTP_statistical_power(theo_placebo_arm_patient_pop_para
                                                placebo_sigma,
                                                drug_mu,
                                                drug_sigma,
-                                               num_trials):
+                                               num_trials,
+                                               rng=None,
+                                               max_memory_in_bytes=default_max_memory_in_bytes):
 
-    TTP_p_values = np.zeros(num_trials)
-    baseline_time_scaling_const = 1
+    TTP_num_successful_trials = 0
     testing_time_scaling_const = 28
-    num_testing_days = num_testing_months*testing_time_scaling_const
-
-    for trial_index in range(num_trials):
-
-        [placebo_arm_monthly_baseline_seizure_diaries, 
-         placebo_arm_daily_testing_seizure_diaries    ] = \
-             generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                           theo_placebo_arm_patient_pop_params,
-                                                           num_baseline_months,
-                                                           num_testing_months,
-                                                           baseline_time_scaling_const,
-                                                           testing_time_scaling_const,
-                                                           minimum_required_baseline_seizure_count,
-                                                           placebo_mu,
-                                                           placebo_sigma)
-    
-        [drug_arm_monthly_baseline_seizure_diaries, 
-         drug_arm_daily_testing_seizure_diaries    ] = \
-             generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_per_trial_arm,
-                                                        theo_drug_arm_patient_pop_params,
-                                                        num_baseline_months,
-                                                        num_testing_months,
-                                                        baseline_time_scaling_const,
-                                                        testing_time_scaling_const,
-                                                        minimum_required_baseline_seizure_count,
-                                                        placebo_mu,
-                                                        placebo_sigma,
-                                                        drug_mu,
-                                                        drug_sigma)
-
-        [placebo_arm_TTP_times, placebo_arm_observed_array] = \
-            calculate_time_to_prerandomizations(placebo_arm_monthly_baseline_seizure_diaries,
-                                                placebo_arm_daily_testing_seizure_diaries,
-                                                num_theo_patients_per_trial_arm,
-                                                num_testing_days)
-    
-        [drug_arm_TTP_times, drug_arm_observed_array] = \
-            calculate_time_to_prerandomizations(drug_arm_monthly_baseline_seizure_diaries,
-                                                drug_arm_daily_testing_seizure_diaries,
-                                                num_theo_patients_per_trial_arm,
-                                                num_testing_days)
-    
-        TTP_p_value = \
-            calculate_logrank_p_value(placebo_arm_TTP_times, 
-                                      placebo_arm_observed_array, 
-                                      drug_arm_TTP_times, 
-                                      drug_arm_observed_array)
-        
-        TTP_p_values[trial_index] = TTP_p_value
+
+    # each testing period is only generated one month at a time up until its time to prerandomization 
+    # (see endpoint_simulation.simulate_time_to_prerandomizations), so at most one month of it is ever held in memory
+    num_trials_per_chunk = \
+        calculate_num_trials_per_chunk(num_trials,
+                                       num_theo_patients_per_trial_arm,
+                                       num_baseline_months,
+                                       1,
+                                       testing_time_scaling_const,
+                                       max_memory_in_bytes)
+
+    # only the baseline buffer gets used, since the testing periods are never generated in full
+    seizure_diary_buffers = \
+        allocate_seizure_diary_buffers(num_trials_per_chunk*num_theo_patients_per_trial_arm,
+                                       num_baseline_months,
+                                       0,
+                                       testing_time_scaling_const)
+
+    for chunk_start_trial_index in range(0, num_trials, num_trials_per_chunk):
+
+        num_trials_in_chunk = min(num_trials_per_chunk, num_trials - chunk_start_trial_index)
+        num_theo_patients_in_chunk = num_trials_in_chunk*num_theo_patients_per_trial_arm
+
+        # the same trial arm is generated num_trials_in_chunk times over by stacking copies of its patients into one batch
+        theo_placebo_arm_chunk_patient_pop_params = \
+            np.tile(theo_placebo_arm_patient_pop_params[0:num_theo_patients_per_trial_arm, :], (num_trials_in_chunk, 1))
+        theo_drug_arm_chunk_patient_pop_params = \
+            np.tile(theo_drug_arm_patient_pop_params[0:num_theo_patients_per_trial_arm, :], (num_trials_in_chunk, 1))
+
+        [_, placebo_arm_TTP_times, placebo_arm_observed_array] = \
+            simulate_trial_arm_endpoints_with_numpy(num_theo_patients_in_chunk,
+                                                    theo_placebo_arm_chunk_patient_pop_params,
+                                                    num_baseline_months,
+                                                    num_testing_months,
+                                                    testing_time_scaling_const,
+                                                    minimum_required_baseline_seizure_count,
+                                                    [placebo_mu],
+                                                    [placebo_sigma],
+                                                    False,
+                                                    True,
+                                                    rng,
+                                                    seizure_diary_buffers)
+
+        [_, drug_arm_TTP_times, drug_arm_observed_array] = \
+            simulate_trial_arm_endpoints_with_numpy(num_theo_patients_in_chunk,
+                                                    theo_drug_arm_chunk_patient_pop_params,
+                                                    num_baseline_months,
+                                                    num_testing_months,
+                                                    testing_time_scaling_const,
+                                                    minimum_required_baseline_seizure_count,
+                                                    [placebo_mu, drug_mu],
+                                                    [placebo_sigma, drug_sigma],
+                                                    False,
+                                                    True,
+                                                    rng,
+                                                    seizure_diary_buffers)
+
+        # reshape the times to prerandomization into (trials x patients) arrays
+        tensor_shape = (num_trials_in_chunk, num_theo_patients_per_trial_arm)
+
+        TTP_p_values = \
+            calculate_logrank_p_values(placebo_arm_TTP_times.reshape(tensor_shape), 
+                                       placebo_arm_observed_array.reshape(tensor_shape), 
+                                       drug_arm_TTP_times.reshape(tensor_shape), 
+                                       drug_arm_observed_array.reshape(tensor_shape))
+
+        TTP_num_successful_trials = TTP_num_successful_trials + np.sum(TTP_p_values < 0.05)
     
-    TTP_emp_stat_power = np.sum(TTP_p_values < 0.05)/num_trials
+    TTP_emp_stat_power = TTP_num_successful_trials/num_trials
 
     return TTP_emp_stat_power
 
+
+def empirically_estimate_statistical_powers_for_effect_scenarios(theo_placebo_arm_patient_pop_params,
+                                                                 theo_drug_arm_patient_pop_params,
+                                                                 num_theo_patients_per_trial_arm,
+                                                                 num_baseline_months,
+                                                                 num_testing_months,
+                                                                 minimum_required_baseline_seizure_count,
+                                                                 effect_scenarios,
+                                                                 num_trials,
+                                                                 rng=None,
+                                                                 base_seed=None,
+                                                                 max_memory_in_bytes=default_max_memory_in_bytes):
+
+    # each effect scenario is a [placebo_mu, placebo_sigma, drug_mu, drug_sigma] list, and all scenarios share the same untreated trials
+    num_effect_scenarios = len(effect_scenarios)
+    testing_time_scaling_const = 28
+
+    # the endpoints of as many trials as fit into max_memory_in_bytes are reduced to p-values at once
+    bytes_per_trial = num_effect_scenarios*num_theo_patients_per_trial_arm*bytes_per_patient_endpoint
+    num_trials_per_chunk = min(num_trials, max(1, int(max_memory_in_bytes//bytes_per_trial)))
+
+    endpoint_shape = (num_effect_scenarios, num_trials_per_chunk, num_theo_patients_per_trial_arm)
+    placebo_arm_percent_changes = np.zeros(endpoint_shape)
+    drug_arm_percent_changes    = np.zeros(endpoint_shape)
+    placebo_arm_TTP_times       = np.zeros(endpoint_shape)
+    drug_arm_TTP_times          = np.zeros(endpoint_shape)
+    placebo_arm_observed_array  = np.zeros(endpoint_shape, dtype=bool)
+    drug_arm_observed_array     = np.zeros(endpoint_shape, dtype=bool)
+
+    RR50_num_successful_trials = np.zeros(num_effect_scenarios)
+    MPC_num_successful_trials  = np.zeros(num_effect_scenarios)
+    TTP_num_successful_trials  = np.zeros(num_effect_scenarios)
+
+    for chunk_start_trial_index in range(0, num_trials, num_trials_per_chunk):
+
+        num_trials_in_chunk = min(num_trials_per_chunk, num_trials - chunk_start_trial_index)
+
+        for chunk_trial_index in range(num_trials_in_chunk):
+
+            trial_index = chunk_start_trial_index + chunk_trial_index
+
+            # if base_seed is given, then each trial arm gets its own random stream, in the same way as trial_streaming.iterate_trials()
+            if(base_seed is None):
+                [placebo_arm_rng, drug_arm_rng] = [rng, rng]
+            else:
+                placebo_arm_rng = get_random_stream(base_seed, 0, 0, trial_index, 'placebo')
+                drug_arm_rng    = get_random_stream(base_seed, 0, 0, trial_index, 'drug')
+
+            placebo_arm_endpoints_per_scenario = \
+                simulate_trial_arm_endpoints_for_effect_scenarios(num_theo_patients_per_trial_arm,
+                                                                  theo_placebo_arm_patient_pop_params,
+                                                                  num_baseline_months,
+                                                                  num_testing_months,
+                                                                  testing_time_scaling_const,
+                                                                  minimum_required_baseline_seizure_count,
+                                                                  effect_scenarios,
+                                                                  'placebo',
+                                                                  placebo_arm_rng)
+
+            drug_arm_endpoints_per_scenario = \
+                simulate_trial_arm_endpoints_for_effect_scenarios(num_theo_patients_per_trial_arm,
+                                                                  theo_drug_arm_patient_pop_params,
+                                                                  num_baseline_months,
+                                                                  num_testing_months,
+                                                                  testing_time_scaling_const,
+                                                                  minimum_required_baseline_seizure_count,
+                                                                  effect_scenarios,
+                                                                  'drug',
+                                                                  drug_arm_rng)
+
+            for effect_scenario_index in range(num_effect_scenarios):
+
+                [placebo_arm_percent_changes[effect_scenario_index, chunk_trial_index],
+                 placebo_arm_TTP_times[effect_scenario_index, chunk_trial_index],
+                 placebo_arm_observed_array[effect_scenario_index, chunk_trial_index]] = \
+                     placebo_arm_endpoints_per_scenario[effect_scenario_index]
+
+                [drug_arm_percent_changes[effect_scenario_index, chunk_trial_index],
+                 drug_arm_TTP_times[effect_scenario_index, chunk_trial_index],
+                 drug_arm_observed_array[effect_scenario_index, chunk_trial_index]] = \
+                     drug_arm_endpoints_per_scenario[effect_scenario_index]
+
+        # one p-value per effect scenario and trial in the chunk
+        RR50_p_values = \
+            calculate_fisher_exact_p_values(placebo_arm_percent_changes[:, 0:num_trials_in_chunk],
+                                            drug_arm_percent_changes[:, 0:num_trials_in_chunk])
+
+        MPC_p_values = \
+            calculate_Mann_Whitney_U_p_values(placebo_arm_percent_changes[:, 0:num_trials_in_chunk],
+                                              drug_arm_percent_changes[:, 0:num_trials_in_chunk])
+
+        TTP_p_values = \
+            calculate_logrank_p_values(placebo_arm_TTP_times[:, 0:num_trials_in_chunk],
+                                       placebo_arm_observed_array[:, 0:num_trials_in_chunk],
+                                       drug_arm_TTP_times[:, 0:num_trials_in_chunk],
+                                       drug_arm_observed_array[:, 0:num_trials_in_chunk])
+
+        RR50_num_successful_trials = RR50_num_successful_trials + np.sum(RR50_p_values < 0.05, 1)
+        MPC_num_successful_trials  = MPC_num_successful_trials  + np.sum(MPC_p_values  < 0.05, 1)
+        TTP_num_successful_trials  = TTP_num_successful_trials  + np.sum(TTP_p_values  < 0.05, 1)
+
+    RR50_emp_stat_powers = RR50_num_successful_trials/num_trials
+    MPC_emp_stat_powers  = MPC_num_successful_trials/num_trials
+    TTP_emp_stat_powers  = TTP_num_successful_trials/num_trials
+
+    return [RR50_emp_stat_powers, MPC_emp_stat_powers, TTP_emp_stat_powers]
@@ -1,13 +1,22 @@
 import numpy as np
 import scipy.stats as stats
-from lifelines.statistics import logrank_test
+import scipy.special as special
+
+
+# the natural logarithms of 0!, 1!, 2!, ..., which are extended whenever a larger trial arm needs them
+log_factorials = np.zeros(1)
+
+# two hypergeometric probabilities which are within this relative tolerance of each other are treated as equal, so that
+# tables which are exactly as likely as the observed table are counted even with the rounding error of the log factorials
+fisher_exact_relative_tolerance = 1e-7
 
 
 def calculate_percent_changes(baseline_seizure_diaries,
                               testing_seizure_diaries):
 
-    baseline_seizure_frequencies = np.mean(baseline_seizure_diaries, 1)
-    testing_seizure_frequencies  = np.mean(testing_seizure_diaries, 1)
+    # the seizure frequencies are taken over the last axis, so that (trials x patients x months) tensors also work
+    baseline_seizure_frequencies = np.mean(baseline_seizure_diaries, -1)
+    testing_seizure_frequencies  = np.mean(testing_seizure_diaries, -1)
 
     baseline_seizure_frequencies[baseline_seizure_frequencies == 0] = 0.000001
     percent_changes = (baseline_seizure_frequencies - testing_seizure_frequencies)/baseline_seizure_frequencies
@@ -20,33 +29,23 @@ def calculate_time_to_prerandomizations(monthly_baseline_seizure_diaries,
                                         num_patients_in_trial_arm,
                                         num_testing_days):
 
-    TTP_times      = np.zeros(num_patients_in_trial_arm)
-    observed_array = np.zeros(num_patients_in_trial_arm)
-
-    baseline_monthly_seizure_frequencies = np.mean(monthly_baseline_seizure_diaries, 1)
-
-    for patient_index in range(num_patients_in_trial_arm):
-
-        baseline_monthly_seizure_frequency = baseline_monthly_seizure_frequencies[patient_index]
+    # only the first num_patients_in_trial_arm patients are used, and the patients can be stacked into (trials x patients) tensors
+    monthly_baseline_seizure_diaries = monthly_baseline_seizure_diaries[..., 0:num_patients_in_trial_arm, :]
+    daily_testing_seizure_diaries    = daily_testing_seizure_diaries[..., 0:num_patients_in_trial_arm, 0:num_testing_days]
 
-        daily_testing_seizure_diary = daily_testing_seizure_diaries[patient_index]
+    baseline_monthly_seizure_frequencies = np.mean(monthly_baseline_seizure_diaries, -1)
 
-        reached_count = False
-        day_index = 0
-        sum_count = 0
+    # each patient's prerandomization happens on the first day that their cumulative seizure count reaches their baseline monthly seizure frequency
+    cumulative_seizure_counts = np.cumsum(daily_testing_seizure_diaries, -1)
+    reached_count = cumulative_seizure_counts >= baseline_monthly_seizure_frequencies[..., np.newaxis]
 
-        while(not reached_count):
+    # every patient who has not reached their count by the last testing day is right-censored on that day, which also
+    # counts any patient who reaches their count on exactly the last testing day as right-censored
+    reached_count[..., num_testing_days - 1] = True
+    last_day_indices = np.argmax(reached_count, -1)
 
-            sum_count = sum_count + daily_testing_seizure_diary[day_index]
-
-            reached_count = sum_count >= baseline_monthly_seizure_frequency
-            right_censored = day_index == (num_testing_days - 1)
-            reached_count = reached_count or right_censored
-
-            day_index = day_index + 1
-        
-        TTP_times[patient_index] = day_index
-        observed_array[patient_index] = not right_censored
+    TTP_times      = (last_day_indices + 1).astype(float)
+    observed_array = (last_day_indices != (num_testing_days - 1)).astype(float)
 
     return [TTP_times, observed_array]
 
@@ -69,9 +68,191 @@ def calculate_fisher_exact_p_value(placebo_arm_percent_changes,
 def calculate_Mann_Whitney_U_p_value(placebo_arm_percent_changes,
                                      drug_arm_percent_changes):
 
-    [_, MPC_p_value] = stats.ranksums(placebo_arm_percent_changes, drug_arm_percent_changes)
+    MPC_p_value = \
+        calculate_Mann_Whitney_U_p_values(np.asarray(placebo_arm_percent_changes),
+                                          np.asarray(drug_arm_percent_changes))
+
+    return float(MPC_p_value)
+
+
+def get_log_factorials(max_num):
+
+    global log_factorials
+
+    if(len(log_factorials) <= max_num):
+        log_factorials = special.gammaln(np.arange(max_num + 1) + 1)
+
+    return log_factorials[0:max_num + 1]
+
+
+def calculate_fisher_exact_p_values_from_counts(num_placebo_arm_responders,
+                                                num_placebo_arm_patients,
+                                                num_drug_arm_responders,
+                                                num_drug_arm_patients):
+
+    # every input can be an array of any shape, as long as all of the inputs broadcast against each other
+    [num_placebo_arm_responders,
+     num_placebo_arm_patients,
+     num_drug_arm_responders,
+     num_drug_arm_patients] = \
+         np.broadcast_arrays(*[np.asarray(count, dtype=int) for count in [num_placebo_arm_responders,
+                                                                          num_placebo_arm_patients,
+                                                                          num_drug_arm_responders,
+                                                                          num_drug_arm_patients]])
+
+    num_patients   = num_placebo_arm_patients + num_drug_arm_patients
+    num_responders = num_placebo_arm_responders + num_drug_arm_responders
+
+    max_num_patients = int(np.max(num_patients, initial=0))
+    log_factorials = get_log_factorials(max_num_patients)
+
+    # the number of placebo arm responders in every table with the same margins as the observed table, as the last axis
+    possible_num_placebo_arm_responders = np.arange(int(np.max(num_placebo_arm_patients, initial=0)) + 1)
+
+    [num_placebo_arm_responders, 
+     num_placebo_arm_patients, 
+     num_drug_arm_patients, 
+     num_patients, 
+     num_responders] = \
+         [count[..., np.newaxis] for count in [num_placebo_arm_responders, 
+                                               num_placebo_arm_patients, 
+                                               num_drug_arm_patients, 
+                                               num_patients, 
+                                               num_responders]]
+    
+    possible_num_drug_arm_responders = num_responders - possible_num_placebo_arm_responders
+    possible_table_mask = (possible_num_placebo_arm_responders <= num_placebo_arm_patients) & \
+                          (possible_num_drug_arm_responders >= 0) & \
+                          (possible_num_drug_arm_responders <= num_drug_arm_patients)
+    
+    # the hypergeometric log probability of each table, with the impossible tables clipped into the log factorial table and then masked out
+    def calculate_log_binomial_coefficients(num_total, num_chosen):
+
+        num_chosen = np.clip(num_chosen, 0, num_total)
+
+        return log_factorials[num_total] - log_factorials[num_chosen] - log_factorials[num_total - num_chosen]
+
+    possible_table_log_probs = \
+        calculate_log_binomial_coefficients(num_placebo_arm_patients, possible_num_placebo_arm_responders) + \
+        calculate_log_binomial_coefficients(num_drug_arm_patients,    possible_num_drug_arm_responders) - \
+        calculate_log_binomial_coefficients(num_patients,             num_responders)
+    
+    observed_table_log_probs = \
+        calculate_log_binomial_coefficients(num_placebo_arm_patients, num_placebo_arm_responders) + \
+        calculate_log_binomial_coefficients(num_drug_arm_patients,    num_responders - num_placebo_arm_responders) - \
+        calculate_log_binomial_coefficients(num_patients,             num_responders)
+
+    # the two-sided p-value sums the probabilities of every table which is at most as likely as the observed table
+    possible_table_probs = np.exp(possible_table_log_probs)
+    at_most_as_likely = possible_table_mask & \
+                        (possible_table_log_probs <= observed_table_log_probs + np.log1p(fisher_exact_relative_tolerance))
+
+    RR50_p_values = np.minimum(np.sum(possible_table_probs, -1, where=at_most_as_likely), 1.0)
+
+    return RR50_p_values
+
+
+def calculate_fisher_exact_p_values(placebo_arm_percent_changes,
+                                    drug_arm_percent_changes):
+
+    # one p-value per trial, where each row of the inputs is one trial
+    num_placebo_arm_responders = np.sum(placebo_arm_percent_changes >= 0.5, -1)
+    num_drug_arm_responders    = np.sum(drug_arm_percent_changes    >= 0.5, -1)
+
+    RR50_p_values = \
+        calculate_fisher_exact_p_values_from_counts(num_placebo_arm_responders,
+                                                    np.shape(placebo_arm_percent_changes)[-1],
+                                                    num_drug_arm_responders,
+                                                    np.shape(drug_arm_percent_changes)[-1])
+
+    return RR50_p_values
+
+
+def calculate_rank_sum_p_values(placebo_arm_percent_changes,
+                                drug_arm_percent_changes,
+                                num_placebo_arm_patients,
+                                num_drug_arm_patients):
+
+    # each row is one trial, where only the first num_placebo_arm_patients and num_drug_arm_patients percent changes of 
+    # each row are used, and every percent change after those is padding which gets sorted after every real percent change
+    max_num_placebo_arm_patients = np.shape(placebo_arm_percent_changes)[-1]
+    max_num_drug_arm_patients    = np.shape(drug_arm_percent_changes)[-1]
+
+    num_placebo_arm_patients = np.asarray(num_placebo_arm_patients)[..., np.newaxis]
+    num_drug_arm_patients    = np.asarray(num_drug_arm_patients)[..., np.newaxis]
+
+    placebo_arm_patient_mask = np.arange(max_num_placebo_arm_patients) < num_placebo_arm_patients
+    drug_arm_patient_mask    = np.arange(max_num_drug_arm_patients)    < num_drug_arm_patients
+
+    [placebo_arm_percent_changes, 
+     placebo_arm_patient_mask] = np.broadcast_arrays(placebo_arm_percent_changes, placebo_arm_patient_mask)
+    [drug_arm_percent_changes, 
+     drug_arm_patient_mask] = np.broadcast_arrays(drug_arm_percent_changes, drug_arm_patient_mask)
+    
+    pooled_percent_changes = np.concatenate((np.where(placebo_arm_patient_mask, placebo_arm_percent_changes, np.inf),
+                                             np.where(drug_arm_patient_mask,    drug_arm_percent_changes,    np.inf)), -1)
+    
+    # rank the pooled percent changes of every trial at once, with tied percent changes all getting their average rank
+    sorting_indices = np.argsort(pooled_percent_changes, -1, kind='stable')
+    sorted_percent_changes = np.take_along_axis(pooled_percent_changes, sorting_indices, -1)
+
+    num_pooled_percent_changes = np.shape(pooled_percent_changes)[-1]
+    positions = np.broadcast_to(np.arange(num_pooled_percent_changes), np.shape(sorted_percent_changes))
+
+    starts_tie  = np.ones(np.shape(sorted_percent_changes), dtype=bool)
+    ends_tie    = np.ones(np.shape(sorted_percent_changes), dtype=bool)
+    starts_tie[..., 1:] = sorted_percent_changes[..., 1:] != sorted_percent_changes[..., :-1]
+    ends_tie[..., :-1]  = starts_tie[..., 1:]
+
+    tie_start_positions = np.maximum.accumulate(np.where(starts_tie, positions, 0), -1)
+    tie_end_positions   = np.flip(np.minimum.accumulate(np.flip(np.where(ends_tie, positions, num_pooled_percent_changes - 1), -1), -1), -1)
+
+    sorted_ranks = (tie_start_positions + tie_end_positions)/2 + 1
+    ranks = np.empty(np.shape(sorted_ranks))
+    np.put_along_axis(ranks, sorting_indices, sorted_ranks, -1)
 
-    return MPC_p_value
+    # the Wilcoxon rank-sum statistic of the placebo arm, with the same normal approximation as scipy.stats.ranksums()
+    num_placebo_arm_patients = num_placebo_arm_patients[..., 0]
+    num_drug_arm_patients    = num_drug_arm_patients[..., 0]
+
+    placebo_arm_rank_sums = np.sum(ranks[..., 0:max_num_placebo_arm_patients], -1, where=placebo_arm_patient_mask)
+    expected_rank_sums = num_placebo_arm_patients*(num_placebo_arm_patients + num_drug_arm_patients + 1)/2
+    rank_sum_std_devs  = np.sqrt(num_placebo_arm_patients*num_drug_arm_patients*(num_placebo_arm_patients + num_drug_arm_patients + 1)/12)
+
+    z_statistics = (placebo_arm_rank_sums - expected_rank_sums)/rank_sum_std_devs
+    MPC_p_values = 2*stats.norm.sf(np.abs(z_statistics))
+
+    return MPC_p_values
+
+
+def calculate_Mann_Whitney_U_p_values(placebo_arm_percent_changes,
+                                      drug_arm_percent_changes):
+
+    # one p-value per trial, where each row of the inputs is one trial
+    MPC_p_values = \
+        calculate_rank_sum_p_values(placebo_arm_percent_changes,
+                                    drug_arm_percent_changes,
+                                    np.shape(placebo_arm_percent_changes)[-1],
+                                    np.shape(drug_arm_percent_changes)[-1])
+
+    return MPC_p_values
+
+
+def calculate_Mann_Whitney_U_p_values_per_trial_arm_size(placebo_arm_percent_changes,
+                                                         drug_arm_percent_changes,
+                                                         patient_nums):
+
+    # one p-value per trial arm size, where each trial arm size uses the first patient_num patients of both trial arms
+    patient_nums = np.asarray(patient_nums)
+    max_patient_num = int(np.max(patient_nums))
+
+    MPC_p_values = \
+        calculate_rank_sum_p_values(placebo_arm_percent_changes[..., np.newaxis, 0:max_patient_num],
+                                    drug_arm_percent_changes[..., np.newaxis, 0:max_patient_num],
+                                    patient_nums,
+                                    patient_nums)
+
+    return MPC_p_values
 
 
 def calculate_logrank_p_value(placebo_arm_TTP_times, 
@@ -79,12 +260,122 @@ def calculate_logrank_p_value(placebo_arm_TTP_times,
                               drug_arm_TTP_times, 
                               drug_arm_observed_array):
 
-    TTP_results = \
-        logrank_test(placebo_arm_TTP_times,
-                     drug_arm_TTP_times,
-                     placebo_arm_observed_array,
-                     drug_arm_observed_array)
+    TTP_p_value = \
+        calculate_logrank_p_values(np.asarray(placebo_arm_TTP_times),
+                                   np.asarray(placebo_arm_observed_array),
+                                   np.asarray(drug_arm_TTP_times),
+                                   np.asarray(drug_arm_observed_array))
+
+    return float(TTP_p_value)
+
+
+def calculate_discrete_time_logrank_p_values(placebo_arm_TTP_times, 
+                                             placebo_arm_observed_array, 
+                                             drug_arm_TTP_times, 
+                                             drug_arm_observed_array,
+                                             num_placebo_arm_patients,
+                                             num_drug_arm_patients):
+
+    # each row is one trial, where only the first num_placebo_arm_patients and num_drug_arm_patients patients of each row are used
+    num_placebo_arm_patients = np.asarray(num_placebo_arm_patients)[..., np.newaxis]
+    num_drug_arm_patients    = np.asarray(num_drug_arm_patients)[..., np.newaxis]
+
+    placebo_arm_patient_mask = np.arange(np.shape(placebo_arm_TTP_times)[-1]) < num_placebo_arm_patients
+    drug_arm_patient_mask    = np.arange(np.shape(drug_arm_TTP_times)[-1])    < num_drug_arm_patients
+
+    [placebo_arm_TTP_times, 
+     placebo_arm_observed_array, 
+     placebo_arm_patient_mask] = np.broadcast_arrays(placebo_arm_TTP_times, placebo_arm_observed_array, placebo_arm_patient_mask)
+    [drug_arm_TTP_times, 
+     drug_arm_observed_array, 
+     drug_arm_patient_mask] = np.broadcast_arrays(drug_arm_TTP_times, drug_arm_observed_array, drug_arm_patient_mask)
+    
+    # the shape that the trials of both trial arms broadcast to, taken from empty slices of the patient axis so that nothing is allocated
+    trial_shape = np.broadcast(placebo_arm_TTP_times[..., 0:0], drug_arm_TTP_times[..., 0:0]).shape[:-1]
+    num_trials = int(np.prod(trial_shape))
+
+    # put every distinct time to prerandomization on one shared grid (i.e., the days of the testing period)
+    [times, time_indices] = np.unique(np.concatenate((np.broadcast_to(placebo_arm_TTP_times, trial_shape + np.shape(placebo_arm_TTP_times)[-1:]),
+                                                      np.broadcast_to(drug_arm_TTP_times,    trial_shape + np.shape(drug_arm_TTP_times)[-1:])), -1), 
+                                      return_inverse=True)
+    time_indices = time_indices.reshape(trial_shape + (-1,))
+    num_times = len(times)
+
+    def count_per_trial_and_time(trial_arm_time_indices, weights):
+
+        # offset each trial's time indices so that one bincount counts every trial at once
+        trial_offsets = (np.arange(num_trials)*num_times).reshape(trial_shape + (1,))
+        counts = np.bincount((trial_arm_time_indices + trial_offsets).ravel(), 
+                             np.broadcast_to(weights, np.shape(trial_arm_time_indices)).ravel(), 
+                             num_trials*num_times)
+
+        return counts.reshape(trial_shape + (num_times,))
+
+    placebo_arm_time_indices = time_indices[..., 0:np.shape(placebo_arm_TTP_times)[-1]]
+    drug_arm_time_indices    = time_indices[..., np.shape(placebo_arm_TTP_times)[-1]:]
+
+    # the number of prerandomizations on each day, and the number of patients still at risk at the start of each day
+    placebo_arm_event_counts = count_per_trial_and_time(placebo_arm_time_indices, placebo_arm_patient_mask*(placebo_arm_observed_array != 0))
+    drug_arm_event_counts    = count_per_trial_and_time(drug_arm_time_indices,    drug_arm_patient_mask*(drug_arm_observed_array != 0))
+
+    placebo_arm_at_risk_counts = np.flip(np.cumsum(np.flip(count_per_trial_and_time(placebo_arm_time_indices, placebo_arm_patient_mask), -1), -1), -1)
+    drug_arm_at_risk_counts    = np.flip(np.cumsum(np.flip(count_per_trial_and_time(drug_arm_time_indices,    drug_arm_patient_mask), -1), -1), -1)
+
+    event_counts   = placebo_arm_event_counts   + drug_arm_event_counts
+    at_risk_counts = placebo_arm_at_risk_counts + drug_arm_at_risk_counts
+
+    # the observed minus expected number of placebo arm prerandomizations, and its hypergeometric variance, summed over every day
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        placebo_arm_at_risk_fractions = np.where(at_risk_counts > 0, placebo_arm_at_risk_counts/at_risk_counts, 0)
+        tie_corrections = np.where(at_risk_counts > 1, (at_risk_counts - event_counts)/(at_risk_counts - 1), 1)
+
+    observed_minus_expected = np.sum(placebo_arm_event_counts - event_counts*placebo_arm_at_risk_fractions, -1)
+    variances = np.sum(event_counts*placebo_arm_at_risk_fractions*(1 - placebo_arm_at_risk_fractions)*tie_corrections, -1)
+
+    # the log-rank chi-squared statistic has one degree of freedom, and trials without any information are never significant
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        chi_squared_statistics = np.where(variances > 0, np.power(observed_minus_expected, 2)/variances, 0)
+
+    TTP_p_values = stats.chi2.sf(chi_squared_statistics, 1)
+
+    return TTP_p_values
+
+
+def calculate_logrank_p_values(placebo_arm_TTP_times, 
+                               placebo_arm_observed_array, 
+                               drug_arm_TTP_times, 
+                               drug_arm_observed_array):
+
+    # one p-value per trial, where each row of the inputs is one trial
+    TTP_p_values = \
+        calculate_discrete_time_logrank_p_values(placebo_arm_TTP_times, 
+                                                 placebo_arm_observed_array, 
+                                                 drug_arm_TTP_times, 
+                                                 drug_arm_observed_array,
+                                                 np.shape(placebo_arm_TTP_times)[-1],
+                                                 np.shape(drug_arm_TTP_times)[-1])
+
+    return TTP_p_values
+
+
+def calculate_logrank_p_values_per_trial_arm_size(placebo_arm_TTP_times, 
+                                                  placebo_arm_observed_array, 
+                                                  drug_arm_TTP_times, 
+                                                  drug_arm_observed_array,
+                                                  patient_nums):
+
+    # one p-value per trial arm size, where each trial arm size uses the first patient_num patients of both trial arms
+    patient_nums = np.asarray(patient_nums)
+    max_patient_num = int(np.max(patient_nums))
 
-    TTP_p_value = TTP_results.p_value
+    TTP_p_values = \
+        calculate_discrete_time_logrank_p_values(placebo_arm_TTP_times[..., np.newaxis, 0:max_patient_num], 
+                                                 placebo_arm_observed_array[..., np.newaxis, 0:max_patient_num], 
+                                                 drug_arm_TTP_times[..., np.newaxis, 0:max_patient_num], 
+                                                 drug_arm_observed_array[..., np.newaxis, 0:max_patient_num],
+                                                 patient_nums,
+                                                 patient_nums)
 
-    return TTP_p_value
+    return TTP_p_values
@@ -0,0 +1,706 @@
+import os
+import warnings
+import numpy as np
+from .seizure_diary_generation import generate_seizure_diaries
+from .seizure_diary_generation import apply_effect
+from .seizure_diary_generation import generate_baseline_seizure_diaries
+from .seizure_diary_generation import generate_testing_seizure_diaries_at_resolution
+from .seizure_diary_generation import apply_coupled_effects
+from .endpoint_functions import calculate_percent_changes
+from .endpoint_functions import calculate_time_to_prerandomizations
+from .random_streams import get_rng
+
+try:
+    from numba import njit
+    numba_is_available = True
+except ImportError:
+    numba_is_available = False
+
+
+simulation_engine_names = ['numpy', 'numba']
+simulation_engine_name  = 'numpy'
+
+endpoint_names = ['RR50', 'MPC', 'TTP']
+
+# the endpoints which need the testing period on the time scale given by testing_time_scaling_const rather than on a monthly time scale
+time_scaled_endpoint_names = ['TTP']
+
+
+def set_simulation_engine(new_simulation_engine_name):
+    '''
+
+    This function selects which engine is used by simulate_trial_arm_endpoints(). The 'numpy' engine builds whole seizure diary arrays with the
+    batched generators and then calculates the endpoints from them, while the 'numba' engine runs
+    one compiled kernel which goes straight from patient parameters to endpoints without building
+    any seizure diary arrays at all.
+
+    If the 'numba' engine is requested but Numba is not installed, then a warning is raised and the
+    'numpy' engine is selected instead. The engine can also be selected before startup via the
+    RCT_SNR_SIMULATION_ENGINE environment variable.
+
+    Inputs:
+
+        1) new_simulation_engine_name:
+            (string) - either 'numpy' or 'numba'
+
+    Outputs:
+
+        1) simulation_engine_name:
+            (string) - the name of the engine that actually got selected
+
+    '''
+
+    global simulation_engine_name
+
+    if(new_simulation_engine_name not in simulation_engine_names):
+
+        raise ValueError('The \'new_simulation_engine_name\' parameter must either be \'numpy\' or \'numba\'')
+
+    if(new_simulation_engine_name == 'numba' and not numba_is_available):
+
+        warnings.warn('Numba is not installed, so the \'numpy\' simulation engine will be used instead.')
+        new_simulation_engine_name = 'numpy'
+
+    simulation_engine_name = new_simulation_engine_name
+
+    return simulation_engine_name
+
+
+def get_simulation_engine():
+
+    return simulation_engine_name
+
+
+set_simulation_engine(os.environ.get('RCT_SNR_SIMULATION_ENGINE', 'numpy'))
+
+
+def simulate_trial_arm_endpoints_kernel(monthly_means,
+                                        monthly_std_devs,
+                                        num_baseline_months,
+                                        num_testing_months,
+                                        testing_time_scaling_const,
+                                        minimum_required_baseline_seizure_count,
+                                        effect_mus,
+                                        effect_sigmas,
+                                        rng):
+    '''
+
+    This function is the fused simulation kernel used by the 'numba' engine. For each patient, it
+    generates a monthly baseline period which satisfies the minimum required seizure count, draws that
+    patient's effects, and then generates the testing period one scaled time unit at a time, applying
+    the effects to each seizure count as soon as it is generated. The percent change and the time to
+    prerandomization are accumulated along the way, so no seizure diary is ever stored.
+
+    The effects are applied in the order in which they are given, which means that a placebo arm
+    should be given only the placebo effect, while a drug arm should be given the placebo effect
+    followed by the drug effect. The results follow the same definitions as calculate_percent_changes()
+    and calculate_time_to_prerandomizations(), including a patient being counted as right-censored
+    whenever the loop stops on the last day of the testing period.
+
+    Inputs:
+
+        1) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        2) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        3) num_baseline_months:
+            (int) - the number of months in the baseline period
+        4) num_testing_months:
+            (int) - the number of months in the testing period
+        5) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing period (see generate_seizure_diary for more details)
+        6) minimum_required_baseline_seizure_count:
+            (int) - the minimum number of seizures in each patient's baseline period
+        7) effect_mus:
+            (1D Numpy array) - the means of the normally distributed effects, expressed as percentages
+        8) effect_sigmas:
+            (1D Numpy array) - the standard deviations of the normally distributed effects, expressed as
+                               percentages
+        9) rng:
+            (Numpy Generator) - the random number generator to draw from
+
+    Outputs:
+
+        1) percent_changes:
+            (1D Numpy array) - the percent change of each patient
+        2) TTP_times:
+            (1D Numpy array) - the time to prerandomization of each patient, in scaled time units
+        3) observed_array:
+            (1D Numpy array) - whether or not each patient's time to prerandomization was observed
+
+    '''
+
+    num_patients = len(monthly_means)
+    num_testing_scaled_time_units = num_testing_months*testing_time_scaling_const
+    num_effects = len(effect_mus)
+
+    percent_changes = np.zeros(num_patients)
+    TTP_times       = np.zeros(num_patients)
+    observed_array  = np.zeros(num_patients)
+    effects         = np.zeros(num_effects)
+
+    for patient_index in range(num_patients):
+
+        # convert the monthly mean and monthly standard deviation into quantities usable by a gamma-poisson mixture
+        monthly_mean    = monthly_means[patient_index]
+        monthly_std_dev = monthly_std_devs[patient_index]
+        monthly_overdispersion = (monthly_std_dev*monthly_std_dev - monthly_mean)/(monthly_mean*monthly_mean)
+        monthly_n = 1/monthly_overdispersion
+        odds_ratio = monthly_overdispersion*monthly_mean
+
+        # generate monthly baseline periods until one of them has an acceptable number of seizures
+        num_baseline_seizures = -1
+        while(num_baseline_seizures < minimum_required_baseline_seizure_count):
+
+            num_baseline_seizures = 0
+            for baseline_month_index in range(num_baseline_months):
+                num_baseline_seizures = num_baseline_seizures + rng.poisson(rng.gamma(monthly_n, odds_ratio))
+
+        baseline_monthly_seizure_frequency = num_baseline_seizures/num_baseline_months
+
+        # generate this patient's effects according to the normal distribution
+        for effect_index in range(num_effects):
+            effects[effect_index] = rng.normal(effect_mus[effect_index], effect_sigmas[effect_index])
+
+        num_testing_seizures = 0
+        reached_count = False
+
+        for scaled_time_unit_index in range(num_testing_scaled_time_units):
+
+            # generate a seizure count
+            time_scaled_count = rng.poisson(rng.gamma(monthly_n/testing_time_scaling_const, odds_ratio))
+
+            # remove (or add) seizures from that seizure count according to each effect
+            for effect_index in range(num_effects):
+
+                effect_prob = min(abs(effects[effect_index]), 1.0)
+
+                if(time_scaled_count > 0 and effect_prob > 0):
+                    time_scaled_count = time_scaled_count - int(np.sign(effects[effect_index]))*rng.binomial(time_scaled_count, effect_prob)
+
+            num_testing_seizures = num_testing_seizures + time_scaled_count
+
+            # check whether or not this patient has reached their time to prerandomization
+            if(not reached_count):
+
+                right_censored = scaled_time_unit_index == (num_testing_scaled_time_units - 1)
+                reached_count = (num_testing_seizures >= baseline_monthly_seizure_frequency) or right_censored
+
+                if(reached_count):
+                    TTP_times[patient_index] = scaled_time_unit_index + 1
+                    observed_array[patient_index] = not right_censored
+
+        testing_monthly_seizure_frequency = num_testing_seizures/num_testing_months
+
+        if(baseline_monthly_seizure_frequency == 0):
+            baseline_monthly_seizure_frequency = 0.000001
+
+        percent_changes[patient_index] = (baseline_monthly_seizure_frequency - testing_monthly_seizure_frequency)/baseline_monthly_seizure_frequency
+
+    return [percent_changes, TTP_times, observed_array]
+
+
+if(numba_is_available):
+
+    simulate_trial_arm_endpoints_kernel = njit(cache=True)(simulate_trial_arm_endpoints_kernel)
+
+
+def allocate_seizure_diary_buffers(max_theo_patients_in_trial_arm,
+                                   num_baseline_months,
+                                   num_testing_months,
+                                   testing_time_scaling_const,
+                                   dtype=np.uint32):
+    '''
+
+    This function allocates the arrays that the 'numpy' engine generates seizure diaries in, so that 
+    they can be allocated once and then reused by every trial arm of every trial (see simulate_trial_arm_endpoints). 
+    Seizure counts are whole numbers, so they are stored as unsigned 32-bit integers by default, which 
+    takes half the memory of float64 seizure diaries.
+
+    Inputs:
+
+        1) max_theo_patients_in_trial_arm:
+            (int) - the largest number of patients in any trial arm that the buffers will be used for
+        2) num_baseline_months:
+            (int) - the number of months in the baseline period
+        3) num_testing_months:
+            (int) - the number of months in the testing period
+        4) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing period (see generate_seizure_diary for more details)
+        5) dtype:
+            (Numpy dtype) - the dtype of the seizure diaries
+
+    Outputs:
+
+        1) seizure_diary_buffers:
+            (list) - the monthly baseline seizure diary buffer and the testing seizure diary buffer
+
+    '''
+
+    baseline_seizure_diary_buffer = np.zeros((max_theo_patients_in_trial_arm, num_baseline_months), dtype=dtype)
+    testing_seizure_diary_buffer  = np.zeros((max_theo_patients_in_trial_arm, num_testing_months*testing_time_scaling_const), dtype=dtype)
+
+    seizure_diary_buffers = [baseline_seizure_diary_buffer, testing_seizure_diary_buffer]
+
+    return seizure_diary_buffers
+
+
+def simulate_time_to_prerandomizations(monthly_baseline_seizure_diaries,
+                                       monthly_means,
+                                       monthly_std_devs,
+                                       num_testing_months,
+                                       testing_time_scaling_const,
+                                       effect_mus,
+                                       effect_sigmas,
+                                       rng=None):
+    '''
+
+    This function calculates the time to prerandomization of every patient in a trial arm without
+    building their whole testing periods. The testing periods are generated one month at a time 
+    (i.e., testing_time_scaling_const scaled time units at a time), and only for the patients who have 
+    not yet reached their baseline monthly seizure frequency. Since most patients reach it within the
+    first month or two, most of the testing period is never generated. The results follow the same
+    definitions as calculate_time_to_prerandomizations(), including a patient being counted as 
+    right-censored whenever their count is reached on the last scaled time unit of the testing period.
+
+    The effects are applied in the order in which they are given, which means that a placebo arm
+    should be given only the placebo effect, while a drug arm should be given the placebo effect
+    followed by the drug effect.
+
+    Inputs:
+
+        1) monthly_baseline_seizure_diaries:
+            (2D Numpy array) - the monthly baseline seizure diaries of the trial arm, with one row per patient
+        2) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        3) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        4) num_testing_months:
+            (int) - the number of months in the testing period
+        5) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing period (see generate_seizure_diary for more details)
+        6) effect_mus:
+            (list) - the means of the normally distributed effects, expressed as percentages
+        7) effect_sigmas:
+            (list) - the standard deviations of the normally distributed effects, expressed as percentages
+        8) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+
+    Outputs:
+
+        1) TTP_times:
+            (1D Numpy array) - the time to prerandomization of each patient, in scaled time units
+        2) observed_array:
+            (1D Numpy array) - whether or not each patient's time to prerandomization was observed
+
+    '''
+
+    rng = get_rng(rng)
+
+    num_patients = len(monthly_baseline_seizure_diaries)
+    num_testing_scaled_time_units = num_testing_months*testing_time_scaling_const
+
+    baseline_monthly_seizure_frequencies = np.mean(monthly_baseline_seizure_diaries, 1)
+
+    # every patient is right-censored unless their count is reached before the last scaled time unit
+    TTP_times      = np.full(num_patients, float(num_testing_scaled_time_units))
+    observed_array = np.zeros(num_patients)
+
+    # generate every individual patient's effects according to the normal distribution
+    effects_per_patient = [rng.normal(effect_mu, effect_sigma, num_patients) 
+                           for [effect_mu, effect_sigma] in zip(effect_mus, effect_sigmas)]
+
+    active_patient_indices = np.arange(num_patients)
+    sum_counts = np.zeros(num_patients)
+
+    for testing_month_index in range(num_testing_months):
+
+        # generate the next month of the testing period for the patients who have not yet reached their count
+        testing_seizure_diaries = \
+            generate_seizure_diaries(1,
+                                     monthly_means[active_patient_indices],
+                                     monthly_std_devs[active_patient_indices],
+                                     testing_time_scaling_const,
+                                     rng)
+
+        for effects in effects_per_patient:
+
+            testing_seizure_diaries = \
+                apply_effect(testing_seizure_diaries,
+                             1,
+                             testing_time_scaling_const,
+                             effects[active_patient_indices],
+                             rng)
+
+        cumulative_counts = \
+            sum_counts[active_patient_indices].reshape((-1, 1)) + np.cumsum(testing_seizure_diaries, 1)
+
+        reached_count = cumulative_counts >= baseline_monthly_seizure_frequencies[active_patient_indices].reshape((-1, 1))
+        reached_count_at_all = np.any(reached_count, 1)
+        first_reached_scaled_time_unit_indices = \
+            testing_month_index*testing_time_scaling_const + np.argmax(reached_count, 1)
+
+        # a count which is reached on the last scaled time unit of the testing period is still right-censored
+        observed = reached_count_at_all & (first_reached_scaled_time_unit_indices < num_testing_scaled_time_units - 1)
+        observed_patient_indices = active_patient_indices[observed]
+        TTP_times[observed_patient_indices] = first_reached_scaled_time_unit_indices[observed] + 1
+        observed_array[observed_patient_indices] = 1
+
+        sum_counts[active_patient_indices] = cumulative_counts[:, -1]
+        active_patient_indices = active_patient_indices[np.logical_not(reached_count_at_all)]
+
+        if(len(active_patient_indices) == 0):
+            break
+
+    return [TTP_times, observed_array]
+
+
+def simulate_trial_arm_endpoints_with_numpy(num_theo_patients_in_trial_arm,
+                                            theo_trial_arm_patient_pop_params,
+                                            num_baseline_months,
+                                            num_testing_months,
+                                            testing_time_scaling_const,
+                                            minimum_required_baseline_seizure_count,
+                                            effect_mus,
+                                            effect_sigmas,
+                                            percent_changes_needed,
+                                            time_scaled_detail_needed,
+                                            rng=None,
+                                            seizure_diary_buffers=None):
+
+    baseline_time_scaling_const = 1
+    num_testing_scaled_time_units = num_testing_months*testing_time_scaling_const
+
+    if(seizure_diary_buffers is None):
+
+        [baseline_seizure_diary_buffer, testing_seizure_diary_buffer] = [None, None]
+
+    else:
+
+        # only use as much of each buffer as this trial arm needs at the resolution it is generated at
+        if(time_scaled_detail_needed):
+            num_testing_columns = num_testing_scaled_time_units
+        else:
+            num_testing_columns = num_testing_months
+
+        baseline_seizure_diary_buffer = seizure_diary_buffers[0][0:num_theo_patients_in_trial_arm, :]
+        testing_seizure_diary_buffer  = seizure_diary_buffers[1][0:num_theo_patients_in_trial_arm, 0:num_testing_columns]
+
+    monthly_means    = theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 0]
+    monthly_std_devs = theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 1]
+
+    monthly_baseline_seizure_diaries = \
+        generate_baseline_seizure_diaries(monthly_means,
+                                          monthly_std_devs,
+                                          num_baseline_months,
+                                          baseline_time_scaling_const,
+                                          minimum_required_baseline_seizure_count,
+                                          rng,
+                                          out=baseline_seizure_diary_buffer)
+
+    if(not percent_changes_needed):
+
+        # only TTP is needed, so each testing period is only generated up until its time to prerandomization
+        [TTP_times, observed_array] = \
+            simulate_time_to_prerandomizations(monthly_baseline_seizure_diaries,
+                                               monthly_means,
+                                               monthly_std_devs,
+                                               num_testing_months,
+                                               testing_time_scaling_const,
+                                               effect_mus,
+                                               effect_sigmas,
+                                               rng)
+
+        return [None, TTP_times, observed_array]
+
+    [monthly_testing_seizure_diaries,
+     time_scaled_testing_seizure_diaries] = \
+         generate_testing_seizure_diaries_at_resolution(num_testing_months,
+                                                        monthly_means,
+                                                        monthly_std_devs,
+                                                        testing_time_scaling_const,
+                                                        effect_mus,
+                                                        effect_sigmas,
+                                                        time_scaled_detail_needed,
+                                                        rng,
+                                                        out=testing_seizure_diary_buffer)
+
+    percent_changes = \
+        calculate_percent_changes(monthly_baseline_seizure_diaries,
+                                  monthly_testing_seizure_diaries)
+
+    if(time_scaled_detail_needed):
+
+        [TTP_times, observed_array] = \
+            calculate_time_to_prerandomizations(monthly_baseline_seizure_diaries,
+                                                time_scaled_testing_seizure_diaries,
+                                                num_theo_patients_in_trial_arm,
+                                                num_testing_scaled_time_units)
+
+    else:
+
+        [TTP_times, observed_array] = [None, None]
+
+    return [percent_changes, TTP_times, observed_array]
+
+
+def simulate_trial_arm_endpoints(num_theo_patients_in_trial_arm,
+                                 theo_trial_arm_patient_pop_params,
+                                 num_baseline_months,
+                                 num_testing_months,
+                                 testing_time_scaling_const,
+                                 minimum_required_baseline_seizure_count,
+                                 placebo_mu,
+                                 placebo_sigma,
+                                 drug_mu,
+                                 drug_sigma,
+                                 placebo_or_drug,
+                                 rng=None,
+                                 requested_endpoint_names=None,
+                                 seizure_diary_buffers=None):
+    '''
+
+    This function simulates one arm of a clinical trial and returns the per-patient quantities needed
+    by all three endpoints, using whichever engine is currently selected (see set_simulation_engine()).
+    The baseline period is always generated on a monthly time scale, while the testing period is
+    generated on the time scale given by testing_time_scaling_const. The drug effect is only applied
+    if placebo_or_drug is set to 'drug'. All random numbers are drawn from the given numpy Generator,
+    whichever engine is selected (see random_streams.get_rng).
+
+    If requested_endpoint_names is given and does not include any endpoint which needs the testing
+    period on the scaled time unit level (i.e., it does not include 'TTP'), then the monthly testing
+    seizure counts are drawn directly instead (see generate_testing_seizure_diaries_at_resolution), 
+    and the time to prerandomization outputs are returned as None. Likewise, if it only includes 'TTP',
+    then the percent changes are returned as None, and the 'numpy' engine only generates each testing
+    period up until its time to prerandomization (see simulate_time_to_prerandomizations).
+
+    If seizure_diary_buffers is given (see allocate_seizure_diary_buffers), then the 'numpy' engine
+    generates the seizure diaries inside of those buffers instead of allocating new ones.
+
+    Outputs:
+
+        1) percent_changes:
+            (1D Numpy array) - the percent change of each patient
+        2) TTP_times:
+            (1D Numpy array) - the time to prerandomization of each patient, in scaled time units
+        3) observed_array:
+            (1D Numpy array) - whether or not each patient's time to prerandomization was observed
+
+    '''
+
+    if(placebo_or_drug != 'placebo' and placebo_or_drug != 'drug'):
+
+        raise ValueError("The \'placebo_or_drug\' parameter must either be \'placebo\' or \'drug\'")
+
+    if(requested_endpoint_names is None):
+        requested_endpoint_names = endpoint_names
+
+    for endpoint_name in requested_endpoint_names:
+        if(endpoint_name not in endpoint_names):
+            raise ValueError('The \'requested_endpoint_names\' parameter must only contain \'RR50\', \'MPC\' or \'TTP\'')
+
+    time_scaled_detail_needed = \
+        any(endpoint_name in time_scaled_endpoint_names for endpoint_name in requested_endpoint_names)
+    percent_changes_needed = \
+        any(endpoint_name not in time_scaled_endpoint_names for endpoint_name in requested_endpoint_names)
+
+    rng = get_rng(rng)
+
+    if(placebo_or_drug == 'placebo'):
+        effect_mus    = np.array([placebo_mu],    dtype=float)
+        effect_sigmas = np.array([placebo_sigma], dtype=float)
+    elif(placebo_or_drug == 'drug'):
+        effect_mus    = np.array([placebo_mu,    drug_mu],    dtype=float)
+        effect_sigmas = np.array([placebo_sigma, drug_sigma], dtype=float)
+
+    if(simulation_engine_name == 'numba' and numba_is_available):
+
+        # the kernel only generates the testing period on the scaled time unit level if it has to
+        if(time_scaled_detail_needed):
+            kernel_time_scaling_const = testing_time_scaling_const
+        else:
+            kernel_time_scaling_const = 1
+
+        [percent_changes, TTP_times, observed_array] = \
+            simulate_trial_arm_endpoints_kernel(np.ascontiguousarray(theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 0], dtype=float),
+                                                np.ascontiguousarray(theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 1], dtype=float),
+                                                num_baseline_months,
+                                                num_testing_months,
+                                                kernel_time_scaling_const,
+                                                minimum_required_baseline_seizure_count,
+                                                effect_mus,
+                                                effect_sigmas,
+                                                rng)
+
+        if(not time_scaled_detail_needed):
+            [TTP_times, observed_array] = [None, None]
+
+        if(not percent_changes_needed):
+            percent_changes = None
+
+    else:
+
+        [percent_changes, TTP_times, observed_array] = \
+            simulate_trial_arm_endpoints_with_numpy(num_theo_patients_in_trial_arm,
+                                                    theo_trial_arm_patient_pop_params,
+                                                    num_baseline_months,
+                                                    num_testing_months,
+                                                    testing_time_scaling_const,
+                                                    minimum_required_baseline_seizure_count,
+                                                    effect_mus,
+                                                    effect_sigmas,
+                                                    percent_changes_needed,
+                                                    time_scaled_detail_needed,
+                                                    rng,
+                                                    seizure_diary_buffers)
+
+    return [percent_changes, TTP_times, observed_array]
+
+
+def simulate_trial_arm_endpoints_for_effect_scenarios(num_theo_patients_in_trial_arm,
+                                                      theo_trial_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      effect_scenarios,
+                                                      placebo_or_drug,
+                                                      rng=None,
+                                                      requested_endpoint_names=None):
+    '''
+
+    This function is the effect size sweep version of simulate_trial_arm_endpoints(). The baseline 
+    period and the untreated testing period of every patient do not depend on the placebo effect or 
+    the drug effect, so they are only generated once. Every effect scenario is then applied to the 
+    same untreated testing periods through coupled thinning (see apply_coupled_effects), and every 
+    patient's effects are drawn from the same standard normal random numbers in every scenario. 
+    This function always uses the 'numpy' engine.
+
+    Inputs:
+
+        1) num_theo_patients_in_trial_arm:
+            (int) - the number of patients in the trial arm
+        2) theo_trial_arm_patient_pop_params:
+            (2D Numpy array) - the monthly mean and monthly standard deviation of each patient
+        3) num_baseline_months:
+            (int) - the number of months in the baseline period
+        4) num_testing_months:
+            (int) - the number of months in the testing period
+        5) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing period (see generate_seizure_diary for more details)
+        6) minimum_required_baseline_seizure_count:
+            (int) - the minimum number of seizures in each patient's baseline period
+        7) effect_scenarios:
+            (list) - one [placebo_mu, placebo_sigma, drug_mu, drug_sigma] list per scenario
+        8) placebo_or_drug:
+            (string) - either 'placebo' or 'drug'
+        9) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        10) requested_endpoint_names:
+            (list) - the endpoints which are needed (see simulate_trial_arm_endpoints)
+
+    Outputs:
+
+        1) endpoints_per_scenario:
+            (list) - one [percent_changes, TTP_times, observed_array] list per scenario
+
+    '''
+
+    if(placebo_or_drug != 'placebo' and placebo_or_drug != 'drug'):
+
+        raise ValueError("The \'placebo_or_drug\' parameter must either be \'placebo\' or \'drug\'")
+
+    if(requested_endpoint_names is None):
+        requested_endpoint_names = endpoint_names
+
+    for endpoint_name in requested_endpoint_names:
+        if(endpoint_name not in endpoint_names):
+            raise ValueError('The \'requested_endpoint_names\' parameter must only contain \'RR50\', \'MPC\' or \'TTP\'')
+
+    time_scaled_detail_needed = \
+        any(endpoint_name in time_scaled_endpoint_names for endpoint_name in requested_endpoint_names)
+    percent_changes_needed = \
+        any(endpoint_name not in time_scaled_endpoint_names for endpoint_name in requested_endpoint_names)
+
+    rng = get_rng(rng)
+
+    baseline_time_scaling_const = 1
+    num_testing_scaled_time_units = num_testing_months*testing_time_scaling_const
+
+    monthly_means    = theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 0]
+    monthly_std_devs = theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 1]
+
+    monthly_baseline_seizure_diaries = \
+        generate_baseline_seizure_diaries(monthly_means,
+                                          monthly_std_devs,
+                                          num_baseline_months,
+                                          baseline_time_scaling_const,
+                                          minimum_required_baseline_seizure_count,
+                                          rng)
+
+    # generate the untreated testing periods at the coarsest time scale that is needed
+    [monthly_untreated_testing_seizure_diaries,
+     time_scaled_untreated_testing_seizure_diaries] = \
+         generate_testing_seizure_diaries_at_resolution(num_testing_months,
+                                                        monthly_means,
+                                                        monthly_std_devs,
+                                                        testing_time_scaling_const,
+                                                        [],
+                                                        [],
+                                                        time_scaled_detail_needed,
+                                                        rng)
+
+    if(time_scaled_detail_needed):
+        untreated_testing_seizure_diaries = time_scaled_untreated_testing_seizure_diaries
+    else:
+        untreated_testing_seizure_diaries = monthly_untreated_testing_seizure_diaries
+
+    # every scenario scales the same standard normal random numbers into its own per-patient effects
+    placebo_effect_std_normals = rng.standard_normal(num_theo_patients_in_trial_arm)
+    drug_effect_std_normals    = rng.standard_normal(num_theo_patients_in_trial_arm)
+
+    effects_per_scenario = []
+    for [placebo_mu, placebo_sigma, drug_mu, drug_sigma] in effect_scenarios:
+
+        placebo_effects = placebo_mu + placebo_sigma*placebo_effect_std_normals
+        drug_effects    = drug_mu    + drug_sigma*drug_effect_std_normals
+
+        if(placebo_or_drug == 'placebo'):
+            effects_per_scenario.append([placebo_effects])
+        elif(placebo_or_drug == 'drug'):
+            effects_per_scenario.append([placebo_effects, drug_effects])
+
+    testing_seizure_diaries_per_scenario = \
+        apply_coupled_effects(untreated_testing_seizure_diaries,
+                              effects_per_scenario,
+                              rng)
+
+    endpoints_per_scenario = []
+
+    for testing_seizure_diaries in testing_seizure_diaries_per_scenario:
+
+        [percent_changes, TTP_times, observed_array] = [None, None, None]
+
+        if(time_scaled_detail_needed):
+            monthly_testing_seizure_diaries = \
+                np.sum(testing_seizure_diaries.reshape((num_theo_patients_in_trial_arm,
+                                                        num_testing_months,
+                                                        testing_time_scaling_const)), 2)
+        else:
+            monthly_testing_seizure_diaries = testing_seizure_diaries
+
+        if(percent_changes_needed):
+            percent_changes = \
+                calculate_percent_changes(monthly_baseline_seizure_diaries,
+                                          monthly_testing_seizure_diaries)
+
+        if(time_scaled_detail_needed):
+            [TTP_times, observed_array] = \
+                calculate_time_to_prerandomizations(monthly_baseline_seizure_diaries,
+                                                    testing_seizure_diaries,
+                                                    num_theo_patients_in_trial_arm,
+                                                    num_testing_scaled_time_units)
+
+        endpoints_per_scenario.append([percent_changes, TTP_times, observed_array])
+
+    return endpoints_per_scenario
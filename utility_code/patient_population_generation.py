@@ -1,77 +1,152 @@
 import numpy as np
-from .seizure_diary_generation import generate_baseline_seizure_diary
-from .seizure_diary_generation import generate_placebo_arm_testing_seizure_diary
-from .seizure_diary_generation import generate_drug_arm_testing_seizure_diary
+from .random_streams import get_rng
+from .seizure_diary_generation import generate_baseline_seizure_diaries
+from .seizure_diary_generation import generate_seizure_diaries_with_minimum_count
+from .seizure_diary_generation import generate_testing_seizure_diaries_at_resolution
+from .endpoint_simulation import endpoint_names
+from .endpoint_simulation import time_scaled_endpoint_names
+
+
+# the valid [monthly_mean_min, monthly_mean_max, monthly_std_dev_min, monthly_std_dev_max] windows of every set of bounds that has been sampled from so far
+valid_theo_patient_pop_windows_per_bounds = {}
+
+
+def get_valid_theo_patient_pop_windows(monthly_mean_lower_bound,
+                                       monthly_mean_upper_bound,
+                                       monthly_std_dev_lower_bound,
+                                       monthly_std_dev_upper_bound):
+
+    bounds = (int(monthly_mean_lower_bound), int(monthly_mean_upper_bound), int(monthly_std_dev_lower_bound), int(monthly_std_dev_upper_bound))
+
+    if(bounds not in valid_theo_patient_pop_windows_per_bounds):
+
+        [monthly_mean_mins, monthly_mean_maxes, monthly_std_dev_mins, monthly_std_dev_maxes] = \
+            np.meshgrid(np.arange(monthly_mean_lower_bound,        monthly_mean_upper_bound       ),
+                        np.arange(monthly_mean_lower_bound + 1,    monthly_mean_upper_bound + 1   ),
+                        np.arange(monthly_std_dev_lower_bound,     monthly_std_dev_upper_bound    ),
+                        np.arange(monthly_std_dev_lower_bound + 1, monthly_std_dev_upper_bound + 1), indexing='ij')
+
+        monthly_mean_axis_makes_sense    =    monthly_mean_mins < monthly_mean_maxes
+        monthly_std_dev_axis_makes_sense = monthly_std_dev_mins < monthly_std_dev_maxes
+        overdispersed_patients_allowed   = monthly_std_dev_maxes > np.sqrt(monthly_mean_mins)
+        patient_pop_window_makes_sense = monthly_mean_axis_makes_sense & monthly_std_dev_axis_makes_sense & overdispersed_patients_allowed
+
+        if(not np.any(patient_pop_window_makes_sense)):
+
+            raise ValueError('There are no valid patient population windows within the given bounds')
+
+        valid_theo_patient_pop_windows = \
+            np.column_stack((monthly_mean_mins[patient_pop_window_makes_sense],
+                             monthly_mean_maxes[patient_pop_window_makes_sense],
+                             monthly_std_dev_mins[patient_pop_window_makes_sense],
+                             monthly_std_dev_maxes[patient_pop_window_makes_sense]))
+        valid_theo_patient_pop_windows.setflags(write=False)
+
+        valid_theo_patient_pop_windows_per_bounds[bounds] = valid_theo_patient_pop_windows
+
+    return valid_theo_patient_pop_windows_per_bounds[bounds]
+
+
+def randomly_select_theo_patient_pops(monthly_mean_lower_bound,
+                                      monthly_mean_upper_bound,
+                                      monthly_std_dev_lower_bound,
+                                      monthly_std_dev_upper_bound,
+                                      num_theo_patient_pops,
+                                      rng=None):
+
+    rng = get_rng(rng)
+
+    valid_theo_patient_pop_windows = \
+        get_valid_theo_patient_pop_windows(monthly_mean_lower_bound,
+                                           monthly_mean_upper_bound,
+                                           monthly_std_dev_lower_bound,
+                                           monthly_std_dev_upper_bound)
+
+    # rejecting invalid windows drawn from within the bounds is the same as drawing uniformly from the valid windows
+    valid_window_indices = rng.integers(0, len(valid_theo_patient_pop_windows), num_theo_patient_pops)
+    theo_patient_pop_windows = valid_theo_patient_pop_windows[valid_window_indices]
+
+    return theo_patient_pop_windows
 
 
 def randomly_select_theo_patient_pop(monthly_mean_lower_bound,
                                      monthly_mean_upper_bound,
                                      monthly_std_dev_lower_bound,
-                                     monthly_std_dev_upper_bound):
+                                     monthly_std_dev_upper_bound,
+                                     rng=None):
+
+    [monthly_mean_min, monthly_mean_max, monthly_std_dev_min, monthly_std_dev_max] = \
+        randomly_select_theo_patient_pops(monthly_mean_lower_bound,
+                                          monthly_mean_upper_bound,
+                                          monthly_std_dev_lower_bound,
+                                          monthly_std_dev_upper_bound,
+                                          1,
+                                          rng)[0].tolist()
+    
+    return [monthly_mean_min, monthly_mean_max, monthly_std_dev_min, monthly_std_dev_max]
 
-    monthly_mean_min    = 0
-    monthly_mean_max    = 0
-    monthly_std_dev_min = 0
-    monthly_std_dev_max = 0
 
-    monthly_mean_axis_makes_sense    =    monthly_mean_min < monthly_mean_max
-    monthly_std_dev_axis_makes_sense = monthly_std_dev_min < monthly_std_dev_max
-    overdispersed_patients_allowed   = monthly_std_dev_max > np.sqrt(monthly_mean_min)
-    patient_pop_window_makes_sense = monthly_mean_axis_makes_sense and monthly_std_dev_axis_makes_sense and overdispersed_patients_allowed
+# the admissible (monthly mean, monthly standard deviation) cells of every window that has been sampled from so far
+admissible_theo_patient_pop_cells_per_window = {}
 
-    while(not patient_pop_window_makes_sense):
 
-        monthly_mean_min = np.random.randint(monthly_mean_lower_bound,     monthly_mean_upper_bound    )
-        monthly_mean_max = np.random.randint(monthly_mean_lower_bound + 1, monthly_mean_upper_bound + 1)
-    
-        monthly_std_dev_min = np.random.randint(monthly_std_dev_lower_bound,     monthly_std_dev_upper_bound    )
-        monthly_std_dev_max = np.random.randint(monthly_std_dev_lower_bound + 1, monthly_std_dev_upper_bound + 1)
-    
-        monthly_mean_axis_makes_sense    =    monthly_mean_min < monthly_mean_max
-        monthly_std_dev_axis_makes_sense = monthly_std_dev_min < monthly_std_dev_max
-        overdispersed_patients_allowed   = monthly_std_dev_max > np.sqrt(monthly_mean_min)
-        patient_pop_window_makes_sense = monthly_mean_axis_makes_sense and monthly_std_dev_axis_makes_sense and overdispersed_patients_allowed
-    
-    return [monthly_mean_min, monthly_mean_max, monthly_std_dev_min, monthly_std_dev_max]
+def get_admissible_theo_patient_pop_cells(monthly_mean_min,
+                                          monthly_mean_max,
+                                          monthly_std_dev_min,
+                                          monthly_std_dev_max):
 
+    window = (int(monthly_mean_min), int(monthly_mean_max), int(monthly_std_dev_min), int(monthly_std_dev_max))
 
-def generate_theo_patient_pop_params(monthly_mean_min,
-                                     monthly_mean_max,
-                                     monthly_std_dev_min,
-                                     monthly_std_dev_max,
-                                     num_theo_patients_per_trial_arm):
+    if(window not in admissible_theo_patient_pop_cells_per_window):
 
-    theo_patient_pop_params = np.zeros((num_theo_patients_per_trial_arm, 2))
+        [monthly_means, monthly_std_devs] = \
+            np.meshgrid(np.arange(monthly_mean_min,    monthly_mean_max    + 1), 
+                        np.arange(monthly_std_dev_min, monthly_std_dev_max + 1), indexing='ij')
 
-    for patient_index in range(num_theo_patients_per_trial_arm):
+        # a patient needs a non-zero mean and a standard deviation which is overdispersed with respect to that mean
+        non_zero_mean = monthly_means != 0
+        overdispersed = monthly_std_devs > np.sqrt(monthly_means)
+        admissible = non_zero_mean & overdispersed
 
-        overdispersed = False
-        non_zero_mean = False
-        
-        while((not overdispersed) or (not non_zero_mean)):
+        if(not np.any(admissible)):
 
-            overdispersed = False
-            non_zero_mean = False
+            raise ValueError('There are no patients with a non-zero, overdispersed monthly mean and monthly standard deviation within the given window')
 
-            monthly_mean    = np.random.randint(monthly_mean_min,    monthly_mean_max    + 1)
-            monthly_std_dev = np.random.randint(monthly_std_dev_min, monthly_std_dev_max + 1)
+        admissible_theo_patient_pop_cells = np.column_stack((monthly_means[admissible], monthly_std_devs[admissible])).astype(float)
+        admissible_theo_patient_pop_cells.setflags(write=False)
 
-            if(monthly_mean != 0):
+        admissible_theo_patient_pop_cells_per_window[window] = admissible_theo_patient_pop_cells
 
-                non_zero_mean = True
+    return admissible_theo_patient_pop_cells_per_window[window]
 
-            if(monthly_std_dev > np.sqrt(monthly_mean)):
 
-                overdispersed = True
+def generate_theo_patient_pop_params(monthly_mean_min,
+                                     monthly_mean_max,
+                                     monthly_std_dev_min,
+                                     monthly_std_dev_max,
+                                     num_theo_patients_per_trial_arm,
+                                     rng=None):
+
+    rng = get_rng(rng)
+
+    admissible_theo_patient_pop_cells = \
+        get_admissible_theo_patient_pop_cells(monthly_mean_min,
+                                              monthly_mean_max,
+                                              monthly_std_dev_min,
+                                              monthly_std_dev_max)
 
-        theo_patient_pop_params[patient_index, 0] = monthly_mean
-        theo_patient_pop_params[patient_index, 1] = monthly_std_dev
+    # rejecting inadmissible draws from the whole window is the same as drawing uniformly from the admissible cells
+    admissible_cell_indices = rng.integers(0, len(admissible_theo_patient_pop_cells), num_theo_patients_per_trial_arm)
+    theo_patient_pop_params = admissible_theo_patient_pop_cells[admissible_cell_indices]
     
     return theo_patient_pop_params
 
 
 def generate_NV_model_patient_pop_params(num_theo_patients_per_trial_arm,
-                                         one_or_two):
+                                         one_or_two,
+                                         rng=None):
+
+    rng = get_rng(rng)
 
     if(one_or_two == 'one'):
 
@@ -91,25 +166,37 @@ def generate_NV_model_patient_pop_params(num_theo_patients_per_trial_arm,
 
         raise ValueError('the \'one_or_two\' parameter in the generate_NV_model_patient_pop() function is supposed to take one of two values: \'one\' or \'two\'')
 
-    NV_model_patient_pop_params = np.zeros((num_theo_patients_per_trial_arm, 2))
+    # draw every patient's daily NV model parameters all at once
+    daily_ns = rng.gamma(shape, 1/scale, num_theo_patients_per_trial_arm)
+    daily_ps = rng.beta(alpha, beta, num_theo_patients_per_trial_arm)
 
-    for patient_index in range(num_theo_patients_per_trial_arm):
+    odds_ratios = (1 - daily_ps)/daily_ps
 
-        daily_n = np.random.gamma(shape, 1/scale)
-        daily_p = np.random.beta(alpha, beta)
+    daily_means    = daily_ns*odds_ratios
+    daily_std_devs = np.sqrt(daily_means/daily_ps)
 
-        odds_ratio = (1 - daily_p)/daily_p
+    monthly_means    = np.round(       28*daily_means       )
+    monthly_std_devs = np.round( np.sqrt(28)*daily_std_devs )
 
-        daily_mean    = daily_n*odds_ratio
-        daily_std_dev = np.sqrt(daily_mean/daily_p)
+    NV_model_patient_pop_params = np.column_stack((monthly_means, monthly_std_devs))
 
-        monthly_mean    = np.round(       28*daily_mean       )
-        monthly_std_dev = np.round( np.sqrt(28)*daily_std_dev )
+    return NV_model_patient_pop_params
 
-        NV_model_patient_pop_params[patient_index, 0] = monthly_mean
-        NV_model_patient_pop_params[patient_index, 1] = monthly_std_dev
 
-    return NV_model_patient_pop_params
+def generate_NV_model_patient_pop_params_per_trial(num_trials,
+                                                   num_theo_patients_per_trial_arm,
+                                                   one_or_two,
+                                                   rng=None):
+
+    # generate the placebo arm and the drug arm of every trial in one call, as a (trials x arms x patients x 2) tensor
+    NV_model_patient_pop_params = \
+        generate_NV_model_patient_pop_params(num_trials*2*num_theo_patients_per_trial_arm,
+                                             one_or_two,
+                                             rng)
+
+    NV_model_patient_pop_params_per_trial = NV_model_patient_pop_params.reshape((num_trials, 2, num_theo_patients_per_trial_arm, 2))
+
+    return NV_model_patient_pop_params_per_trial
 
 
 def convert_theo_pop_hist(monthly_mean_min,
@@ -133,6 +220,129 @@ def convert_theo_pop_hist(monthly_mean_min,
     return theo_trial_arm_pop_hist
 
 
+def convert_theo_pop_hist_cell_indices(monthly_mean_min,
+                                       monthly_mean_max,
+                                       monthly_std_dev_min,
+                                       monthly_std_dev_max,
+                                       theo_trial_arm_patient_pop_params):
+
+    num_monthly_mean_bins    = monthly_mean_max    - (monthly_mean_min    - 1)
+    num_monthly_std_dev_bins = monthly_std_dev_max - (monthly_std_dev_min - 1)
+
+    monthly_means    = theo_trial_arm_patient_pop_params[..., 0]
+    monthly_std_devs = theo_trial_arm_patient_pop_params[..., 1]
+
+    monthly_mean_bin_indices    = np.floor(monthly_means    - monthly_mean_min   ).astype(int)
+    monthly_std_dev_bin_indices = np.floor(monthly_std_devs - monthly_std_dev_min).astype(int)
+
+    # just like np.histogram2d(), values on the upper edge of the histogram go into its last bin
+    monthly_mean_bin_indices[monthly_means == monthly_mean_min + num_monthly_mean_bins] = num_monthly_mean_bins - 1
+    monthly_std_dev_bin_indices[monthly_std_devs == monthly_std_dev_min + num_monthly_std_dev_bins] = num_monthly_std_dev_bins - 1
+
+    in_range = (monthly_mean_bin_indices    >= 0) & (monthly_mean_bin_indices    < num_monthly_mean_bins   ) & \
+               (monthly_std_dev_bin_indices >= 0) & (monthly_std_dev_bin_indices < num_monthly_std_dev_bins)
+
+    # each patient's flat cell index in the flipped (std, mean) histogram, or -1 if they fall outside of the histogram
+    flipped_monthly_std_dev_bin_indices = num_monthly_std_dev_bins - 1 - monthly_std_dev_bin_indices
+    cell_indices = np.where(in_range, flipped_monthly_std_dev_bin_indices*num_monthly_mean_bins + monthly_mean_bin_indices, -1)
+
+    return [cell_indices, num_monthly_std_dev_bins, num_monthly_mean_bins]
+
+
+def convert_theo_pop_hists_per_trial_arm_size(monthly_mean_min,
+                                              monthly_mean_max,
+                                              monthly_std_dev_min,
+                                              monthly_std_dev_max,
+                                              theo_trial_arm_patient_pop_params,
+                                              patient_nums):
+
+    [cell_indices, num_monthly_std_dev_bins, num_monthly_mean_bins] = \
+        convert_theo_pop_hist_cell_indices(monthly_mean_min,
+                                           monthly_mean_max,
+                                           monthly_std_dev_min,
+                                           monthly_std_dev_max,
+                                           theo_trial_arm_patient_pop_params)
+
+    num_patients = len(cell_indices)
+    num_cells = num_monthly_std_dev_bins*num_monthly_mean_bins
+
+    # take the running count of every cell along the patient order, starting from a trial arm with no patients
+    cumulative_cell_counts = np.zeros((num_patients + 1, num_cells))
+    patients_in_range = np.flatnonzero(cell_indices >= 0)
+    cumulative_cell_counts[patients_in_range + 1, cell_indices[patients_in_range]] = 1
+    cumulative_cell_counts = np.cumsum(cumulative_cell_counts, 0)
+
+    # the histogram of the first patient_num patients is the running count after patient_num patients
+    theo_trial_arm_pop_hists = \
+        cumulative_cell_counts[np.asarray(patient_nums)].reshape((-1, num_monthly_std_dev_bins, num_monthly_mean_bins))
+    theo_trial_arm_pop_hists = np.moveaxis(theo_trial_arm_pop_hists, 0, -1)
+
+    return theo_trial_arm_pop_hists
+
+
+def convert_theo_pop_hists(monthly_mean_min,
+                           monthly_mean_max,
+                           monthly_std_dev_min,
+                           monthly_std_dev_max,
+                           theo_patient_pop_params_per_pop):
+
+    [cell_indices, num_monthly_std_dev_bins, num_monthly_mean_bins] = \
+        convert_theo_pop_hist_cell_indices(monthly_mean_min,
+                                           monthly_mean_max,
+                                           monthly_std_dev_min,
+                                           monthly_std_dev_max,
+                                           theo_patient_pop_params_per_pop)
+
+    num_pops  = len(cell_indices)
+    num_cells = num_monthly_std_dev_bins*num_monthly_mean_bins
+
+    # offset every population's cell indices by its own block of cells so that all populations can be counted with one bincount
+    offset_cell_indices = cell_indices + num_cells*np.arange(num_pops).reshape((-1, 1))
+    cell_counts = np.bincount(offset_cell_indices[cell_indices >= 0], minlength=num_pops*num_cells)
+
+    keras_formatted_theo_pop_hists = cell_counts.reshape((num_pops, num_monthly_std_dev_bins, num_monthly_mean_bins, 1)).astype(float)
+
+    return keras_formatted_theo_pop_hists
+
+
+def estimate_baseline_acceptance_rates(monthly_mean_min,
+                                       monthly_mean_max,
+                                       monthly_std_dev_min,
+                                       monthly_std_dev_max,
+                                       num_baseline_months,
+                                       baseline_time_scaling_const,
+                                       minimum_required_baseline_seizure_count,
+                                       num_theo_patients_per_cell,
+                                       rng=None):
+
+    num_monthly_means    = monthly_mean_max    - monthly_mean_min    + 1
+    num_monthly_std_devs = monthly_std_dev_max - monthly_std_dev_min + 1
+
+    baseline_acceptance_rates = np.full((num_monthly_std_devs, num_monthly_means), np.nan)
+
+    for monthly_mean_index in range(num_monthly_means):
+        for monthly_std_dev_index in range(num_monthly_std_devs):
+
+            monthly_mean    = monthly_mean_min    + monthly_mean_index
+            monthly_std_dev = monthly_std_dev_min + monthly_std_dev_index
+
+            if(monthly_mean != 0 and monthly_std_dev > np.sqrt(monthly_mean)):
+
+                [_, num_attempts] = \
+                    generate_seizure_diaries_with_minimum_count(num_baseline_months,
+                                                                np.full(num_theo_patients_per_cell, monthly_mean),
+                                                                np.full(num_theo_patients_per_cell, monthly_std_dev),
+                                                                baseline_time_scaling_const,
+                                                                minimum_required_baseline_seizure_count,
+                                                                rng)
+                
+                baseline_acceptance_rates[monthly_std_dev_index, monthly_mean_index] = num_theo_patients_per_cell/np.sum(num_attempts)
+    
+    baseline_acceptance_rates = np.flipud(baseline_acceptance_rates)
+
+    return baseline_acceptance_rates
+
+
 def generate_homogenous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
                                                 monthly_mean, 
                                                 monthly_std_dev,
@@ -142,7 +352,8 @@ def generate_homogenous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
                                                 testing_time_scaling_const,
                                                 minimum_required_baseline_seizure_count,
                                                 placebo_mu,
-                                                placebo_sigma):
+                                                placebo_sigma,
+                                                rng=None):
 
     if(monthly_mean == 0):
 
@@ -152,31 +363,23 @@ def generate_homogenous_placebo_arm_patient_pop(num_theo_patients_per_trial_arm,
 
         raise ValueError('The monthly standard deviation must be greater than the square root of the monthly mean for a homogenous patient population.')
 
-    num_baseline_scaled_time_units = num_baseline_months*baseline_time_scaling_const
-    num_testing_scaled_time_units  = num_testing_months*testing_time_scaling_const
-
-    placebo_arm_baseline_seizure_diaries = np.zeros((num_theo_patients_per_trial_arm, num_baseline_scaled_time_units))
-    placebo_arm_testing_seizure_diaries  = np.zeros((num_theo_patients_per_trial_arm, num_testing_scaled_time_units))
-
-    for theo_patient_index in range(num_theo_patients_per_trial_arm):
-
-        placebo_arm_baseline_seizure_diary = \
-            generate_baseline_seizure_diary(monthly_mean, 
-                                            monthly_std_dev,
-                                            num_baseline_months,
-                                            baseline_time_scaling_const,
-                                            minimum_required_baseline_seizure_count)
-
-        placebo_arm_testing_seizure_diary = \
-            generate_placebo_arm_testing_seizure_diary(num_testing_months, 
-                                                       monthly_mean, 
-                                                       monthly_std_dev, 
-                                                       testing_time_scaling_const,
-                                                       placebo_mu, 
-                                                       placebo_sigma)
-        
-        placebo_arm_baseline_seizure_diaries[theo_patient_index, :] = placebo_arm_baseline_seizure_diary
-        placebo_arm_testing_seizure_diaries[theo_patient_index, :]  = placebo_arm_testing_seizure_diary
+    # every patient shares the same monthly mean and monthly standard deviation, so the whole trial arm is drawn
+    # at once from the one set of gamma-poisson parameters (see seizure_diary_generation.generate_seizure_diaries)
+    theo_placebo_arm_patient_pop_params = \
+        np.tile([monthly_mean, monthly_std_dev], (num_theo_patients_per_trial_arm, 1)).astype(float)
+
+    [placebo_arm_baseline_seizure_diaries, 
+     placebo_arm_testing_seizure_diaries  ] = \
+         generate_heterogeneous_trial_arm_patient_pop(num_theo_patients_per_trial_arm,
+                                                      theo_placebo_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu],
+                                                      [placebo_sigma],
+                                                      rng)
 
     return [placebo_arm_baseline_seizure_diaries, 
             placebo_arm_testing_seizure_diaries  ]
@@ -193,7 +396,8 @@ def generate_homogenous_drug_arm_patient_pop(num_theo_patients_per_trial_arm,
                                              placebo_mu,
                                              placebo_sigma,
                                              drug_mu,
-                                             drug_sigma):
+                                             drug_sigma,
+                                             rng=None):
 
     if(monthly_mean == 0):
 
@@ -203,38 +407,93 @@ def generate_homogenous_drug_arm_patient_pop(num_theo_patients_per_trial_arm,
 
         raise ValueError('The monthly standard deviation must be greater than the square root of the monthly mean for a homogenous patient population.')
 
-    num_baseline_scaled_time_units = num_baseline_months*baseline_time_scaling_const
-    num_testing_scaled_time_units  = num_testing_months*testing_time_scaling_const
-
-    drug_arm_baseline_seizure_diaries = np.zeros((num_theo_patients_per_trial_arm, num_baseline_scaled_time_units))
-    drug_arm_testing_seizure_diaries  = np.zeros((num_theo_patients_per_trial_arm, num_testing_scaled_time_units))
-
-    for theo_patient_index in range(num_theo_patients_per_trial_arm):
-
-        drug_arm_baseline_seizure_diary = \
-            generate_baseline_seizure_diary(monthly_mean, 
-                                            monthly_std_dev,
-                                            num_baseline_months,
-                                            baseline_time_scaling_const,
-                                            minimum_required_baseline_seizure_count)
-
-        drug_arm_testing_seizure_diary = \
-            generate_drug_arm_testing_seizure_diary(num_testing_months, 
-                                                    monthly_mean, 
-                                                    monthly_std_dev, 
-                                                    testing_time_scaling_const,
-                                                    placebo_mu, 
-                                                    placebo_sigma,
-                                                    drug_mu, 
-                                                    drug_sigma)
-        
-        drug_arm_baseline_seizure_diaries[theo_patient_index, :] = drug_arm_baseline_seizure_diary
-        drug_arm_testing_seizure_diaries[theo_patient_index, :]  = drug_arm_testing_seizure_diary
+    # every patient shares the same monthly mean and monthly standard deviation, so the whole trial arm is drawn
+    # at once from the one set of gamma-poisson parameters (see seizure_diary_generation.generate_seizure_diaries)
+    theo_drug_arm_patient_pop_params = \
+        np.tile([monthly_mean, monthly_std_dev], (num_theo_patients_per_trial_arm, 1)).astype(float)
+
+    # the placebo effect is applied before the drug effect
+    [drug_arm_baseline_seizure_diaries, 
+     drug_arm_testing_seizure_diaries  ] = \
+         generate_heterogeneous_trial_arm_patient_pop(num_theo_patients_per_trial_arm,
+                                                      theo_drug_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu, drug_mu],
+                                                      [placebo_sigma, drug_sigma],
+                                                      rng)
 
     return [drug_arm_baseline_seizure_diaries, 
             drug_arm_testing_seizure_diaries  ]
 
 
+def generate_heterogeneous_trial_arm_patient_pop(num_theo_patients_in_trial_arm,
+                                                 theo_trial_arm_patient_pop_params,
+                                                 num_baseline_months,
+                                                 num_testing_months,
+                                                 baseline_time_scaling_const,
+                                                 testing_time_scaling_const,
+                                                 minimum_required_baseline_seizure_count,
+                                                 effect_mus,
+                                                 effect_sigmas,
+                                                 rng=None,
+                                                 time_scaled_detail_needed=True,
+                                                 seizure_diary_buffers=None):
+
+    monthly_means    = theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 0]
+    monthly_std_devs = theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, 1]
+
+    # if seizure_diary_buffers is given (see endpoint_simulation.allocate_seizure_diary_buffers), then only as much of each 
+    # buffer is used as this trial arm needs at the resolution its testing periods are generated at
+    if(seizure_diary_buffers is None):
+
+        [baseline_seizure_diary_buffer, testing_seizure_diary_buffer] = [None, None]
+
+    else:
+
+        if(time_scaled_detail_needed):
+            num_testing_columns = num_testing_months*testing_time_scaling_const
+        else:
+            num_testing_columns = num_testing_months
+
+        baseline_seizure_diary_buffer = seizure_diary_buffers[0][0:num_theo_patients_in_trial_arm, :]
+        testing_seizure_diary_buffer  = seizure_diary_buffers[1][0:num_theo_patients_in_trial_arm, 0:num_testing_columns]
+
+    trial_arm_baseline_seizure_diaries = \
+        generate_baseline_seizure_diaries(monthly_means, 
+                                          monthly_std_devs,
+                                          num_baseline_months,
+                                          baseline_time_scaling_const,
+                                          minimum_required_baseline_seizure_count,
+                                          rng,
+                                          out=baseline_seizure_diary_buffer)
+
+    # every patient gets their own effects, applied in the order in which they are given
+    [monthly_testing_seizure_diaries, 
+     time_scaled_testing_seizure_diaries] = \
+         generate_testing_seizure_diaries_at_resolution(num_testing_months, 
+                                                        monthly_means, 
+                                                        monthly_std_devs, 
+                                                        testing_time_scaling_const,
+                                                        effect_mus,
+                                                        effect_sigmas,
+                                                        time_scaled_detail_needed,
+                                                        rng,
+                                                        out=testing_seizure_diary_buffer)
+
+    # the testing periods are returned at the resolution they were generated at
+    if(time_scaled_detail_needed):
+        trial_arm_testing_seizure_diaries = time_scaled_testing_seizure_diaries
+    else:
+        trial_arm_testing_seizure_diaries = monthly_testing_seizure_diaries
+
+    return [trial_arm_baseline_seizure_diaries, 
+            trial_arm_testing_seizure_diaries  ]
+
+
 def generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_in_placebo_arm,
                                                    theo_placebo_arm_patient_pop_params,
                                                    num_baseline_months,
@@ -243,36 +502,21 @@ def generate_heterogeneous_placebo_arm_patient_pop(num_theo_patients_in_placebo_
                                                    testing_time_scaling_const,
                                                    minimum_required_baseline_seizure_count,
                                                    placebo_mu,
-                                                   placebo_sigma):
-
-    num_baseline_scaled_time_units = num_baseline_months*baseline_time_scaling_const
-    num_testing_scaled_time_units  = num_testing_months*testing_time_scaling_const
-
-    placebo_arm_baseline_seizure_diaries = np.zeros((num_theo_patients_in_placebo_arm, num_baseline_scaled_time_units))
-    placebo_arm_testing_seizure_diaries  = np.zeros((num_theo_patients_in_placebo_arm, num_testing_scaled_time_units))
-
-    for theo_patient_index in range(num_theo_patients_in_placebo_arm):
-
-        monthly_mean    = theo_placebo_arm_patient_pop_params[theo_patient_index, 0]
-        monthly_std_dev = theo_placebo_arm_patient_pop_params[theo_patient_index, 1]
-
-        placebo_arm_baseline_seizure_diary = \
-            generate_baseline_seizure_diary(monthly_mean, 
-                                            monthly_std_dev,
-                                            num_baseline_months,
-                                            baseline_time_scaling_const,
-                                            minimum_required_baseline_seizure_count)
-        
-        placebo_arm_testing_seizure_diary = \
-            generate_placebo_arm_testing_seizure_diary(num_testing_months, 
-                                                       monthly_mean, 
-                                                       monthly_std_dev, 
-                                                       testing_time_scaling_const,
-                                                       placebo_mu, 
-                                                       placebo_sigma)
-        
-        placebo_arm_baseline_seizure_diaries[theo_patient_index, :] = placebo_arm_baseline_seizure_diary
-        placebo_arm_testing_seizure_diaries[theo_patient_index, :]  = placebo_arm_testing_seizure_diary
+                                                   placebo_sigma,
+                                                   rng=None):
+
+    [placebo_arm_baseline_seizure_diaries, 
+     placebo_arm_testing_seizure_diaries  ] = \
+         generate_heterogeneous_trial_arm_patient_pop(num_theo_patients_in_placebo_arm,
+                                                      theo_placebo_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu],
+                                                      [placebo_sigma],
+                                                      rng)
 
     return [placebo_arm_baseline_seizure_diaries, 
             placebo_arm_testing_seizure_diaries  ]
@@ -288,7 +532,8 @@ def generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_in_drug_arm,
                                                 placebo_mu,
                                                 placebo_sigma,
                                                 drug_mu,
-                                                drug_sigma):
+                                                drug_sigma,
+                                                rng=None):
     '''
 
     Inputs:
@@ -317,40 +562,154 @@ def generate_heterogeneous_drug_arm_patient_pop(num_theo_patients_in_drug_arm,
         11) drug_sigma:
             (float) - the standard deviation of the normally distributed drug effect, expressed as 
                       a percentage
+        12) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
 
     '''
-    
-    num_baseline_scaled_time_units = num_baseline_months*baseline_time_scaling_const
-    num_testing_scaled_time_units  = num_testing_months*testing_time_scaling_const
-
-    drug_arm_baseline_seizure_diaries = np.zeros((num_theo_patients_in_drug_arm, num_baseline_scaled_time_units))
-    drug_arm_testing_seizure_diaries  = np.zeros((num_theo_patients_in_drug_arm, num_testing_scaled_time_units))
-
-    for theo_patient_index in range(num_theo_patients_in_drug_arm):
-
-        monthly_mean    = theo_drug_arm_patient_pop_params[theo_patient_index, 0]
-        monthly_std_dev = theo_drug_arm_patient_pop_params[theo_patient_index, 1]
-
-        drug_arm_baseline_seizure_diary = \
-            generate_baseline_seizure_diary(monthly_mean, 
-                                            monthly_std_dev,
-                                            num_baseline_months,
-                                            baseline_time_scaling_const,
-                                            minimum_required_baseline_seizure_count)
-
-        drug_arm_testing_seizure_diary = \
-            generate_drug_arm_testing_seizure_diary(num_testing_months, 
-                                                    monthly_mean, 
-                                                    monthly_std_dev, 
-                                                    testing_time_scaling_const,
-                                                    placebo_mu, 
-                                                    placebo_sigma,
-                                                    drug_mu, 
-                                                    drug_sigma)
-        
-        drug_arm_baseline_seizure_diaries[theo_patient_index, :] = drug_arm_baseline_seizure_diary
-        drug_arm_testing_seizure_diaries[theo_patient_index, :]  = drug_arm_testing_seizure_diary
+
+    # the placebo effect is applied before the drug effect
+    [drug_arm_baseline_seizure_diaries, 
+     drug_arm_testing_seizure_diaries  ] = \
+         generate_heterogeneous_trial_arm_patient_pop(num_theo_patients_in_drug_arm,
+                                                      theo_drug_arm_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      [placebo_mu, drug_mu],
+                                                      [placebo_sigma, drug_sigma],
+                                                      rng)
 
     return [drug_arm_baseline_seizure_diaries, 
             drug_arm_testing_seizure_diaries  ]
 
+
+def generate_heterogeneous_trial_arm_tensors(num_trials,
+                                             num_theo_patients_in_trial_arm,
+                                             theo_trial_arm_patient_pop_params,
+                                             num_baseline_months,
+                                             num_testing_months,
+                                             baseline_time_scaling_const,
+                                             testing_time_scaling_const,
+                                             minimum_required_baseline_seizure_count,
+                                             effect_mus,
+                                             effect_sigmas,
+                                             rng=None,
+                                             time_scaled_detail_needed=True,
+                                             seizure_diary_buffers=None):
+
+    # the same trial arm is generated num_trials times over by stacking num_trials copies of its patients into one batch
+    num_theo_patients_in_all_trials = num_trials*num_theo_patients_in_trial_arm
+    theo_all_trials_patient_pop_params = \
+        np.tile(theo_trial_arm_patient_pop_params[0:num_theo_patients_in_trial_arm, :], (num_trials, 1))
+
+    [trial_arm_baseline_seizure_diaries, 
+     trial_arm_testing_seizure_diaries  ] = \
+         generate_heterogeneous_trial_arm_patient_pop(num_theo_patients_in_all_trials,
+                                                      theo_all_trials_patient_pop_params,
+                                                      num_baseline_months,
+                                                      num_testing_months,
+                                                      baseline_time_scaling_const,
+                                                      testing_time_scaling_const,
+                                                      minimum_required_baseline_seizure_count,
+                                                      effect_mus,
+                                                      effect_sigmas,
+                                                      rng,
+                                                      time_scaled_detail_needed,
+                                                      seizure_diary_buffers)
+
+    # reshape the batches into (trials x patients x months or scaled time units) tensors
+    trial_arm_baseline_seizure_diary_tensor = \
+        trial_arm_baseline_seizure_diaries.reshape((num_trials, num_theo_patients_in_trial_arm, -1))
+    trial_arm_testing_seizure_diary_tensor = \
+        trial_arm_testing_seizure_diaries.reshape((num_trials, num_theo_patients_in_trial_arm, -1))
+
+    return [trial_arm_baseline_seizure_diary_tensor, 
+            trial_arm_testing_seizure_diary_tensor  ]
+
+
+def generate_trial(num_theo_patients_in_placebo_arm,
+                   theo_placebo_arm_patient_pop_params,
+                   num_theo_patients_in_drug_arm,
+                   theo_drug_arm_patient_pop_params,
+                   num_baseline_months,
+                   num_testing_months,
+                   baseline_time_scaling_const,
+                   testing_time_scaling_const,
+                   minimum_required_baseline_seizure_count,
+                   placebo_arm_effect_mus,
+                   placebo_arm_effect_sigmas,
+                   drug_arm_effect_mus,
+                   drug_arm_effect_sigmas,
+                   requested_endpoint_names=None,
+                   rng=None):
+
+    if(requested_endpoint_names is None):
+        requested_endpoint_names = endpoint_names
+
+    # the testing periods only need to be generated on the smaller time scale if one of the requested endpoints needs them
+    time_scaled_detail_needed = \
+        any(endpoint_name in time_scaled_endpoint_names for endpoint_name in requested_endpoint_names)
+
+    # both trial arms are generated as one batch of patients, with the placebo arm patients first
+    monthly_means    = np.concatenate((theo_placebo_arm_patient_pop_params[0:num_theo_patients_in_placebo_arm, 0],
+                                       theo_drug_arm_patient_pop_params[0:num_theo_patients_in_drug_arm, 0]))
+    monthly_std_devs = np.concatenate((theo_placebo_arm_patient_pop_params[0:num_theo_patients_in_placebo_arm, 1],
+                                       theo_drug_arm_patient_pop_params[0:num_theo_patients_in_drug_arm, 1]))
+
+    # the trial arm with fewer effects is padded with effects which never remove any seizures
+    num_effects = max(len(placebo_arm_effect_mus), len(drug_arm_effect_mus))
+    placebo_arm_effect_mus    = list(placebo_arm_effect_mus)    + [0]*(num_effects - len(placebo_arm_effect_mus))
+    placebo_arm_effect_sigmas = list(placebo_arm_effect_sigmas) + [0]*(num_effects - len(placebo_arm_effect_sigmas))
+    drug_arm_effect_mus       = list(drug_arm_effect_mus)       + [0]*(num_effects - len(drug_arm_effect_mus))
+    drug_arm_effect_sigmas    = list(drug_arm_effect_sigmas)    + [0]*(num_effects - len(drug_arm_effect_sigmas))
+
+    # every patient gets the effects of their own trial arm
+    trial_arm_sizes = [num_theo_patients_in_placebo_arm, num_theo_patients_in_drug_arm]
+    effect_mus    = [np.repeat([placebo_arm_effect_mu, drug_arm_effect_mu], trial_arm_sizes) 
+                     for [placebo_arm_effect_mu, drug_arm_effect_mu] in zip(placebo_arm_effect_mus, drug_arm_effect_mus)]
+    effect_sigmas = [np.repeat([placebo_arm_effect_sigma, drug_arm_effect_sigma], trial_arm_sizes) 
+                     for [placebo_arm_effect_sigma, drug_arm_effect_sigma] in zip(placebo_arm_effect_sigmas, drug_arm_effect_sigmas)]
+
+    baseline_seizure_diaries = \
+        generate_baseline_seizure_diaries(monthly_means, 
+                                          monthly_std_devs,
+                                          num_baseline_months,
+                                          baseline_time_scaling_const,
+                                          minimum_required_baseline_seizure_count,
+                                          rng)
+
+    [monthly_testing_seizure_diaries, 
+     time_scaled_testing_seizure_diaries] = \
+         generate_testing_seizure_diaries_at_resolution(num_testing_months, 
+                                                        monthly_means, 
+                                                        monthly_std_devs, 
+                                                        testing_time_scaling_const,
+                                                        effect_mus,
+                                                        effect_sigmas,
+                                                        time_scaled_detail_needed,
+                                                        rng)
+
+    # split the batch back into its trial arms
+    [placebo_arm_baseline_seizure_diaries, 
+     drug_arm_baseline_seizure_diaries] = \
+         np.split(baseline_seizure_diaries, [num_theo_patients_in_placebo_arm])
+    [placebo_arm_monthly_testing_seizure_diaries, 
+     drug_arm_monthly_testing_seizure_diaries] = \
+         np.split(monthly_testing_seizure_diaries, [num_theo_patients_in_placebo_arm])
+
+    if(time_scaled_detail_needed):
+        [placebo_arm_time_scaled_testing_seizure_diaries, 
+         drug_arm_time_scaled_testing_seizure_diaries] = \
+             np.split(time_scaled_testing_seizure_diaries, [num_theo_patients_in_placebo_arm])
+    else:
+        placebo_arm_time_scaled_testing_seizure_diaries = None
+        drug_arm_time_scaled_testing_seizure_diaries    = None
+
+    return [placebo_arm_baseline_seizure_diaries,
+            placebo_arm_monthly_testing_seizure_diaries,
+            placebo_arm_time_scaled_testing_seizure_diaries,
+            drug_arm_baseline_seizure_diaries,
+            drug_arm_monthly_testing_seizure_diaries,
+            drug_arm_time_scaled_testing_seizure_diaries]
@@ -0,0 +1,246 @@
+import os
+import itertools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+random_stream_names = ['population', 'placebo', 'drug']
+
+default_rng = np.random.default_rng()
+
+num_rng_threads = 1
+rng_thread_pool = None
+
+# batches with fewer random numbers than this are always drawn on the calling thread, since splitting them costs more than it saves
+min_random_numbers_per_thread = 100000
+
+
+def get_rng(rng):
+    '''
+
+    This function returns the random number generator that a generator function should draw from:
+    either the numpy Generator it was given, or the default process-wide Generator if it was not
+    given one. Every function in utility_code which draws random numbers takes an optional 'rng'
+    input and passes it through this function.
+
+    Inputs:
+
+        1) rng:
+            (Numpy Generator or None) - the random number generator given to a generator function
+
+    Outputs:
+
+        1) rng:
+            (Numpy Generator) - the random number generator to draw from
+
+    '''
+
+    if(rng is None):
+
+        return default_rng
+
+    return rng
+
+
+def generate_base_seed():
+    '''
+
+    This function generates a fresh, high-entropy base seed. The base seed should be printed or
+    stored by whichever script generated it, so that the run can be reproduced later on by passing
+    the same base seed to get_random_stream().
+
+    Outputs:
+
+        1) base_seed:
+            (int) - a new base seed
+
+    '''
+
+    base_seed = np.random.SeedSequence().entropy
+
+    return base_seed
+
+
+def get_random_stream(base_seed,
+                      block_num,
+                      file_index,
+                      trial_index,
+                      random_stream_name):
+    '''
+
+    This function returns an independent random number generator for one part of one trial. Each
+    stream is a Philox counter-based generator whose seed sequence is keyed on the base seed and on
+    the (block number, file index, trial index, stream name) of the work it is used for. This means
+    that any trial can be regenerated on its own, and that trials can be farmed out to any number
+    of processes in any order while still producing bit-identical results, without any two streams
+    overlapping.
+
+    Inputs:
+
+        1) base_seed:
+            (int) - the base seed of the whole run
+        2) block_num:
+            (int) - the block number of the data being generated
+        3) file_index:
+            (int) - the file index of the data being generated within its block
+        4) trial_index:
+            (int) - the index of the trial being generated within its file
+        5) random_stream_name:
+            (string) - what the stream will be used for: either 'population' (the patient population
+                       parameters), 'placebo' (the placebo arm), or 'drug' (the drug arm)
+
+    Outputs:
+
+        1) rng:
+            (Numpy Generator) - the random number generator for that part of that trial
+
+    '''
+
+    if(random_stream_name not in random_stream_names):
+
+        raise ValueError('The \'random_stream_name\' parameter must either be \'population\', \'placebo\' or \'drug\'')
+
+    seed_sequence = \
+        np.random.SeedSequence(base_seed,
+                               spawn_key=(int(block_num),
+                                          int(file_index),
+                                          int(trial_index),
+                                          random_stream_names.index(random_stream_name)))
+
+    rng = np.random.Generator(np.random.Philox(seed_sequence))
+
+    return rng
+
+
+def iterate_trial_random_streams(base_seed,
+                                 block_num,
+                                 file_index):
+    '''
+
+    This function yields the random streams of both trial arms of trial 0, 1, 2, ... of one (block number,
+    file index) job (see get_random_stream), for algorithms which keep simulating new trials for as long 
+    as they run rather than a fixed number of them, so that every trial they simulate still gets its own 
+    placebo arm and drug arm streams.
+
+    Inputs:
+
+        1) base_seed:
+            (int) - the base seed of the whole run
+        2) block_num:
+            (int) - the block number of the job
+        3) file_index:
+            (int) - the file index of the job within its block
+
+    Yields:
+
+        1) trial_random_streams:
+            (list) - the placebo arm random number generator and the drug arm random number generator of the next trial
+
+    '''
+
+    for trial_index in itertools.count():
+
+        placebo_arm_rng = get_random_stream(base_seed, block_num, file_index, trial_index, 'placebo')
+        drug_arm_rng    = get_random_stream(base_seed, block_num, file_index, trial_index, 'drug')
+
+        yield [placebo_arm_rng, drug_arm_rng]
+
+
+def set_num_rng_threads(new_num_rng_threads):
+    '''
+
+    This function sets how many threads large batches of random numbers are drawn with (see
+    fill_rows_in_parallel()). Numpy releases the GIL while it fills large arrays of random numbers,
+    so several threads can fill different parts of the same array at the same time without each
+    process having to hold its own copy of the data. The number of threads can also be set before 
+    startup via the RCT_SNR_NUM_RNG_THREADS environment variable.
+
+    Inputs:
+
+        1) new_num_rng_threads:
+            (int) - the number of threads to draw random numbers with, where 1 means no extra threads
+
+    Outputs:
+
+        1) num_rng_threads:
+            (int) - the number of threads that random numbers will be drawn with
+
+    '''
+
+    global num_rng_threads
+    global rng_thread_pool
+
+    new_num_rng_threads = int(new_num_rng_threads)
+
+    if(new_num_rng_threads < 1):
+
+        raise ValueError('The \'new_num_rng_threads\' parameter must be at least 1')
+
+    if(rng_thread_pool is not None):
+        rng_thread_pool.shutdown()
+        rng_thread_pool = None
+
+    if(new_num_rng_threads > 1):
+        rng_thread_pool = ThreadPoolExecutor(new_num_rng_threads)
+
+    num_rng_threads = new_num_rng_threads
+
+    return num_rng_threads
+
+
+def get_num_rng_threads():
+
+    return num_rng_threads
+
+
+set_num_rng_threads(os.environ.get('RCT_SNR_NUM_RNG_THREADS', 1))
+
+
+def fill_rows_in_parallel(rng,
+                          num_rows,
+                          num_random_numbers_per_row,
+                          fill_rows):
+    '''
+
+    This function splits the rows of a batch of random numbers into one contiguous block of rows per
+    thread (see set_num_rng_threads), and calls fill_rows(block_rng, row_start_index, row_stop_index)
+    once per block. Every block is drawn from its own Generator, seeded from the given Generator, so 
+    that no two threads ever share a stream. The results only depend on the state of the given Generator
+    and on the number of threads, which means that they can be reproduced exactly as long as the number 
+    of threads stays the same. If there is only one thread, or if the batch is too small to be worth 
+    splitting, then fill_rows(rng, 0, num_rows) is called on the calling thread instead.
+
+    Inputs:
+
+        1) rng:
+            (Numpy Generator) - the random number generator to spawn the per-thread generators from
+        2) num_rows:
+            (int) - the number of rows in the batch
+        3) num_random_numbers_per_row:
+            (int) - roughly how many random numbers are drawn for each row
+        4) fill_rows:
+            (function) - the function which draws the random numbers for a block of rows
+
+    '''
+
+    num_threads = min(num_rng_threads, num_rows, max(1, (num_rows*num_random_numbers_per_row)//min_random_numbers_per_thread))
+
+    if(num_threads <= 1):
+
+        fill_rows(rng, 0, num_rows)
+
+        return
+
+    # Generator.spawn() is only available from numpy 1.25 onwards, so the per-thread generators are seeded from a seed sequence 
+    # which is itself seeded from the given Generator, which works on every numpy version that has Generators
+    block_seed_sequences = np.random.SeedSequence(rng.integers(2**63, size=4)).spawn(num_threads)
+    block_rngs = [np.random.Generator(np.random.Philox(block_seed_sequence)) for block_seed_sequence in block_seed_sequences]
+    block_boundaries = np.linspace(0, num_rows, num_threads + 1).astype(int)
+
+    block_futures = \
+        [rng_thread_pool.submit(fill_rows, block_rngs[block_index], block_boundaries[block_index], block_boundaries[block_index + 1])
+         for block_index in range(num_threads)]
+
+    # wait for every block to be filled, and re-raise any error that happened on one of the threads
+    for block_future in block_futures:
+        block_future.result()
@@ -0,0 +1,210 @@
+import os
+import tempfile
+import numpy as np
+from .endpoint_functions import calculate_fisher_exact_p_values_from_counts
+
+
+RR50_rejection_regions_folder_name = os.environ.get('RCT_SNR_CACHE_FOLDER',
+                                                    os.path.join(os.path.expanduser('~'), '.cache', 'rct_SNR'))
+
+# the rejection regions which have already been loaded or built by this process, keyed by (placebo arm size, drug arm size, alpha)
+RR50_rejection_regions = {}
+
+# the maximum number of tables that the p-values of one block of rows of a rejection region are calculated from at once
+max_num_tables_per_rejection_region_block = 2**20
+
+
+def get_umask():
+
+    # the umask can only be read by setting it, so it is set and then immediately restored
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return umask
+
+
+def get_RR50_rejection_region_file_name(num_placebo_arm_patients,
+                                        num_drug_arm_patients,
+                                        alpha):
+
+    RR50_rejection_region_file_name = \
+        os.path.join(RR50_rejection_regions_folder_name,
+                     'RR50_rejection_region_' + str(num_placebo_arm_patients) + '_' + str(num_drug_arm_patients) + '_' + repr(float(alpha)) + '.npy')
+
+    return RR50_rejection_region_file_name
+
+
+def build_RR50_rejection_region(num_placebo_arm_patients,
+                                num_drug_arm_patients,
+                                alpha):
+    '''
+
+    This function builds the rejection region of the RR50 endpoint for one pair of trial arm sizes. Since
+    the RR50 endpoint is a Fisher exact test on the numbers of responders in each trial arm, whether or not
+    a trial is successful only depends on the pair of (placebo arm responders, drug arm responders) once the
+    trial arm sizes are fixed, so the decision for every possible pair can be calculated in advance.
+
+    Inputs:
+
+        1) num_placebo_arm_patients:
+            (int) - the number of patients in the placebo arm
+        2) num_drug_arm_patients:
+            (int) - the number of patients in the drug arm
+        3) alpha:
+            (float) - the significance level, such that a trial is successful if its p-value is less than alpha
+
+    Outputs:
+
+        1) RR50_rejection_region:
+            (2D Numpy array) - a boolean array with one row per number of placebo arm responders and one
+                               column per number of drug arm responders, which is True wherever the null
+                               hypothesis is rejected
+
+    '''
+
+    num_drug_arm_responders = np.arange(num_drug_arm_patients + 1).reshape((1, -1))
+
+    RR50_rejection_region = np.zeros((num_placebo_arm_patients + 1, num_drug_arm_patients + 1), dtype=bool)
+
+    # every p-value is calculated from all of the tables with the same margins, so the rejection region is built a block of rows 
+    # at a time to keep those tables from taking up memory which grows with the cube of the trial arm sizes
+    num_tables_per_row = (num_drug_arm_patients + 1)*(num_placebo_arm_patients + 1)
+    num_rows_per_block = max(1, max_num_tables_per_rejection_region_block//num_tables_per_row)
+
+    for block_start_index in range(0, num_placebo_arm_patients + 1, num_rows_per_block):
+
+        block_stop_index = min(block_start_index + num_rows_per_block, num_placebo_arm_patients + 1)
+        num_placebo_arm_responders = np.arange(block_start_index, block_stop_index).reshape((-1, 1))
+
+        RR50_p_values = \
+            calculate_fisher_exact_p_values_from_counts(num_placebo_arm_responders,
+                                                        num_placebo_arm_patients,
+                                                        num_drug_arm_responders,
+                                                        num_drug_arm_patients)
+
+        RR50_rejection_region[block_start_index:block_stop_index, :] = RR50_p_values < alpha
+
+    return RR50_rejection_region
+
+
+def get_RR50_rejection_region(num_placebo_arm_patients,
+                              num_drug_arm_patients,
+                              alpha=0.05):
+    '''
+
+    This function returns the rejection region of the RR50 endpoint for one pair of trial arm sizes
+    (see build_RR50_rejection_region). Each rejection region is only built once: it is stored on disk
+    in the folder given by the RCT_SNR_CACHE_FOLDER environment variable (~/.cache/rct_SNR by default)
+    the first time it is needed, and every later process loads it from there instead. The file is
+    written under a temporary name and then renamed, so that several processes building the same
+    rejection region at the same time never read a half-written file.
+
+    Inputs:
+
+        1) num_placebo_arm_patients:
+            (int) - the number of patients in the placebo arm
+        2) num_drug_arm_patients:
+            (int) - the number of patients in the drug arm
+        3) alpha:
+            (float) - the significance level, such that a trial is successful if its p-value is less than alpha
+
+    Outputs:
+
+        1) RR50_rejection_region:
+            (2D Numpy array) - a boolean array with one row per number of placebo arm responders and one
+                               column per number of drug arm responders, which is True wherever the null
+                               hypothesis is rejected
+
+    '''
+
+    RR50_rejection_region_key = (int(num_placebo_arm_patients), int(num_drug_arm_patients), float(alpha))
+
+    if(RR50_rejection_region_key not in RR50_rejection_regions):
+
+        RR50_rejection_region_file_name = get_RR50_rejection_region_file_name(*RR50_rejection_region_key)
+
+        if(os.path.isfile(RR50_rejection_region_file_name)):
+
+            RR50_rejection_region = np.load(RR50_rejection_region_file_name)
+
+        else:
+
+            RR50_rejection_region = build_RR50_rejection_region(*RR50_rejection_region_key)
+
+            os.makedirs(RR50_rejection_regions_folder_name, exist_ok=True)
+
+            with tempfile.NamedTemporaryFile(dir=RR50_rejection_regions_folder_name, suffix='.npy', delete=False) as temporary_file:
+                np.save(temporary_file, RR50_rejection_region)
+
+            # temporary files are only readable by their owner, so give the file the permissions that a normally created file would 
+            # have, so that jobs running under other users can load it from a shared cache folder
+            os.chmod(temporary_file.name, 0o666 & ~get_umask())
+            os.replace(temporary_file.name, RR50_rejection_region_file_name)
+
+        RR50_rejection_regions[RR50_rejection_region_key] = RR50_rejection_region
+
+    return RR50_rejection_regions[RR50_rejection_region_key]
+
+
+def calculate_RR50_trial_successes(num_placebo_arm_responders,
+                                   num_placebo_arm_patients,
+                                   num_drug_arm_responders,
+                                   num_drug_arm_patients,
+                                   alpha=0.05):
+    '''
+
+    This function decides whether or not each trial is successful according to the RR50 endpoint by looking
+    up its numbers of responders in the rejection region of its trial arm sizes, which gives the same result
+    as checking whether the p-value of endpoint_functions.calculate_fisher_exact_p_values_from_counts() is
+    less than alpha.
+
+    Inputs:
+
+        1) num_placebo_arm_responders:
+            (Numpy array) - the number of responders in the placebo arm of each trial
+        2) num_placebo_arm_patients:
+            (Numpy array) - the number of patients in the placebo arm of each trial
+        3) num_drug_arm_responders:
+            (Numpy array) - the number of responders in the drug arm of each trial
+        4) num_drug_arm_patients:
+            (Numpy array) - the number of patients in the drug arm of each trial
+        5) alpha:
+            (float) - the significance level
+
+    Outputs:
+
+        1) RR50_trial_successes:
+            (Numpy array) - whether or not each trial is successful, with the shape that all of the inputs
+                            broadcast to
+
+    '''
+
+    [num_placebo_arm_responders,
+     num_placebo_arm_patients,
+     num_drug_arm_responders,
+     num_drug_arm_patients] = \
+         np.broadcast_arrays(*[np.asarray(count, dtype=int) for count in [num_placebo_arm_responders,
+                                                                          num_placebo_arm_patients,
+                                                                          num_drug_arm_responders,
+                                                                          num_drug_arm_patients]])
+
+    RR50_trial_successes = np.zeros(num_placebo_arm_responders.shape, dtype=bool)
+
+    # every pair of trial arm sizes has its own rejection region
+    trial_arm_sizes = np.stack((num_placebo_arm_patients.ravel(), num_drug_arm_patients.ravel()), 1)
+
+    for [num_placebo_arm_patients_in_trial, num_drug_arm_patients_in_trial] in np.unique(trial_arm_sizes, axis=0):
+
+        trials_with_trial_arm_sizes = (num_placebo_arm_patients == num_placebo_arm_patients_in_trial) & \
+                                      (num_drug_arm_patients    == num_drug_arm_patients_in_trial)
+
+        RR50_rejection_region = \
+            get_RR50_rejection_region(num_placebo_arm_patients_in_trial,
+                                      num_drug_arm_patients_in_trial,
+                                      alpha)
+
+        RR50_trial_successes[trials_with_trial_arm_sizes] = \
+            RR50_rejection_region[num_placebo_arm_responders[trials_with_trial_arm_sizes],
+                                  num_drug_arm_responders[trials_with_trial_arm_sizes]]
+
+    return RR50_trial_successes
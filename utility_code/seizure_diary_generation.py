@@ -1,10 +1,49 @@
+import threading
 import numpy as np
+from .random_streams import get_rng
+from .random_streams import fill_rows_in_parallel
+
+
+# the minimum average number of patients per (monthly mean, monthly standard deviation) cell for which the
+# seizure diaries of each cell are drawn as one block (with scalar gamma-poisson parameters) instead of
+# drawing the whole population at once with per-patient parameters
+min_patients_per_cell_block = 32
+
+# the poisson and binomial draws of a block of seizure diaries are made at most this many seizure counts at a time, so that
+# their int64 temporaries stay small no matter how many seizure counts are being generated at once
+max_seizure_counts_per_scratch_block = 65536
+
+# every thread keeps its own float64 array for the gamma rates, which grows to the largest block it has drawn and is then reused
+scratch_buffers = threading.local()
+
+
+def get_gamma_rate_scratch_buffer(shape):
+
+    num_gamma_rates = int(np.prod(shape))
+    gamma_rate_scratch_buffer = getattr(scratch_buffers, 'gamma_rates', None)
+
+    if(gamma_rate_scratch_buffer is None or len(gamma_rate_scratch_buffer) < num_gamma_rates):
+        gamma_rate_scratch_buffer = np.empty(num_gamma_rates)
+        scratch_buffers.gamma_rates = gamma_rate_scratch_buffer
+
+    return gamma_rate_scratch_buffer[0:num_gamma_rates].reshape(shape)
+
+
+def iterate_scratch_blocks(num_rows, num_seizure_counts_per_row):
+
+    # yields consecutive [start, stop) row ranges which each hold at most max_seizure_counts_per_scratch_block seizure counts (but at least one row)
+    num_rows_per_scratch_block = max(1, max_seizure_counts_per_scratch_block//max(1, num_seizure_counts_per_row))
+
+    for scratch_block_start_index in range(0, num_rows, num_rows_per_scratch_block):
+
+        yield [scratch_block_start_index, min(scratch_block_start_index + num_rows_per_scratch_block, num_rows)]
 
 
 def generate_seizure_diary(num_months, 
                            monthly_mean, 
                            monthly_std_dev, 
-                           time_scaling_const):
+                           time_scaling_const,
+                           rng=None):
     '''
 
     This function generates one numpy array representing a seizure diary. Assuming the
@@ -42,6 +81,8 @@ def generate_seizure_diary(num_months,
                                 monthly time scale --> testing_time_scaling_const = 1
                                 weekly time scale  --> testing_time_scaling_const = 4  (4 weeks in a month)
                                 daily time scale   --> testing_time_scaling_const = 28 (28 days in a month)
+        5) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
 
     Outputs:
         1) seizure_diary:
@@ -49,84 +90,251 @@ def generate_seizure_diary(num_months,
 
     '''
 
+    # generate the seizure diary as a batch of one patient
+    seizure_diary = \
+        generate_seizure_diaries(num_months,
+                                 np.array([monthly_mean]),
+                                 np.array([monthly_std_dev]),
+                                 time_scaling_const,
+                                 rng)[0]
+    
+    return seizure_diary
+
+
+def generate_seizure_diaries(num_months,
+                             monthly_means,
+                             monthly_std_devs,
+                             time_scaling_const,
+                             rng=None,
+                             dtype=float,
+                             out=None):
+    '''
+
+    This function generates a 2D numpy array of seizure diaries, one row per patient. It is the batched
+    equivalent of generate_seizure_diary(): each patient can have their own monthly mean and monthly 
+    standard deviation, and the seizure counts of every patient are generated according to the same 
+    gamma-poisson mixture, except that the whole (patients x time units) matrix is drawn with one 
+    array-level call to the gamma generator and one array-level call to the poisson generator instead 
+    of one pair of calls per seizure count.
+
+    Since seizure counts are whole numbers, they can be stored in a compact unsigned integer dtype 
+    (e.g., numpy.uint32) rather than as floats, and they can be written into a preallocated array 
+    so that a loop over many trials does not need to allocate new seizure diaries for every trial.
+
+    Patient populations drawn from a histogram of theoretical patients often repeat the same monthly 
+    mean and monthly standard deviation many times. If the patients share few enough cells (at least 
+    min_patients_per_cell_block patients per cell on average), then the patients are grouped by cell, 
+    the gamma-poisson parameters are calculated once per cell, and each cell's seizure diaries are 
+    drawn as one block. The seizure diaries are written back in the original patient order, so taking 
+    the first n patients as a smaller trial arm still works. Populations with too many cells are 
+    usually ruled out from their first few patients, so they do not pay for grouping the whole population.
+
+    Inputs:
+        1) num_months:
+            (int) - the number of months in each seizure diary to be generated
+        2) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        3) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        4) time_scaling_const:
+            (int) - the time-scaling factor which determines whether or not the seizure diaries will either be 
+                    generated on a monthly time scale, or if will be generated on a smaller time scale instead
+                    (see generate_seizure_diary for more details)
+        5) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        6) dtype:
+            (Numpy dtype) - the dtype of the seizure diaries, which is ignored if out is given
+        7) out:
+            (2D Numpy array) - a preallocated (patients x scaled time units) array to write the seizure 
+                               diaries into, or None if a new array should be allocated
+
+    Outputs:
+        1) seizure_diaries:
+            (2D Numpy array) - an array of seizure diaries, with one row per patient and one column per 
+                               scaled time unit
+
+    '''
+
+    rng = get_rng(rng)
+
     # figure out the total number of seizure counts needed according to both the specified time scale and the specified number of months
     num_scaled_time_units = num_months*time_scaling_const
 
-    # initialize the seizure diary array
-    seizure_diary = np.zeros(num_scaled_time_units)
+    # make sure that the patient parameters are column vectors so that they broadcast over the time units
+    monthly_means    = np.asarray(monthly_means,    dtype=float).reshape((-1, 1))
+    monthly_std_devs = np.asarray(monthly_std_devs, dtype=float).reshape((-1, 1))
+    num_patients = len(monthly_means)
 
-    # convert the monthly mean and monthly standard deviation into quantities usable by a gamma-poisson mixture
-    monthly_var = np.power(monthly_std_dev, 2)
-    monthly_mean_sq  = np.power(monthly_mean, 2)
-    monthly_overdispersion = (monthly_var - monthly_mean)/monthly_mean_sq
-    monthly_n = 1/monthly_overdispersion
-    odds_ratio = monthly_overdispersion*monthly_mean
+    # each patient's (monthly mean, monthly standard deviation) cell as one complex number, which sorts by monthly mean first
+    patient_cell_params = monthly_means.reshape(-1) + 1j*monthly_std_devs.reshape(-1)
+    max_num_cells_to_group_by = num_patients//min_patients_per_cell_block
 
-    # for each scaled time unit
-    for scaled_time_unit_index in range(num_scaled_time_units):
+    # the patients can only be grouped by cell if there are at most max_num_cells_to_group_by cells, which can be ruled out without 
+    # looking at the whole population whenever its first max_num_cells_to_group_by + 1 patients are already in too many cells
+    group_by_cell = max_num_cells_to_group_by > 0 and \
+                    len(np.unique(patient_cell_params[0:max_num_cells_to_group_by + 1])) <= max_num_cells_to_group_by
 
-        # generate seizure counts
-        time_scaled_rate = np.random.gamma(monthly_n/time_scaling_const, odds_ratio)
-        time_scaled_count = np.random.poisson(time_scaled_rate)
+    if(group_by_cell):
+        [cell_params, cell_indices] = np.unique(patient_cell_params, return_inverse=True)
+        cell_indices = cell_indices.reshape(-1)
+        group_by_cell = len(cell_params) <= max_num_cells_to_group_by
 
-        # store the seizure counts
-        seizure_diary[scaled_time_unit_index] = time_scaled_count
-    
-    return seizure_diary
+    # otherwise, every patient is drawn with their own gamma-poisson parameters, as if they were in a cell of their own
+    if(not group_by_cell):
+        cell_params = patient_cell_params
+
+    # convert the monthly means and monthly standard deviations of each cell into quantities usable by a gamma-poisson mixture
+    cell_monthly_means    = cell_params.real
+    cell_monthly_std_devs = cell_params.imag
+    cell_monthly_vars = np.power(cell_monthly_std_devs, 2)
+    cell_monthly_means_sq  = np.power(cell_monthly_means, 2)
+    cell_monthly_overdispersions = (cell_monthly_vars - cell_monthly_means)/cell_monthly_means_sq
+    cell_monthly_ns = 1/cell_monthly_overdispersions
+    cell_odds_ratios = cell_monthly_overdispersions*cell_monthly_means
+
+    # the per-patient parameters are only needed if every patient is drawn at once
+    if(not group_by_cell):
+        monthly_ns  = cell_monthly_ns.reshape((-1, 1))
+        odds_ratios = cell_odds_ratios.reshape((-1, 1))
+
+    if(out is None):
+        out = np.empty((num_patients, num_scaled_time_units), dtype=dtype)
+
+    # draw the poisson seizure counts of the given gamma rates straight into the seizure diaries, a few rows at a time, where the
+    # rows start at row_start_index and are either consecutive or, if patient_order is given, in the order of patient_order
+    def fill_poisson_seizure_counts(block_rng, time_scaled_rates, row_start_index, patient_order=None):
+
+        for [scratch_block_start_index, scratch_block_stop_index] in iterate_scratch_blocks(len(time_scaled_rates), num_scaled_time_units):
+
+            if(patient_order is None):
+                seizure_diary_rows = slice(row_start_index + scratch_block_start_index, row_start_index + scratch_block_stop_index)
+            else:
+                seizure_diary_rows = row_start_index + patient_order[scratch_block_start_index:scratch_block_stop_index]
+
+            out[seizure_diary_rows] = block_rng.poisson(time_scaled_rates[scratch_block_start_index:scratch_block_stop_index])
+
+    # generate the seizure counts for every patient and every scaled time unit all at once (or one block of patients per thread),
+    # where scaling standard gamma draws by the odds ratios gives exactly the same gamma rates as calling the gamma generator
+    def fill_seizure_diary_rows(block_rng, row_start_index, row_stop_index):
+
+        if(group_by_cell):
+
+            # sort the patients in this block by cell so that each cell is one contiguous run of patients
+            block_cell_indices = cell_indices[row_start_index:row_stop_index]
+            patient_order = np.argsort(block_cell_indices, kind='stable')
+            sorted_block_cell_indices = block_cell_indices[patient_order]
+            block_cell_start_indices = np.flatnonzero(np.diff(sorted_block_cell_indices, prepend=-1))
+            block_cell_stop_indices = np.append(block_cell_start_indices[1:], len(patient_order))
+
+            for (block_cell_start_index, block_cell_stop_index) in zip(block_cell_start_indices, block_cell_stop_indices):
+
+                cell_index = sorted_block_cell_indices[block_cell_start_index]
+                cell_patient_order = patient_order[block_cell_start_index:block_cell_stop_index]
+
+                time_scaled_rates = get_gamma_rate_scratch_buffer((len(cell_patient_order), num_scaled_time_units))
+                block_rng.standard_gamma(cell_monthly_ns[cell_index]/time_scaling_const, out=time_scaled_rates)
+                time_scaled_rates *= cell_odds_ratios[cell_index]
+
+                # scatter the seizure diaries of this cell back into the original patient order
+                fill_poisson_seizure_counts(block_rng, time_scaled_rates, row_start_index, cell_patient_order)
+
+        else:
+
+            time_scaled_rates = get_gamma_rate_scratch_buffer((row_stop_index - row_start_index, num_scaled_time_units))
+            block_rng.standard_gamma(monthly_ns[row_start_index:row_stop_index]/time_scaling_const, out=time_scaled_rates)
+            time_scaled_rates *= odds_ratios[row_start_index:row_stop_index]
+
+            fill_poisson_seizure_counts(block_rng, time_scaled_rates, row_start_index)
+
+    fill_rows_in_parallel(rng, num_patients, num_scaled_time_units, fill_seizure_diary_rows)
+    seizure_diaries = out
+
+    return seizure_diaries
 
 
 def apply_effect(seizure_diary,
                  num_months,
                  time_scaling_const,
-                 effect):
+                 effect,
+                 rng=None,
+                 out=None):
     '''
 
     This function applies a probabilistic drug effect to a given seizure diary which either
     reduces or increases the seizure counts, depedning on whether or the drug effect is 
     postivie or negative, respectively.
 
+    Each individual seizure is independently removed (or duplicated) with a probability equal 
+    to the absolute value of the effect. Instead of drawing one random number per seizure, the 
+    number of removed (or added) seizures in each seizure count is drawn directly from the 
+    equivalent binomial distribution, binomial(seizure count, |effect|), for the whole seizure 
+    diary at once. The seizure diary can also be a 2D array of seizure diaries (one row per patient),
+    in which case the effect can either be one number shared by every patient or a 1D array with
+    one effect per patient.
+
+    The result is written into out if it is given, which can be the seizure diary itself in order 
+    to apply the effect in place. Otherwise, a new array with the same dtype as the seizure diary 
+    is returned.
+
     Inputs:
 
         1) seizure_diary:
-            (1D Numpy array) - an array of integers representing one seizure diary
+            (1D or 2D Numpy array) - an array of integers representing one seizure diary, or an array 
+                                     of seizure diaries with one row per patient
         2) num_months:
             (int) - the number of months' worth of data in the seizure diary
         3) time_scaling_const:
             (int) - the time scale of the seizure diary
         4) effect:
-            (float) - the percent size by which the seizure counts will be reduced
+            (float or 1D Numpy array) - the percent size by which the seizure counts will be reduced,
+                                        either one for all seizure diaries or one per seizure diary
+        5) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        6) out:
+            (1D or 2D Numpy array) - a preallocated array with the same shape as the seizure diary to 
+                                     write the result into, or None if a new array should be allocated
 
     Outputs:
 
         1) seizure_diary:
-            (1D Numpy array) - the original seizure diary, except with probabilistically 
-                               reduced seizure counts
+            (1D or 2D Numpy array) - the original seizure diary, except with probabilistically 
+                                     reduced seizure counts
 
     '''
 
-    # figure out the number of scaled time units in the seizure diary
-    num_scaled_time_units = num_months*time_scaling_const
+    rng = get_rng(rng)
 
-    # for each scaled time unit
-    for scaled_time_unit_index in range(num_scaled_time_units):
+    # make sure that one effect per seizure diary gets broadcast over the scaled time units of that seizure diary
+    effect = np.asarray(effect, dtype=float)
+    if(np.ndim(seizure_diary) == 2 and effect.ndim == 1):
+        effect = effect.reshape((-1, 1))
 
-        # initialize the number of removed seizures for each seizure count
-        num_removed = 0
+    # each seizure is removed (or added) if a random number between 0 and 1 is less than the effect, which happens with this probability
+    effect_prob = np.minimum(np.abs(effect), 1)
 
-        # for each seizure count
-        for seizure_index in range(np.int_(seizure_diary[scaled_time_unit_index])):
+    seizure_diary_shape = np.shape(seizure_diary)
+    effect_probs = np.broadcast_to(effect_prob, seizure_diary_shape)
 
-            # generate a random floating-point number between 0 and 1
-            prob = np.random.uniform(0, 1)
+    # say whether the seizures of each seizure count are removed or added, depending on the postivity/negativity of the effect
+    effect_signs = np.broadcast_to(np.sign(effect).astype(int), seizure_diary_shape)
 
-            # if the random number is lees than the effect,...
-            if(prob < np.abs(effect)):
-                
-                # then say that a seizure has either been removed or added, depending on the postivity/negativity of the effect
-                num_removed = num_removed + np.sign(effect)
-        
-        # actually remove (or add) the number of seizures which was probabilistically determined for this seizure count 
-        seizure_diary[scaled_time_unit_index] = seizure_diary[scaled_time_unit_index] - num_removed
+    if(out is None):
+        out = np.empty_like(seizure_diary)
+
+    # draw the number of seizures which have been removed or added in each seizure count (one block of seizure diaries per thread), 
+    # and then actually remove (or add) them, a few seizure diaries at a time so that the temporary arrays stay small
+    def fill_num_removed_rows(block_rng, row_start_index, row_stop_index):
+
+        for [scratch_block_start_index, scratch_block_stop_index] in iterate_scratch_blocks(row_stop_index - row_start_index, np.size(seizure_diary[0:1])):
+
+            rows = slice(row_start_index + scratch_block_start_index, row_start_index + scratch_block_stop_index)
+
+            num_removed = block_rng.binomial(np.int_(seizure_diary[rows]), effect_probs[rows])
+            np.subtract(seizure_diary[rows], effect_signs[rows]*num_removed, out=out[rows], casting='unsafe')
+
+    fill_rows_in_parallel(rng, len(seizure_diary), np.size(seizure_diary[0:1]), fill_num_removed_rows)
+
+    seizure_diary = out
 
     return seizure_diary
 
@@ -135,7 +343,8 @@ def generate_seizure_diary_with_minimum_count(num_months,
                                               monthly_mean,
                                               monthly_std_dev,
                                               time_scaling_const,
-                                              minimum_required_seizure_count):
+                                              minimum_required_seizure_count,
+                                              rng=None):
     '''
 
     This function generates a seizure diary with a minimum number of seizures
@@ -162,6 +371,8 @@ def generate_seizure_diary_with_minimum_count(num_months,
         5) minimum_required_seizure_count:
             (int) - the minimum number of seizures that the diary will be generated with: the seizures
                     will be distributed over the seizure counts
+        6) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
     
     Outputs:
 
@@ -172,36 +383,115 @@ def generate_seizure_diary_with_minimum_count(num_months,
 
     '''
 
-    # initialize the boolean condition for the upcoming while loop
-    acceptable_count = False
+    # generate the seizure diary as a batch of one patient
+    [seizure_diaries_with_min_count, _] = \
+        generate_seizure_diaries_with_minimum_count(num_months,
+                                                    np.array([monthly_mean]),
+                                                    np.array([monthly_std_dev]),
+                                                    time_scaling_const,
+                                                    minimum_required_seizure_count,
+                                                    rng)
+    
+    seizure_diary_with_min_count = seizure_diaries_with_min_count[0]
 
-    # while a seizure diary with an acceptable number of seizures has not been generated
-    while(not acceptable_count):
+    return seizure_diary_with_min_count
+
+
+def generate_seizure_diaries_with_minimum_count(num_months,
+                                                monthly_means,
+                                                monthly_std_devs,
+                                                time_scaling_const,
+                                                minimum_required_seizure_count,
+                                                rng=None,
+                                                dtype=float,
+                                                out=None):
+    '''
 
-        # generate a seizure diary
-        seizure_diary_with_min_count = \
-            generate_seizure_diary(num_months, 
-                                   monthly_mean, 
-                                   monthly_std_dev, 
-                                   time_scaling_const)
+    This function generates a 2D numpy array of seizure diaries, one row per patient, where each 
+    seizure diary is guaranteed to have a minimum number of seizures distributed over its seizure 
+    counts. It is the batched equivalent of generate_seizure_diary_with_minimum_count(): candidate 
+    seizure diaries are generated for every patient at once, and then only the rows which failed 
+    to reach the minimum count are generated again, until every row has been accepted.
+
+    The number of candidate seizure diaries which had to be generated for each patient is also
+    returned, which is useful for figuring out how expensive the eligibility criterion is for a
+    given monthly mean and monthly standard deviation.
+
+    Inputs:
+
+        1) num_months:
+            (int) - the number of months in each seizure diary to be generated
+        2) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        3) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        4) time_scaling_const:
+            (int) - the time-scaling factor of the seizure diaries (see generate_seizure_diary for more details)
+        5) minimum_required_seizure_count:
+            (int) - the minimum number of seizures that each diary will be generated with
+        6) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        7) dtype:
+            (Numpy dtype) - the dtype of the seizure diaries, which is ignored if out is given
+        8) out:
+            (2D Numpy array) - a preallocated array to write the seizure diaries into (see generate_seizure_diaries)
     
-        # count the number of seizures over that seizure diary
-        num_seizures = np.sum(seizure_diary_with_min_count)
+    Outputs:
+
+        1) seizure_diaries_with_min_count:
+            (2D Numpy array) - an array of seizure diaries, with one row per patient; each seizure diary is
+                               guaranteed to have a minimum number of seizures distributed over its seizure 
+                               counts
+        2) num_attempts:
+            (1D Numpy array) - the number of candidate seizure diaries that were generated for each patient
 
-        # if it contains a number of seizures which is equal or greater than the minimum specified by the parameters,...
-        if(num_seizures >= minimum_required_seizure_count):
+    '''
 
-            #.., then change the boolean condition to end the while loop
-            acceptable_count = True
+    monthly_means    = np.asarray(monthly_means,    dtype=float)
+    monthly_std_devs = np.asarray(monthly_std_devs, dtype=float)
+
+    # generate one candidate seizure diary for every patient
+    seizure_diaries_with_min_count = \
+        generate_seizure_diaries(num_months,
+                                 monthly_means,
+                                 monthly_std_devs,
+                                 time_scaling_const,
+                                 rng,
+                                 dtype,
+                                 out)
     
-    return seizure_diary_with_min_count
+    num_attempts = np.ones(len(monthly_means), dtype=int)
+
+    # figure out which of the candidate seizure diaries do not contain enough seizures
+    rejected_indices = np.flatnonzero(np.sum(seizure_diaries_with_min_count, 1) < minimum_required_seizure_count)
+
+    # while there are still seizure diaries without an acceptable number of seizures
+    while(len(rejected_indices) > 0):
+
+        # generate new candidate seizure diaries for only those patients
+        seizure_diaries_with_min_count[rejected_indices, :] = \
+            generate_seizure_diaries(num_months,
+                                     monthly_means[rejected_indices],
+                                     monthly_std_devs[rejected_indices],
+                                     time_scaling_const,
+                                     rng,
+                                     seizure_diaries_with_min_count.dtype)
+        
+        num_attempts[rejected_indices] = num_attempts[rejected_indices] + 1
+
+        # keep only the patients whose new candidate seizure diaries still do not contain enough seizures
+        still_rejected = np.sum(seizure_diaries_with_min_count[rejected_indices, :], 1) < minimum_required_seizure_count
+        rejected_indices = rejected_indices[still_rejected]
+    
+    return [seizure_diaries_with_min_count, num_attempts]
 
 
 def generate_baseline_seizure_diary(monthly_mean, 
                                     monthly_std_dev,
                                     num_baseline_months,
                                     baseline_time_scaling_const,
-                                    minimum_required_baseline_seizure_count):
+                                    minimum_required_baseline_seizure_count,
+                                    rng=None):
     '''
 
     This function is a wrapper function which generates the portion of a seizure diary that 
@@ -241,6 +531,8 @@ def generate_baseline_seizure_diary(monthly_mean,
         5) minimum_required_baseline_seizure_count:
             (int) - the minimum number of seizures that the diary will be generated with: the seizures
                     will be distributed over the seizure counts
+        6) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
     
     Outputs:
 
@@ -256,7 +548,8 @@ def generate_baseline_seizure_diary(monthly_mean,
                                                   monthly_mean, 
                                                   monthly_std_dev, 
                                                   baseline_time_scaling_const,
-                                                  minimum_required_baseline_seizure_count)
+                                                  minimum_required_baseline_seizure_count,
+                                                  rng)
     
     return baseline_seizure_diary
 
@@ -266,7 +559,8 @@ def generate_placebo_arm_testing_seizure_diary(num_testing_months,
                                                monthly_std_dev, 
                                                testing_time_scaling_const,
                                                placebo_mu, 
-                                               placebo_sigma):
+                                               placebo_sigma,
+                                               rng=None):
     '''
 
     This function generates the testing period of a seizure diary for a patient
@@ -299,6 +593,8 @@ def generate_placebo_arm_testing_seizure_diary(num_testing_months,
         6) placebo_sigma:
             (float) - the standard deviation of the normally distributed placebo effect, expressed as 
                       a percentage
+        7) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
     
     Outputs:
 
@@ -308,22 +604,26 @@ def generate_placebo_arm_testing_seizure_diary(num_testing_months,
 
     '''
 
+    rng = get_rng(rng)
+
     # generate the testing period of a seizure diary which was randomized to the placebo arm
     placebo_arm_testing_seizure_diary = \
         generate_seizure_diary(num_testing_months, 
                                monthly_mean, 
                                monthly_std_dev, 
-                               testing_time_scaling_const)
+                               testing_time_scaling_const,
+                               rng)
     
     # generate this individual seizure diary's placebo effect according to the normal distribution
-    placebo_effect = np.random.normal(placebo_mu, placebo_sigma)
+    placebo_effect = rng.normal(placebo_mu, placebo_sigma)
 
     # apply the placebo effect to the testing period
     placebo_arm_testing_seizure_diary = \
         apply_effect(placebo_arm_testing_seizure_diary,
                      num_testing_months,
                      testing_time_scaling_const,
-                     placebo_effect)
+                     placebo_effect,
+                     rng)
 
     return placebo_arm_testing_seizure_diary
 
@@ -335,7 +635,8 @@ def generate_drug_arm_testing_seizure_diary(num_testing_months,
                                             placebo_mu, 
                                             placebo_sigma,
                                             drug_mu, 
-                                            drug_sigma):
+                                            drug_sigma,
+                                            rng=None):
     '''
 
     This function generates the testing period of a seizure diary for a patient
@@ -373,6 +674,8 @@ def generate_drug_arm_testing_seizure_diary(num_testing_months,
         8) drug_sigma:
             (float) - the standard deviation of the normally distributed drug effect, expressed as 
                       a percentage
+        9) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
     
     Outputs:
 
@@ -382,30 +685,431 @@ def generate_drug_arm_testing_seizure_diary(num_testing_months,
 
     '''
 
+    rng = get_rng(rng)
+
     # generate the testing period of a seizure diary which was randomized to the drug arm
     drug_arm_testing_seizure_diary = \
         generate_seizure_diary(num_testing_months, 
                                monthly_mean, 
                                monthly_std_dev, 
-                               testing_time_scaling_const)
+                               testing_time_scaling_const,
+                               rng)
 
     # generate this individual seizure diary's placebo effect and drug effect, both generated according to the normal distribution
-    placebo_effect = np.random.normal(placebo_mu, placebo_sigma)
-    drug_effect    = np.random.normal(drug_mu,    drug_sigma)
+    placebo_effect = rng.normal(placebo_mu, placebo_sigma)
+    drug_effect    = rng.normal(drug_mu,    drug_sigma)
 
     # apply the placebo effect to the testing period
     drug_arm_testing_seizure_diary = \
         apply_effect(drug_arm_testing_seizure_diary,
                      num_testing_months,
                      testing_time_scaling_const,
-                     placebo_effect)
+                     placebo_effect,
+                     rng)
     
     # apply the drug effect to the testing period
     drug_arm_testing_seizure_diary = \
         apply_effect(drug_arm_testing_seizure_diary,
                      num_testing_months,
                      testing_time_scaling_const,
-                     drug_effect)
+                     drug_effect,
+                     rng)
     
     return drug_arm_testing_seizure_diary
 
+
+def generate_baseline_seizure_diaries(monthly_means, 
+                                      monthly_std_devs,
+                                      num_baseline_months,
+                                      baseline_time_scaling_const,
+                                      minimum_required_baseline_seizure_count,
+                                      rng=None,
+                                      dtype=float,
+                                      out=None):
+    '''
+
+    This function generates the baseline periods of the seizure diaries for a whole trial arm. 
+    It is the batched equivalent of generate_baseline_seizure_diary(): each row of the returned
+    array is guaranteed to have a minimum number of seizures distributed over its seizure counts.
+
+    Inputs:
+
+        1) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        2) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        3) num_baseline_months:
+            (int) - the number of months in the baseline seizure diaries to be generated
+        4) baseline_time_scaling_const:
+            (int) - the time-scaling factor of the baseline seizure diaries (see generate_seizure_diary 
+                    for more details)
+        5) minimum_required_baseline_seizure_count:
+            (int) - the minimum number of seizures that each diary will be generated with
+        6) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        7) dtype:
+            (Numpy dtype) - the dtype of the seizure diaries, which is ignored if out is given
+        8) out:
+            (2D Numpy array) - a preallocated array to write the seizure diaries into (see generate_seizure_diaries)
+    
+    Outputs:
+
+        1) baseline_seizure_diaries:
+            (2D Numpy array) - an array of baseline seizure diaries, with one row per patient
+
+    '''
+
+    [baseline_seizure_diaries, _] = \
+        generate_seizure_diaries_with_minimum_count(num_baseline_months, 
+                                                    monthly_means, 
+                                                    monthly_std_devs, 
+                                                    baseline_time_scaling_const,
+                                                    minimum_required_baseline_seizure_count,
+                                                    rng,
+                                                    dtype,
+                                                    out)
+    
+    return baseline_seizure_diaries
+
+
+def generate_placebo_arm_testing_seizure_diaries(num_testing_months, 
+                                                 monthly_means, 
+                                                 monthly_std_devs, 
+                                                 testing_time_scaling_const,
+                                                 placebo_mu, 
+                                                 placebo_sigma,
+                                                 rng=None):
+    '''
+
+    This function generates the testing periods of the seizure diaries for every patient
+    who's been randomized to the placebo arm of a clinical trial. It is the batched equivalent
+    of generate_placebo_arm_testing_seizure_diary(): the untreated seizure diaries of the whole
+    arm are generated via generate_seizure_diaries(), and then each patient's individual placebo 
+    effect is applied to their own row.
+
+    Inputs:
+
+        1) num_testing_months:
+            (int) - the number of months in the testing seizure diaries to be generated
+        2) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        3) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        4) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing seizure diaries (see generate_seizure_diary 
+                    for more details)
+        5) placebo_mu:
+            (float) - the mean of the normally distributed placebo effect, expressed as a percentage
+        6) placebo_sigma:
+            (float) - the standard deviation of the normally distributed placebo effect, expressed as 
+                      a percentage
+        7) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+    
+    Outputs:
+
+        1) placebo_arm_testing_seizure_diaries:
+            (2D Numpy array) - an array of testing seizure diaries, with one row per patient
+
+    '''
+
+    rng = get_rng(rng)
+
+    # generate the testing periods of all the seizure diaries which were randomized to the placebo arm
+    placebo_arm_testing_seizure_diaries = \
+        generate_seizure_diaries(num_testing_months, 
+                                 monthly_means, 
+                                 monthly_std_devs, 
+                                 testing_time_scaling_const,
+                                 rng)
+    
+    # generate every individual seizure diary's placebo effect according to the normal distribution
+    num_patients = len(placebo_arm_testing_seizure_diaries)
+    placebo_effects = rng.normal(placebo_mu, placebo_sigma, num_patients)
+
+    # apply each placebo effect to its own testing period
+    placebo_arm_testing_seizure_diaries = \
+        apply_effect(placebo_arm_testing_seizure_diaries,
+                     num_testing_months,
+                     testing_time_scaling_const,
+                     placebo_effects,
+                     rng)
+
+    return placebo_arm_testing_seizure_diaries
+
+
+def generate_drug_arm_testing_seizure_diaries(num_testing_months, 
+                                              monthly_means, 
+                                              monthly_std_devs, 
+                                              testing_time_scaling_const,
+                                              placebo_mu, 
+                                              placebo_sigma,
+                                              drug_mu, 
+                                              drug_sigma,
+                                              rng=None):
+    '''
+
+    This function generates the testing periods of the seizure diaries for every patient
+    who's been randomized to the drug arm of a clinical trial. It is the batched equivalent
+    of generate_drug_arm_testing_seizure_diary(): the placebo effect and then the drug effect
+    of each patient is sequentially applied to their own row.
+
+    Inputs:
+
+        1) num_testing_months:
+            (int) - the number of months in the testing seizure diaries to be generated
+        2) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        3) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        4) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing seizure diaries (see generate_seizure_diary 
+                    for more details)
+        5) placebo_mu:
+            (float) - the mean of the normally distributed placebo effect, expressed as a percentage
+        6) placebo_sigma:
+            (float) - the standard deviation of the normally distributed placebo effect, expressed as 
+                      a percentage
+        7) drug_mu:
+            (float) - the mean of the normally distributed drug effect, expressed as a percentage
+        8) drug_sigma:
+            (float) - the standard deviation of the normally distributed drug effect, expressed as 
+                      a percentage
+        9) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+    
+    Outputs:
+
+        1) drug_arm_testing_seizure_diaries:
+            (2D Numpy array) - an array of testing seizure diaries, with one row per patient
+
+    '''
+
+    rng = get_rng(rng)
+
+    # generate the testing periods of all the seizure diaries which were randomized to the drug arm
+    drug_arm_testing_seizure_diaries = \
+        generate_seizure_diaries(num_testing_months, 
+                                 monthly_means, 
+                                 monthly_std_devs, 
+                                 testing_time_scaling_const,
+                                 rng)
+
+    # generate every individual seizure diary's placebo effect and drug effect, both generated according to the normal distribution
+    num_patients = len(drug_arm_testing_seizure_diaries)
+    placebo_effects = rng.normal(placebo_mu, placebo_sigma, num_patients)
+    drug_effects    = rng.normal(drug_mu,    drug_sigma,    num_patients)
+
+    # apply each placebo effect to its own testing period
+    drug_arm_testing_seizure_diaries = \
+        apply_effect(drug_arm_testing_seizure_diaries,
+                     num_testing_months,
+                     testing_time_scaling_const,
+                     placebo_effects,
+                     rng)
+
+    # apply each drug effect to its own testing period
+    drug_arm_testing_seizure_diaries = \
+        apply_effect(drug_arm_testing_seizure_diaries,
+                     num_testing_months,
+                     testing_time_scaling_const,
+                     drug_effects,
+                     rng)
+    
+    return drug_arm_testing_seizure_diaries
+
+
+def generate_testing_seizure_diaries_at_resolution(num_testing_months, 
+                                                   monthly_means, 
+                                                   monthly_std_devs, 
+                                                   testing_time_scaling_const,
+                                                   effect_mus,
+                                                   effect_sigmas,
+                                                   time_scaled_detail_needed,
+                                                   rng=None,
+                                                   dtype=float,
+                                                   out=None):
+    '''
+
+    This function is the resolution-aware version of generate_placebo_arm_testing_seizure_diaries() and
+    generate_drug_arm_testing_seizure_diaries(). The sum of the seizure counts of a patient over every
+    scaled time unit in a month is itself negative binomially distributed with the same monthly mean and
+    monthly standard deviation, and binomially thinning those seizure counts one scaled time unit at a time
+    removes the same number of seizures from each month as thinning the monthly seizure count directly.
+    As such, if none of the endpoints that are going to be calculated need the testing periods at the time 
+    scale given by testing_time_scaling_const (e.g., only RR50 and MPC are needed), then the monthly seizure
+    counts are drawn directly, which takes testing_time_scaling_const times fewer random numbers. Otherwise,
+    the testing periods are generated at the scaled time unit level and then summed into months.
+
+    The effects are applied in the order in which they are given, which means that a placebo arm
+    should be given only the placebo effect, while a drug arm should be given the placebo effect
+    followed by the drug effect.
+
+    Inputs:
+
+        1) num_testing_months:
+            (int) - the number of months in the testing seizure diaries to be generated
+        2) monthly_means:
+            (1D Numpy array) - the true monthly mean of each patient
+        3) monthly_std_devs:
+            (1D Numpy array) - the true monthly standard deviation of each patient
+        4) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing seizure diaries (see generate_seizure_diary 
+                    for more details)
+        5) effect_mus:
+            (list) - the means of the normally distributed effects, expressed as percentages
+        6) effect_sigmas:
+            (list) - the standard deviations of the normally distributed effects, expressed as percentages
+        7) time_scaled_detail_needed:
+            (bool) - whether or not the testing seizure diaries are needed at the time scale given by 
+                     testing_time_scaling_const
+        8) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        9) dtype:
+            (Numpy dtype) - the dtype of the seizure diaries, which is ignored if out is given
+        10) out:
+            (2D Numpy array) - a preallocated array to generate the testing seizure diaries in, with one row
+                               per patient and one column per month (or per scaled time unit if 
+                               time_scaled_detail_needed is True), or None if a new array should be allocated
+    
+    Outputs:
+
+        1) monthly_testing_seizure_diaries:
+            (2D Numpy array) - an array of monthly testing seizure diaries, with one row per patient
+        2) time_scaled_testing_seizure_diaries:
+            (2D Numpy array) - an array of testing seizure diaries on the time scale given by 
+                               testing_time_scaling_const, with one row per patient, or None if 
+                               time_scaled_detail_needed is False
+
+    '''
+
+    rng = get_rng(rng)
+
+    if(time_scaled_detail_needed):
+        generation_time_scaling_const = testing_time_scaling_const
+    else:
+        generation_time_scaling_const = 1
+
+    # generate the testing periods of all the seizure diaries at the coarsest time scale that is needed
+    testing_seizure_diaries = \
+        generate_seizure_diaries(num_testing_months, 
+                                 monthly_means, 
+                                 monthly_std_devs, 
+                                 generation_time_scaling_const,
+                                 rng,
+                                 dtype,
+                                 out)
+
+    # generate every individual seizure diary's effects according to the normal distribution
+    num_patients = len(testing_seizure_diaries)
+    effects_per_patient = [rng.normal(effect_mu, effect_sigma, num_patients) 
+                           for [effect_mu, effect_sigma] in zip(effect_mus, effect_sigmas)]
+
+    # apply each effect to its own testing period, in order
+    for effects in effects_per_patient:
+
+        testing_seizure_diaries = \
+            apply_effect(testing_seizure_diaries,
+                         num_testing_months,
+                         generation_time_scaling_const,
+                         effects,
+                         rng,
+                         testing_seizure_diaries)
+
+    if(time_scaled_detail_needed):
+
+        time_scaled_testing_seizure_diaries = testing_seizure_diaries
+        monthly_testing_seizure_diaries = \
+            np.sum(testing_seizure_diaries.reshape((num_patients,
+                                                    num_testing_months,
+                                                    testing_time_scaling_const)), 2)
+
+    else:
+
+        time_scaled_testing_seizure_diaries = None
+        monthly_testing_seizure_diaries = testing_seizure_diaries
+
+    return [monthly_testing_seizure_diaries, time_scaled_testing_seizure_diaries]
+
+
+def apply_coupled_effects(seizure_diaries,
+                          effects_per_scenario,
+                          rng=None):
+    '''
+
+    This function applies several different effect scenarios to the same untreated seizure diaries, 
+    such that every scenario is applied with the same random numbers. Each seizure that could be 
+    removed (or duplicated) by an effect is given its own uniform random number, and that seizure is 
+    removed (or duplicated) in a given scenario if its random number is less than the absolute value 
+    of that scenario's effect. Since the uniform random numbers are shared between scenarios, the 
+    differences between the scenarios are caused by the differences between their effects rather than 
+    by independent sampling noise, and the untreated seizure diaries only need to be generated once.
+
+    Within each scenario, the effects are applied in the order in which they are given, exactly as
+    with repeated calls to apply_effect(), which means that every scenario must have the same number 
+    of effects. A seizure count can at most double every time an effect is applied, so each effect 
+    is given twice as many uniform random numbers per seizure count as the effect before it.
+
+    Inputs:
+
+        1) seizure_diaries:
+            (2D Numpy array) - an array of untreated seizure diaries, with one row per patient
+        2) effects_per_scenario:
+            (list) - one list per scenario, each of which contains one 1D Numpy array of per-patient 
+                     effects for every effect that is applied in that scenario
+        3) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+
+    Outputs:
+
+        1) seizure_diaries_per_scenario:
+            (list) - one 2D Numpy array of treated seizure diaries per scenario
+
+    '''
+
+    rng = get_rng(rng)
+
+    num_effects = len(effects_per_scenario[0])
+    for effects in effects_per_scenario:
+        if(len(effects) != num_effects):
+            raise ValueError('Every scenario in the \'effects_per_scenario\' parameter must have the same number of effects')
+
+    [num_patients, num_scaled_time_units] = np.shape(seizure_diaries)
+    seizure_counts = np.int_(seizure_diaries).ravel()
+    num_seizure_counts = len(seizure_counts)
+    seizure_count_patient_indices = np.repeat(np.arange(num_patients), num_scaled_time_units)
+
+    # give every seizure which could exist when each effect gets applied its own uniform random number
+    uniforms_per_effect = []
+    max_seizure_counts = seizure_counts
+    for effect_index in range(num_effects):
+
+        seizure_count_indices = np.repeat(np.arange(num_seizure_counts), max_seizure_counts)
+        seizure_indices = np.arange(len(seizure_count_indices)) - np.repeat(np.cumsum(max_seizure_counts) - max_seizure_counts, max_seizure_counts)
+        uniforms = rng.random(len(seizure_count_indices))
+
+        uniforms_per_effect.append([seizure_count_indices, seizure_indices, uniforms])
+        max_seizure_counts = 2*max_seizure_counts
+
+    seizure_diaries_per_scenario = []
+
+    for effects in effects_per_scenario:
+
+        treated_seizure_counts = seizure_counts.copy()
+
+        for effect_index in range(num_effects):
+
+            [seizure_count_indices, seizure_indices, uniforms] = uniforms_per_effect[effect_index]
+
+            seizure_count_effects = np.asarray(effects[effect_index], dtype=float)[seizure_count_patient_indices]
+            effect_probs = np.minimum(np.abs(seizure_count_effects), 1)
+
+            # only the seizures which actually exist in the current seizure count can be removed (or duplicated)
+            removed = (seizure_indices < treated_seizure_counts[seizure_count_indices]) & (uniforms < effect_probs[seizure_count_indices])
+            num_removed = np.bincount(seizure_count_indices[removed], minlength=num_seizure_counts)
+
+            treated_seizure_counts = treated_seizure_counts - np.sign(seizure_count_effects).astype(int)*num_removed
+
+        seizure_diaries_per_scenario.append(treated_seizure_counts.reshape((num_patients, num_scaled_time_units)).astype(np.asarray(seizure_diaries).dtype))
+
+    return seizure_diaries_per_scenario
@@ -0,0 +1,263 @@
+import numpy as np
+from .endpoint_simulation import simulate_trial_arm_endpoints
+from .endpoint_simulation import allocate_seizure_diary_buffers
+from .random_streams import get_rng
+from .random_streams import get_random_stream
+
+
+# a rough upper bound on the number of bytes that the 'numpy' engine needs per seizure count while it is generating
+# a trial arm: the uint32 seizure diary buffers and the float64 gamma rate scratch buffer, plus some headroom for the
+# int64 poisson and binomial draws, which are only ever made a few rows at a time
+bytes_per_seizure_count = 16
+
+
+def calculate_max_patients_per_chunk(num_baseline_months,
+                                     num_testing_months,
+                                     testing_time_scaling_const,
+                                     max_memory_in_bytes):
+    '''
+
+    This function calculates how many patients can be generated at once without the seizure diaries
+    of those patients (and the temporary arrays used to generate them) taking up more than the given
+    amount of memory. At least one patient is always generated at once.
+
+    Inputs:
+
+        1) num_baseline_months:
+            (int) - the number of months in the baseline period
+        2) num_testing_months:
+            (int) - the number of months in the testing period
+        3) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing period (see generate_seizure_diary for more details)
+        4) max_memory_in_bytes:
+            (int) - the maximum amount of memory that the seizure diaries of one chunk of patients can use
+
+    Outputs:
+
+        1) max_patients_per_chunk:
+            (int) - the maximum number of patients in one chunk
+
+    '''
+
+    num_seizure_counts_per_patient = num_baseline_months + num_testing_months*testing_time_scaling_const
+    max_patients_per_chunk = max(1, int(max_memory_in_bytes//(bytes_per_seizure_count*num_seizure_counts_per_patient)))
+
+    return max_patients_per_chunk
+
+
+def simulate_trial_arm_endpoints_in_chunks(num_theo_patients_in_trial_arm,
+                                           theo_trial_arm_patient_pop_params,
+                                           num_baseline_months,
+                                           num_testing_months,
+                                           testing_time_scaling_const,
+                                           minimum_required_baseline_seizure_count,
+                                           placebo_mu,
+                                           placebo_sigma,
+                                           drug_mu,
+                                           drug_sigma,
+                                           placebo_or_drug,
+                                           max_patients_per_chunk,
+                                           seizure_diary_buffers,
+                                           rng=None,
+                                           requested_endpoint_names=None):
+    '''
+
+    This function is the bounded-memory version of simulate_trial_arm_endpoints(). The patients in
+    the trial arm are simulated in consecutive chunks of at most max_patients_per_chunk patients,
+    all of which are generated inside of the same seizure diary buffers, and only the per-patient
+    endpoint results of each chunk are kept. Since every patient is simulated independently, the
+    results have the same distribution as if the whole trial arm were simulated at once.
+
+    Outputs:
+
+        1) percent_changes:
+            (1D Numpy array) - the percent change of each patient, or None if it was not requested
+        2) TTP_times:
+            (1D Numpy array) - the time to prerandomization of each patient, or None if it was not requested
+        3) observed_array:
+            (1D Numpy array) - whether or not each patient's time to prerandomization was observed, or
+                               None if it was not requested
+
+    '''
+
+    endpoint_results_per_chunk = [[], [], []]
+
+    for chunk_start_index in range(0, num_theo_patients_in_trial_arm, max_patients_per_chunk):
+
+        chunk_stop_index = min(chunk_start_index + max_patients_per_chunk, num_theo_patients_in_trial_arm)
+
+        chunk_endpoint_results = \
+            simulate_trial_arm_endpoints(chunk_stop_index - chunk_start_index,
+                                         theo_trial_arm_patient_pop_params[chunk_start_index:chunk_stop_index],
+                                         num_baseline_months,
+                                         num_testing_months,
+                                         testing_time_scaling_const,
+                                         minimum_required_baseline_seizure_count,
+                                         placebo_mu,
+                                         placebo_sigma,
+                                         drug_mu,
+                                         drug_sigma,
+                                         placebo_or_drug,
+                                         rng,
+                                         requested_endpoint_names,
+                                         seizure_diary_buffers)
+
+        for endpoint_result_index in range(3):
+            endpoint_results_per_chunk[endpoint_result_index].append(chunk_endpoint_results[endpoint_result_index])
+
+    # the endpoint results which were not requested are None for every chunk
+    [percent_changes, TTP_times, observed_array] = \
+        [None if endpoint_results[0] is None else np.concatenate(endpoint_results)
+         for endpoint_results in endpoint_results_per_chunk]
+
+    return [percent_changes, TTP_times, observed_array]
+
+
+def iterate_trials(num_theo_patients_per_trial_arm,
+                   theo_placebo_arm_patient_pop_params,
+                   theo_drug_arm_patient_pop_params,
+                   num_baseline_months,
+                   num_testing_months,
+                   testing_time_scaling_const,
+                   minimum_required_baseline_seizure_count,
+                   placebo_mu,
+                   placebo_sigma,
+                   drug_mu,
+                   drug_sigma,
+                   num_trials,
+                   rng=None,
+                   requested_endpoint_names=None,
+                   max_memory_in_bytes=None,
+                   base_seed=None,
+                   block_num=0,
+                   file_index=0):
+    '''
+
+    This function is a generator which simulates one trial at a time and yields the endpoint results
+    of both of its trial arms, so that consumers can reduce the results of every trial (e.g., into
+    p-values or numbers of successful trials) as soon as that trial has been simulated, instead of
+    holding on to the results of every trial at once.
+
+    If max_memory_in_bytes is given, then each trial arm is simulated in chunks of patients which
+    fit within that amount of memory (see calculate_max_patients_per_chunk), which keeps the peak
+    memory usage bounded no matter how many patients are in each trial arm or how long the testing
+    period is. One set of seizure diary buffers is allocated up front and reused for every chunk of
+    every trial arm of every trial.
+
+    If base_seed is given, then the placebo arm and the drug arm of every trial are drawn from their
+    own random streams, keyed on (base_seed, block_num, file_index, trial index) (see
+    random_streams.get_random_stream), and rng is ignored. Otherwise, every trial is drawn from rng.
+
+    Inputs:
+
+        1) num_theo_patients_per_trial_arm:
+            (int) - the number of patients in each trial arm
+        2) theo_placebo_arm_patient_pop_params:
+            (2D Numpy array) - the monthly mean and monthly standard deviation of each placebo arm patient
+        3) theo_drug_arm_patient_pop_params:
+            (2D Numpy array) - the monthly mean and monthly standard deviation of each drug arm patient
+        4) num_baseline_months:
+            (int) - the number of months in the baseline period
+        5) num_testing_months:
+            (int) - the number of months in the testing period
+        6) testing_time_scaling_const:
+            (int) - the time-scaling factor of the testing period (see generate_seizure_diary for more details)
+        7) minimum_required_baseline_seizure_count:
+            (int) - the minimum number of seizures in each patient's baseline period
+        8) placebo_mu:
+            (float) - the mean of the normally distributed placebo effect, expressed as a percentage
+        9) placebo_sigma:
+            (float) - the standard deviation of the normally distributed placebo effect, expressed as a percentage
+        10) drug_mu:
+            (float) - the mean of the normally distributed drug effect, expressed as a percentage
+        11) drug_sigma:
+            (float) - the standard deviation of the normally distributed drug effect, expressed as a percentage
+        12) num_trials:
+            (int) - the number of trials to simulate
+        13) rng:
+            (Numpy Generator) - the random number generator to draw from (see random_streams.get_rng)
+        14) requested_endpoint_names:
+            (list) - the endpoints which are needed (see endpoint_simulation.simulate_trial_arm_endpoints)
+        15) max_memory_in_bytes:
+            (int) - the maximum amount of memory that the seizure diaries of one chunk of patients can
+                    use, or None if every trial arm should be simulated all at once
+        16) base_seed:
+            (int) - the base seed of the per-trial random streams, or None if rng should be used instead
+        17) block_num:
+            (int) - the block number of the per-trial random streams
+        18) file_index:
+            (int) - the file index of the per-trial random streams
+
+    Yields:
+
+        1) trial_index:
+            (int) - the index of the trial
+        2) placebo_arm_endpoint_results:
+            (list) - the [percent_changes, TTP_times, observed_array] of the placebo arm
+        3) drug_arm_endpoint_results:
+            (list) - the [percent_changes, TTP_times, observed_array] of the drug arm
+
+    '''
+
+    if(max_memory_in_bytes is None):
+        max_patients_per_chunk = num_theo_patients_per_trial_arm
+    else:
+        max_patients_per_chunk = \
+            min(num_theo_patients_per_trial_arm,
+                calculate_max_patients_per_chunk(num_baseline_months,
+                                                 num_testing_months,
+                                                 testing_time_scaling_const,
+                                                 max_memory_in_bytes))
+
+    seizure_diary_buffers = \
+        allocate_seizure_diary_buffers(max_patients_per_chunk,
+                                       num_baseline_months,
+                                       num_testing_months,
+                                       testing_time_scaling_const)
+
+    if(base_seed is None):
+        rng = get_rng(rng)
+
+    for trial_index in range(num_trials):
+
+        if(base_seed is None):
+            [placebo_arm_rng, drug_arm_rng] = [rng, rng]
+        else:
+            placebo_arm_rng = get_random_stream(base_seed, block_num, file_index, trial_index, 'placebo')
+            drug_arm_rng    = get_random_stream(base_seed, block_num, file_index, trial_index, 'drug')
+
+        placebo_arm_endpoint_results = \
+            simulate_trial_arm_endpoints_in_chunks(num_theo_patients_per_trial_arm,
+                                                   theo_placebo_arm_patient_pop_params,
+                                                   num_baseline_months,
+                                                   num_testing_months,
+                                                   testing_time_scaling_const,
+                                                   minimum_required_baseline_seizure_count,
+                                                   placebo_mu,
+                                                   placebo_sigma,
+                                                   drug_mu,
+                                                   drug_sigma,
+                                                   'placebo',
+                                                   max_patients_per_chunk,
+                                                   seizure_diary_buffers,
+                                                   placebo_arm_rng,
+                                                   requested_endpoint_names)
+
+        drug_arm_endpoint_results = \
+            simulate_trial_arm_endpoints_in_chunks(num_theo_patients_per_trial_arm,
+                                                   theo_drug_arm_patient_pop_params,
+                                                   num_baseline_months,
+                                                   num_testing_months,
+                                                   testing_time_scaling_const,
+                                                   minimum_required_baseline_seizure_count,
+                                                   placebo_mu,
+                                                   placebo_sigma,
+                                                   drug_mu,
+                                                   drug_sigma,
+                                                   'drug',
+                                                   max_patients_per_chunk,
+                                                   seizure_diary_buffers,
+                                                   drug_arm_rng,
+                                                   requested_endpoint_names)
+
+        yield [trial_index, placebo_arm_endpoint_results, drug_arm_endpoint_results]